@@ -0,0 +1,135 @@
+"""
+课程库模型内存基准
+
+在内存中构造合成课程库的目录快照（每门课程 10 个章节，每章 100 个视频，不创建任何文件），
+用 DirectoryScanner 扫描得到课程列表，测量扫描结果常驻的内存（tracemalloc）；
+再把同样的结果转换为重构前的模型（每个视频一个保存完整 Path 的 dataclass）做对比，
+并校验两者的路径、名称与集数一致。
+
+用法：python benchmarks/library_model_bench.py [视频总数，默认 1000000]
+"""
+import gc
+import itertools
+import sys
+import time
+import tracemalloc
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.core.dir_snapshot import DirNode  # noqa: E402
+from src.core.scanner import DirectoryScanner  # noqa: E402
+
+CHAPTERS_PER_COURSE = 10
+VIDEOS_PER_CHAPTER = 100
+
+
+def snapshot(path, dirs=(), files=()):
+    """直接构造已列出的目录快照节点"""
+    node = DirNode(path)
+    node._dirs = list(dirs)
+    node._files = list(files)
+    return node
+
+
+def make_tree(root, total):
+    """根目录 / 分类 / 课程 / 普通话Deepl / 章节 / 视频"""
+    per_course = CHAPTERS_PER_COURSE * VIDEOS_PER_CHAPTER
+    categories = {}
+    for c in range((total + per_course - 1) // per_course):
+        category = root / f"分类{c % 5}"
+        course_path = category / f"示例课程名称 Course{c} [普通话]"
+        language_path = course_path / "普通话Deepl"
+        chapters = []
+        for k in range(CHAPTERS_PER_COURSE):
+            chapter_path = language_path / f"{k + 1:02d} - 第{k + 1}章 章节名称"
+            files = [f"{i + 1:03d} 第{i + 1}讲 视频标题.mp4" for i in range(VIDEOS_PER_CHAPTER)]
+            chapters.append(snapshot(chapter_path, files=files))
+        course = snapshot(course_path, [snapshot(language_path, chapters)])
+        categories.setdefault(category, []).append(course)
+    return snapshot(root, [snapshot(path, courses) for path, courses in categories.items()])
+
+
+# ---------- 重构前的模型 ----------
+
+@dataclass
+class LegacyVideoFile:
+    path: Path
+    name: str
+    episode_number: int = 1
+    global_episode_number: int = 1
+
+
+@dataclass
+class LegacyChapter:
+    name: str
+    videos: List[LegacyVideoFile]
+    sub_chapters: List['LegacyChapter'] = field(default_factory=list)
+
+
+@dataclass
+class LegacyCourse:
+    path: Path
+    name: str
+    structure_type: int
+    chapters: List[LegacyChapter]
+    video_count: int
+
+
+def to_legacy(courses):
+    def chapter(c):
+        videos = [LegacyVideoFile(Path(str(v.path)), v.name, v.episode_number, v.global_episode_number)
+                  for v in c.videos]
+        return LegacyChapter(c.name, videos, [chapter(s) for s in c.sub_chapters])
+    return [LegacyCourse(Path(str(c.path)), c.name, c.structure_type, [chapter(x) for x in c.chapters],
+                         c.video_count) for c in courses]
+
+
+def rows(courses):
+    def walk(chapters):
+        for c in chapters:
+            for v in c.videos:
+                yield str(v.path), v.name, v.episode_number, v.global_episode_number
+            yield from walk(c.sub_chapters)
+    for course in courses:
+        yield from walk(course.chapters)
+
+
+def measure(build):
+    """返回 (结果, 常驻字节数, 峰值字节数, 耗时)"""
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = build()
+    elapsed = time.perf_counter() - start
+    gc.collect()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, current, peak, elapsed
+
+
+def main():
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    root = make_tree(Path("/library"), total)
+    scanner = DirectoryScanner()
+    scanner.check_nomedia = False
+
+    courses, current, peak, elapsed = measure(lambda: list(scanner._iter_directory(root)))
+    videos = sum(course.video_count for course in courses)
+    print(f"{len(courses)} 门课程，{videos} 个视频")
+    print(f"{'':<8}{'常驻(MB)':>10}{'峰值(MB)':>10}{'字节/视频':>10}{'耗时(秒)':>10}")
+    print(f"{'新模型':<8}{current / 2**20:>10.1f}{peak / 2**20:>10.1f}{current / videos:>10.0f}{elapsed:>10.2f}")
+
+    legacy, current_old, peak_old, elapsed_old = measure(lambda: to_legacy(courses))
+    print(f"{'旧模型':<8}{current_old / 2**20:>10.1f}{peak_old / 2**20:>10.1f}{current_old / videos:>10.0f}"
+          f"{elapsed_old:>10.2f}  （由扫描结果转换，耗时不含扫描）")
+    print(f"常驻内存减少 {current_old / current:.1f} 倍")
+
+    assert all(a == b for a, b in itertools.zip_longest(rows(courses), rows(legacy))), "新旧模型内容不一致"
+    print("内容一致")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""
+课程库快照基准
+
+用 library_model_bench 的合成课程库（只在内存中构造目录快照）扫描得到课程列表，
+保存为快照后重新映射加载，测量保存、加载与遍历全部视频的耗时，并校验加载结果与扫描结果一致。
+
+用法：python benchmarks/library_snapshot_bench.py [视频总数，默认 1000000]
+"""
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from library_model_bench import make_tree, rows  # noqa: E402
+from src.core.library_snapshot import load_library, save_library, snapshot_path  # noqa: E402
+from src.core.scanner import DirectoryScanner  # noqa: E402
+from src.utils.config import config  # noqa: E402
+
+
+def main():
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    root = make_tree(Path("/library"), total)
+    scanner = DirectoryScanner()
+    scanner.check_nomedia = False
+
+    start = time.perf_counter()
+    courses = list(scanner._iter_directory(root))
+    scanned = time.perf_counter() - start
+
+    tmp = Path(tempfile.mkdtemp(prefix="library_snapshot_bench_"))
+    config.current_config['library_snapshot_dir'] = str(tmp)
+    try:
+        start = time.perf_counter()
+        assert save_library("bench", root.path, courses)
+        saved = time.perf_counter() - start
+        size = snapshot_path("bench").stat().st_size
+
+        start = time.perf_counter()
+        snapshot = load_library("bench")
+        loaded = time.perf_counter() - start
+
+        start = time.perf_counter()
+        count = sum(1 for _ in rows(snapshot.courses))
+        iterated = time.perf_counter() - start
+
+        print(f"{len(courses)} 门课程，{count} 个视频，快照 {size / 2**20:.1f} MB，单位：秒")
+        print(f"扫描（内存中的目录快照） {scanned:.2f}")
+        print(f"保存快照               {saved:.2f}")
+        print(f"加载快照               {loaded:.3f}")
+        print(f"遍历全部视频           {iterated:.2f}")
+
+        assert list(rows(courses)) == list(rows(snapshot.courses)), "快照内容与扫描结果不一致"
+        print("内容一致")
+    finally:
+        snapshot = None
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+"""
+自然排序键微基准
+
+按 docs/课程目录格式分类.md 中的命名风格生成视频路径，
+对比旧实现（每次调用时匹配正则、逐级遍历 parents）与 src/core/natural_sort 的耗时，
+并校验两者排序结果一致。
+
+用法：python benchmarks/natural_sort_bench.py [每种风格的视频数]
+"""
+import re
+import sys
+import timeit
+from pathlib import Path
+from types import SimpleNamespace
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.core import natural_sort  # noqa: E402
+
+ROOT = Path("/library/后端/C#/完整的C#大师课程 Complete C# Masterclass[普通话]/普通话Deepl")
+
+
+def _style_1(i):
+    # 1 - 你的第一个 C 程序与 Visual Studio 概述/1 - 引言.mp4
+    return [f"{i // 20 + 1} - 章节{i // 20}", f"{i + 1} - 引言{i}"]
+
+
+def _style_2(i):
+    # 01 - 简介/004 认识讲师.mp4
+    return [f"{i // 20 + 1:02d} - 简介{i // 20}", f"{i % 20 + 1:03d} 认识讲师{i}"]
+
+
+def _style_4(i):
+    # 01 - 简介/01 - module/6 - 引言.mp4
+    return [f"{i // 40 + 1:02d} - 简介", f"{i // 10 % 4 + 1:02d} - module", f"{i % 10} - 引言{i}"]
+
+
+def _style_dotted(i):
+    # 2. MODULE 1/1.SASS 简介/2.1.1.安装 Sass .mp4
+    major, minor, item = i // 40 + 1, i // 10 % 4 + 1, i % 10 + 1
+    return [f"{major}. MODULE {major}", f"{minor}.SASS 简介", f"{major}.{minor}.{item}.安装 Sass "]
+
+
+def _style_episode(i):
+    # Season 1/Part 3/EP05 标题.mp4
+    return [f"Season {i // 50 + 1}", f"Part {i // 10 % 5 + 1}", f"EP{i % 10 + 1:02d} 标题"]
+
+
+STYLES = {
+    "1 - 引言": _style_1,
+    "004 认识讲师": _style_2,
+    "三级目录": _style_4,
+    "2.1.1 点分层号": _style_dotted,
+    "EP/Part": _style_episode,
+}
+
+
+def make_videos(style, count):
+    videos = []
+    for i in range(count):
+        parts = style(i)
+        path = ROOT.joinpath(*parts[:-1], parts[-1] + ".mp4")
+        videos.append(SimpleNamespace(path=path, name=path.stem))
+    return videos
+
+
+# ---------- 旧实现（重构前各扫描器中的写法） ----------
+
+def legacy_top_dir_key(path):
+    def extract_number(filename):
+        match = re.match(r'^(\d+)(?:\s*-\s*|\s+|\-)?', filename)
+        if match:
+            return int(match.group(1))
+        return 999999
+
+    def sort_key(video):
+        top_level_dir = None
+        for parent in reversed(list(video.path.parents)):
+            if parent.parent == path:
+                top_level_dir = parent
+                break
+        top_dir_num = extract_number(top_level_dir.name) if top_level_dir else 999999
+        return (top_dir_num, extract_number(video.name), video.name)
+    return sort_key
+
+
+def legacy_dotted_dirs_key(language_root, depth):
+    def extract_numeric_tuple(name):
+        s = name.strip()
+        m = re.match(r'^(\d+(?:\.\d+)+)', s)
+        if m:
+            return tuple(int(p) for p in m.group(1).split('.'))
+        m2 = re.match(r'^(\d+)(?:\s*[-_\.]?\s*)?', s)
+        if m2:
+            return (int(m2.group(1)),)
+        return (999999,)
+
+    def key(video):
+        rel = video.path.parent
+        names = []
+        while rel != language_root and language_root in rel.parents and len(names) < depth:
+            names.append(rel.name)
+            rel = rel.parent
+        names.reverse()
+        if len(names) < depth:
+            names = names + (["0"] * (depth - len(names)))
+        seq = []
+        for n in names:
+            seq.extend(extract_numeric_tuple(n))
+        seq.extend(extract_numeric_tuple(video.name))
+        return (tuple(seq), video.name.lower())
+    return key
+
+
+def legacy_episode_dirs_key(path):
+    def extract_numeric_tuple_ep(name):
+        s = (name or "").strip()
+        m = re.search(r'(\d+(?:\.\d+)+)', s)
+        if m:
+            return tuple(int(p) for p in m.group(1).split('.'))
+        m = re.search(r'(?i)\b(?:ep|e|episode|part|p)\s*0*(\d+)\b', s)
+        if m:
+            return (int(m.group(1)),)
+        m = re.search(r'0*(\d+)', s)
+        if m:
+            return (int(m.group(1)),)
+        return (999999,)
+
+    def key(video):
+        names = []
+        curr = video.path.parent
+        while curr != path and path in curr.parents:
+            names.append(curr.name)
+            curr = curr.parent
+        names.reverse()
+        seq = []
+        for n in names:
+            seq.extend(extract_numeric_tuple_ep(n))
+        seq.extend(extract_numeric_tuple_ep(video.name))
+        return (tuple(seq), video.name.lower())
+    return key
+
+
+KEYS = {
+    "top_dir_key": (legacy_top_dir_key(ROOT), natural_sort.top_dir_key(ROOT)),
+    "dotted_dirs_key": (legacy_dotted_dirs_key(ROOT, 3), natural_sort.dotted_dirs_key(ROOT, 3)),
+    "episode_dirs_key": (legacy_episode_dirs_key(ROOT), natural_sort.episode_dirs_key(ROOT)),
+}
+
+
+def clear_caches():
+    natural_sort.leading_number.cache_clear()
+    natural_sort.dotted_prefix.cache_clear()
+    natural_sort.episode_numbers.cache_clear()
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 3000
+    print(f"每种风格 {count} 个视频，单位：毫秒（取 5 次最小值）")
+    print(f"{'命名风格':<16}{'排序键':<20}{'旧实现':>10}{'新实现':>10}{'加速比':>8}")
+    for style_name, style in STYLES.items():
+        videos = make_videos(style, count)
+        for key_name, (legacy, current) in KEYS.items():
+            assert sorted(videos, key=legacy) == sorted(videos, key=current), (style_name, key_name)
+            old = min(timeit.repeat(lambda: sorted(videos, key=legacy), number=1, repeat=5))
+            # 每次计时前清空缓存，测量的是首次排序（冷缓存）的耗时
+            new = min(timeit.repeat(lambda: sorted(videos, key=current), setup=clear_caches, number=1, repeat=5))
+            print(f"{style_name:<16}{key_name:<20}{old * 1000:>10.1f}{new * 1000:>10.1f}{old / new:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
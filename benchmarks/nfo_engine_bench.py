@@ -0,0 +1,160 @@
+"""
+NFO生成引擎基准
+
+在临时目录中构造合成课程库（每门课程 10 个章节，每章 100 个视频，视频文件本身不需要存在），
+分别用旧实现（重构前 BatchNFOGenerator：ElementTree -> minidom 美化 -> 文本写入，每次都重写）
+与当前的 BatchNFOGenerator（模板序列化、内容未变化不写入、原子替换、并发写入）生成 NFO，
+比较首次生成与重复生成的耗时，并校验两者生成的文件逐字节一致。
+
+用法：python benchmarks/nfo_engine_bench.py [视频总数，默认 50000] [写入线程数，默认读取配置]
+"""
+import contextlib
+import io
+import shutil
+import sys
+import tempfile
+import time
+import xml.etree.ElementTree as ET
+from pathlib import Path
+from xml.dom import minidom
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.core.batch_nfo_generator import BatchNFOGenerator  # noqa: E402
+from src.core.nfo_write_pool import NFOWritePool  # noqa: E402
+from src.core.scanner import Chapter, VideoFile  # noqa: E402
+from src.utils.config import config  # noqa: E402
+
+CHAPTERS_PER_COURSE = 10
+VIDEOS_PER_CHAPTER = 100
+
+
+def make_library(root, total):
+    """创建目录结构，返回 [(课程目录, 语言目录, 章节列表)]"""
+    courses = []
+    per_course = CHAPTERS_PER_COURSE * VIDEOS_PER_CHAPTER
+    for c in range((total + per_course - 1) // per_course):
+        course_path = root / f"分类{c % 5}" / f"示例课程 Course{c} [普通话]"
+        language_path = course_path / "普通话Deepl"
+        chapters = []
+        episode = 0
+        for k in range(CHAPTERS_PER_COURSE):
+            chapter_dir = language_path / f"{k + 1:02d} - 章节 & <{k}>"
+            chapter_dir.mkdir(parents=True)
+            videos = []
+            for i in range(VIDEOS_PER_CHAPTER):
+                episode += 1
+                name = f"{i + 1:03d} 第\"{i}\"讲"
+                videos.append(VideoFile(chapter_dir / f"{name}.mp4", name, i + 1, episode))
+            chapters.append(Chapter(f"{k + 1:02d} - 章节 & <{k}>", videos))
+        courses.append((course_path, language_path, chapters))
+    return courses
+
+
+# ---------- 旧实现（重构前 BatchNFOGenerator 的写法） ----------
+
+class LegacyBatchNFOGenerator:
+    def __init__(self):
+        self.overwrite = True
+        self.original_dir_names = {"原"}
+
+    def generate_course_nfos(self, course_path, language_path, chapters, is_mandarin=True):
+        self._generate_tvshow_nfo(course_path, language_path, chapters, is_mandarin)
+        language_label = self._get_language_label(language_path.name, is_mandarin)
+        for chapter in chapters:
+            self._generate_chapter_episode_nfos(chapter, language_label)
+
+    def _generate_tvshow_nfo(self, course_path, language_path, chapters, is_mandarin):
+        nfo_path = language_path / "tvshow.nfo"
+        if not nfo_path.exists() or self.overwrite:
+            root = ET.Element("tvshow")
+            title = ET.SubElement(root, "title")
+            course_name = course_path.name
+            if "[" in course_name:
+                course_name = course_name.split("[")[0].strip()
+            language_label = self._get_language_label(language_path.name, is_mandarin)
+            title.text = f"{course_name} {language_label}"
+            plot = ET.SubElement(root, "plot")
+            total_videos = sum(len(chapter.videos) for chapter in chapters)
+            plot.text = f"课程：{course_path.name}\n总集数：{total_videos}\n语言：{language_label}"
+            genre = ET.SubElement(root, "genre")
+            genre.text = "普通话" if is_mandarin else "英语"
+            self._write_xml(root, nfo_path)
+
+    def _get_language_label(self, dir_name, is_mandarin):
+        dir_name = (dir_name or "").strip()
+        if dir_name in self.original_dir_names or dir_name == "原":
+            return "英语"
+        if is_mandarin:
+            return dir_name or "普通话"
+        return dir_name or "英语"
+
+    def _generate_chapter_episode_nfos(self, chapter, language_label, parent_chapter_name=""):
+        chapter_name = f"{parent_chapter_name} - {chapter.name}" if parent_chapter_name else chapter.name
+        for video in chapter.videos:
+            nfo_path = video.path.with_suffix('.nfo')
+            if not nfo_path.exists() or self.overwrite:
+                root = ET.Element("episodedetails")
+                title = ET.SubElement(root, "title")
+                title.text = video.name
+                plot = ET.SubElement(root, "plot")
+                base = f"章节：{chapter_name}" if chapter_name else ""
+                plot.text = f"{base}\n语言：{language_label}" if base else f"语言：{language_label}"
+                season = ET.SubElement(root, "season")
+                season.text = "1"
+                episode = ET.SubElement(root, "episode")
+                episode.text = str(video.global_episode_number)
+                self._write_xml(root, nfo_path)
+        for sub_chapter in chapter.sub_chapters or []:
+            self._generate_chapter_episode_nfos(sub_chapter, language_label, chapter_name)
+
+    def _write_xml(self, root, path):
+        xml_str = minidom.parseString(ET.tostring(root, 'utf-8')).toprettyxml(indent="  ")
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(xml_str)
+
+
+def run(generator, courses):
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for course_path, language_path, chapters in courses:
+            generator.generate_course_nfos(course_path, language_path, chapters, True)
+    return time.perf_counter() - start
+
+
+def read_nfos(root):
+    return {p.relative_to(root): p.read_bytes() for p in root.rglob("*.nfo")}
+
+
+def main():
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else None
+    # 不记录撤销日志：基准只测量生成本身，也不在数据目录中留下日志
+    config.current_config['nfo_journal_dir'] = ''
+    tmp = Path(tempfile.mkdtemp(prefix="nfo_engine_bench_"))
+    try:
+        old_root, new_root = tmp / "old", tmp / "new"
+        old_courses = make_library(old_root, total)
+        new_courses = make_library(new_root, total)
+
+        legacy = LegacyBatchNFOGenerator()
+        current = BatchNFOGenerator()
+        if workers is not None:
+            current.pool = NFOWritePool(current.writer, workers)
+        print(f"{len(old_courses)} 门课程，{total} 个视频，写入线程 {current.pool.workers}，单位：秒")
+        print(f"{'':<10}{'旧实现':>10}{'新引擎':>10}{'加速比':>8}")
+
+        old, new = run(legacy, old_courses), run(current, new_courses)
+        print(f"{'首次生成':<10}{old:>10.2f}{new:>10.2f}{old / new:>7.1f}x  {current.writer.stats}")
+        current.writer.reset()
+        old, new = run(legacy, old_courses), run(current, new_courses)
+        print(f"{'重复生成':<10}{old:>10.2f}{new:>10.2f}{old / new:>7.1f}x  {current.writer.stats}")
+
+        assert read_nfos(old_root) == read_nfos(new_root), "新旧实现生成的 NFO 不一致"
+        print("输出一致")
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
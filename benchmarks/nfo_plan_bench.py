@@ -0,0 +1,119 @@
+"""
+增量计划基准
+
+在临时目录中构造两份相同的合成课程库并完整生成一次 NFO，随后在每个 tvshow.nfo 的描述中
+加入手动编辑的内容、为每个章节增加视频，再以增量模式（nfo_incremental）分别：
+直接生成，以及生成计划（导出为 JSONL 再读入）后执行计划。
+比较两种方式的耗时，并校验两份课程库的 NFO 逐字节一致、手动编辑的内容均被保留。
+
+用法：python benchmarks/nfo_plan_bench.py [视频总数，默认 20000]
+"""
+import contextlib
+import io
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.core.batch_nfo_generator import BatchNFOGenerator  # noqa: E402
+from src.core.nfo_plan import NFOPlan  # noqa: E402
+from src.core.scanner import Chapter, VideoFile  # noqa: E402
+from src.utils.config import config  # noqa: E402
+
+CHAPTERS_PER_COURSE = 10
+VIDEOS_PER_CHAPTER = 50
+USER_EDIT = "手动编辑的简介"
+
+
+def make_courses(root, total, extra=0):
+    """创建目录结构，返回 [(课程目录, 语言目录, 章节列表)]；extra 为每章额外增加的视频数"""
+    courses = []
+    per_course = CHAPTERS_PER_COURSE * VIDEOS_PER_CHAPTER
+    for c in range((total + per_course - 1) // per_course):
+        course_path = root / f"分类{c % 5}" / f"示例课程 Course{c} [普通话]"
+        language_path = course_path / "普通话Deepl"
+        chapters = []
+        episode = 0
+        for k in range(CHAPTERS_PER_COURSE):
+            chapter_dir = language_path / f"{k + 1:02d} - 章节{k}"
+            chapter_dir.mkdir(parents=True, exist_ok=True)
+            videos = []
+            for i in range(VIDEOS_PER_CHAPTER + extra):
+                episode += 1
+                name = f"{i + 1:03d} 第{i}讲"
+                videos.append(VideoFile(chapter_dir / f"{name}.mp4", name, i + 1, episode))
+            chapters.append(Chapter(f"{k + 1:02d} - 章节{k}", videos))
+        courses.append((course_path, language_path, chapters))
+    return courses
+
+
+def generate(courses, incremental):
+    generator = BatchNFOGenerator()
+    generator.incremental = incremental
+    for course_path, language_path, chapters in courses:
+        generator.generate_course_nfos(course_path, language_path, chapters, True)
+    generator.pool.wait()
+    return generator
+
+
+def edit_tvshows(root):
+    """模拟在编辑界面中修改描述"""
+    for path in root.rglob("tvshow.nfo"):
+        path.write_bytes(path.read_bytes().replace("<plot>".encode("utf-8"),
+                                                   f"<plot>{USER_EDIT}\n".encode("utf-8"), 1))
+
+
+def read_nfos(root):
+    return {p.relative_to(root): p.read_bytes() for p in root.rglob("*.nfo")}
+
+
+def main():
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    # 不记录撤销日志：只测量生成本身
+    config.current_config['nfo_journal_dir'] = ''
+    tmp = Path(tempfile.mkdtemp(prefix="nfo_plan_bench_"))
+    try:
+        direct_root, planned_root = tmp / "direct", tmp / "planned"
+        with contextlib.redirect_stdout(io.StringIO()):
+            for root in (direct_root, planned_root):
+                generate(make_courses(root, total), incremental=False)
+                edit_tvshows(root)
+        direct_courses = make_courses(direct_root, total, extra=1)
+        planned_courses = make_courses(planned_root, total, extra=1)
+        print(f"{len(direct_courses)} 门课程，{total} 个视频（每章新增 1 个），单位：秒")
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            generate(direct_courses, incremental=True)
+            direct = time.perf_counter() - start
+
+            start = time.perf_counter()
+            plan = NFOPlan()
+            generator = BatchNFOGenerator()
+            generator.incremental = True
+            with generator.writer.planning(plan):
+                for course_path, language_path, chapters in planned_courses:
+                    generator.generate_course_nfos(course_path, language_path, chapters, True)
+            planned = time.perf_counter() - start
+            plan_file = tmp / "plan.jsonl"
+            plan.save(plan_file)
+            start = time.perf_counter()
+            stats = NFOPlan.load(plan_file).apply()
+            applied = time.perf_counter() - start
+        print(f"直接增量生成 {direct:.2f}，生成计划 {planned:.2f} + 执行计划 {applied:.2f}  {stats}")
+        print(f"计划：{plan.summary()}")
+
+        direct_nfos, planned_nfos = read_nfos(direct_root), read_nfos(planned_root)
+        assert direct_nfos == planned_nfos, "执行计划与直接增量生成的 NFO 不一致"
+        tvshows = [data for path, data in planned_nfos.items() if path.name == "tvshow.nfo"]
+        assert all(USER_EDIT.encode("utf-8") in data for data in tvshows), "执行计划丢失了手动编辑的描述"
+        print("输出一致，手动编辑的描述均保留")
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,70 @@
 """
 课程NFO管理器入口
 """
+import argparse
 import sys
 from pathlib import Path
-from src.gui.main_window import MainWindow
 
 def main():
     """程序入口"""
+    parser = argparse.ArgumentParser(description="课程NFO管理器")
+    parser.add_argument("--watch", metavar="DIR", help="监视目录，课程变化时自动更新NFO（不启动界面）")
+    parser.add_argument("--debounce", type=float, default=5.0, help="监视模式下事件合并的静默秒数")
+    parser.add_argument("--plan", metavar="DIR", help="只生成计划不写入：列出将新建、覆盖、保持不变的NFO")
+    parser.add_argument("--plan-out", metavar="FILE", default="nfo_plan.jsonl", help="计划导出的 JSONL 文件")
+    parser.add_argument("--apply", metavar="FILE", help="执行 --plan 导出的计划")
+    parser.add_argument("--verify", metavar="DIR", help="检查目录下已有NFO的集数与总集数是否与当前视频一致（不写入）")
+    parser.add_argument("--verify-out", metavar="FILE", default="nfo_verify.jsonl", help="检查报告的 JSONL 文件")
+    parser.add_argument("--undo", metavar="FILE", nargs="?", const="latest",
+                        help="按撤销日志撤销一次生成运行，不指定文件时撤销最近一次尚未撤销的运行")
+    args = parser.parse_args()
+
+    if args.plan:
+        from src.core.nfo_plan import plan_directory
+        plan = plan_directory(Path(args.plan))
+        plan.save(args.plan_out)
+        print(f"计划已保存到 {args.plan_out}：{plan.summary()}")
+        return
+
+    if args.apply:
+        from src.core.nfo_plan import NFOPlan
+        stats = NFOPlan.load(args.apply).apply()
+        print(f"计划执行完成：{stats}")
+        return
+
+    if args.verify:
+        from src.core.nfo_verify import verify_library
+        summary = verify_library(Path(args.verify), args.verify_out)
+        print(f"检查完成：{summary}，报告已保存到 {args.verify_out}")
+        # 有问题时以非零状态退出，便于定时任务判断
+        sys.exit(0 if summary.ok else 1)
+
+    if args.undo:
+        from src.core.nfo_journal import last_undoable_run, undo_run
+        journal = args.undo
+        if journal == "latest":
+            journal = last_undoable_run()
+            if journal is None:
+                print("没有可撤销的生成运行")
+                return
+        try:
+            stats = undo_run(journal)
+        except ValueError as e:
+            print(e)
+            return
+        print(f"撤销完成：{stats}")
+        return
+
+    if args.watch:
+        from src.core.watcher import CourseWatchService
+        service = CourseWatchService(Path(args.watch), debounce=args.debounce)
+        try:
+            service.run()
+        except KeyboardInterrupt:
+            print("已停止监视")
+        return
+
+    from src.gui.main_window import MainWindow
     # 创建并显示主窗口
     window = MainWindow()
     window.run()
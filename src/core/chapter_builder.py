@@ -0,0 +1,122 @@
+"""
+章节构建模块
+
+先按所在目录将视频一次性分桶，再根据目录结构构建章节树，
+避免为每个章节目录遍历全部视频。各扫描器共用此模块。
+构建完成后章节树交给 pack_chapters() 压缩为视频表中的区间（见 library_model）。
+"""
+from pathlib import Path
+from typing import Collection, Dict, Iterable, List, Union
+from .dir_snapshot import DirNode
+from .library_model import Chapter, VideoFile, pack_chapters
+
+
+def group_by_parent(videos: Iterable[VideoFile]) -> Dict[Path, List[VideoFile]]:
+    """按所在目录分组视频，组内保持原有顺序"""
+    buckets: Dict[Path, List[VideoFile]] = {}
+    for video in videos:
+        parent = video.parent
+        bucket = buckets.get(parent)
+        if bucket is None:
+            buckets[parent] = [video]
+        else:
+            bucket.append(video)
+    return buckets
+
+
+class ChapterBuilder:
+    """基于目录分桶的章节构建器
+
+    Args:
+        all_videos: 所有视频文件（已排序且已设置全局集数）
+        skip_names: 构建时跳过的目录名（如课程内部再次出现的语言目录）
+    """
+
+    def __init__(self, all_videos: Iterable[VideoFile], skip_names: Collection[str] = ()):
+        self.skip_names = skip_names
+        self._buckets = group_by_parent(all_videos)
+
+    def videos_in(self, path: Path) -> List[VideoFile]:
+        """目录下直接包含的视频"""
+        return list(self._buckets.get(path, ()))
+
+    def _chapter_dirs(self, node: DirNode) -> List[DirNode]:
+        return [d for d in node.sorted_dirs() if d.name not in self.skip_names]
+
+    def _dir_chapters(self, node: DirNode) -> List[Chapter]:
+        """每个包含视频的子目录作为一个章节"""
+        chapters = []
+        for chapter_dir in self._chapter_dirs(node):
+            videos = self.videos_in(chapter_dir.path)
+            if videos:
+                chapters.append(Chapter(name=chapter_dir.name, videos=videos))
+        return chapters
+
+    def build(self, path: Union[Path, DirNode], structure_type: int) -> List[Chapter]:
+        """按结构类型构建章节
+
+        1: 一级结构，2: 二级结构，4: 混合结构（根目录视频 + 二级目录视频），
+        其它值按三级结构处理。
+        """
+        return pack_chapters(self._build(DirNode.of(path), structure_type))
+
+    def _build(self, node: DirNode, structure_type: int) -> List[Chapter]:
+        if structure_type == 1:
+            # 一级结构：直接返回视频列表
+            return [Chapter(name="", videos=self.videos_in(node.path))]
+
+        if structure_type == 2:
+            # 二级结构：每个目录是一个章节
+            return self._dir_chapters(node)
+
+        if structure_type == 4:
+            # 混合结构：根目录视频作为第一个章节，然后是二级目录视频
+            chapters = []
+            root_videos = self.videos_in(node.path)
+            if root_videos:
+                chapters.append(Chapter(name="根目录", videos=root_videos))
+            chapters.extend(self._dir_chapters(node))
+            return chapters
+
+        # 三级结构：大章节下包含小章节
+        chapters = []
+        for major_chapter in self._chapter_dirs(node):
+            sub_chapters = self._dir_chapters(major_chapter)
+            if sub_chapters:
+                chapters.append(Chapter(
+                    name=major_chapter.name,
+                    videos=[],
+                    sub_chapters=sub_chapters
+                ))
+        return chapters
+
+    def build_tree(self, path: Union[Path, DirNode], depth: int) -> List[Chapter]:
+        """递归构建深度为 depth 的章节树
+
+        在不超过 depth 的任一层，目录中存在视频则直接挂载到该层对应的章节；
+        根目录自身的视频作为无名章节放在最前。
+        """
+        def build_children(parent: DirNode, level: int) -> List[Chapter]:
+            result: List[Chapter] = []
+            if level > 0 and parent.name in self.skip_names:
+                return result
+
+            try:
+                for sub in self._chapter_dirs(parent):
+                    vids = self.videos_in(sub.path)
+                    sub_chapters: List[Chapter] = []
+                    if level + 1 < depth:
+                        sub_chapters = build_children(sub, level + 1)
+                    if vids or sub_chapters:
+                        result.append(Chapter(name=sub.name, videos=vids, sub_chapters=sub_chapters))
+            except Exception:
+                pass
+
+            if level == 0:
+                root_videos = self.videos_in(parent.path)
+                if root_videos:
+                    result.insert(0, Chapter(name="", videos=root_videos, sub_chapters=[]))
+
+            return result
+
+        return pack_chapters(build_children(DirNode.of(path), 0))
@@ -2,30 +2,24 @@
 课程批量查找模块
 """
 from pathlib import Path
-from typing import List, Tuple, Optional
-from dataclasses import dataclass, field
+from typing import Iterator, List, Tuple, Optional, Union
 import os
-
-@dataclass
-class CourseInfo:
-    """课程信息"""
-    path: Path
-    name: str
-    has_mandarin: bool
-    has_original: bool
-    lesson_files: List[Path]
-    mandarin_paths: List[Path] = field(default_factory=list)
-    original_path: Optional[Path] = None
+from .dir_snapshot import DirNode, open_tree
+from .library_model import CourseInfo
+from .nfo_engine import MANDARIN_DIR_NAMES, ORIGINAL_DIR_NAMES
+from ..utils.config import config
 
 class CourseBatchFinder:
     """课程批量查找器"""
     
     def __init__(self):
         # 兼容不同的普通话目录命名（可由GUI在运行时扩展）
-        self.mandarin_dir_names = {"普通话Deepl", "普通话DeepL", "普通话DeepL[男声]", "普通话DeepL[女声]", "普通话OpenAI-4o-mini", "普通话gemini"}
+        self.mandarin_dir_names = set(MANDARIN_DIR_NAMES)
         # 兼容可能的原版目录命名（目前以“原”为主，后续可扩展）
-        self.original_dir_names = {"原"}
+        self.original_dir_names = set(ORIGINAL_DIR_NAMES)
         self.lesson_file_name = "lession"  # 课程标识文件名称
+        self.max_workers = config.get('scan_workers')  # 并发列出目录的线程数
+        self.scan_index = None  # 可选的持久化扫描索引（ScanIndex）
     
     def find_courses_with_lession(self, root_path: Path) -> List[CourseInfo]:
         """递归查找包含lession文件的课程目录
@@ -37,37 +31,59 @@ class CourseBatchFinder:
             找到的课程信息列表
         """
         courses = []
-        self._scan_directory_recursive(root_path, courses)
+        with open_tree(root_path, self.max_workers, self.scan_index) as root:
+            self._scan_directory_recursive(root, courses)
         return courses
     
-    def _scan_directory_recursive(self, current_path: Path, courses: List[CourseInfo]):
+    def iter_courses_with_lession(self, root_path: Path) -> Iterator[CourseInfo]:
+        """流式查找：每找到一个课程立即产出，扫描完的子目录快照随即释放
+        
+        Args:
+            root_path: 根目录路径
+        """
+        with open_tree(root_path, self.max_workers, self.scan_index) as root:
+            yield from self._iter_directory(root, release=True)
+    
+    def _scan_directory_recursive(self, current_path: Union[Path, DirNode], courses: List[CourseInfo]):
         """递归扫描目录
         
         Args:
             current_path: 当前扫描的目录
             courses: 课程信息列表
         """
+        courses.extend(self._iter_directory(current_path))
+    
+    def _iter_directory(self, current_path: Union[Path, DirNode], release: bool = False) -> Iterator[CourseInfo]:
+        """递归扫描目录，按顺序产出课程
+        
+        Args:
+            current_path: 当前扫描的目录
+            release: 子目录扫描完后是否释放其快照
+        """
+        node = DirNode.of(current_path)
+        current_path = node.path
         try:
             # 检查当前目录是否包含lession文件
-            if self._is_course_directory(current_path):
+            if self._is_course_directory(node):
                 # 如果包含lession文件，则这是一个课程目录
-                course_info = self._create_course_info(current_path)
+                course_info = self._create_course_info(node)
                 if course_info:
-                    courses.append(course_info)
+                    yield course_info
                 # 找到课程目录后，不再递归扫描其子目录
                 return
             
             # 如果不是课程目录，继续递归扫描子目录
-            for item in current_path.iterdir():
-                if item.is_dir():
-                    self._scan_directory_recursive(item, courses)
+            for item in node.dirs:
+                yield from self._iter_directory(item, release)
+                if release:
+                    item.release()
                     
         except PermissionError:
             print(f"权限不足，无法访问目录: {current_path}")
         except Exception as e:
             print(f"扫描目录时出错 {current_path}: {e}")
     
-    def _is_course_directory(self, path: Path) -> bool:
+    def _is_course_directory(self, path: Union[Path, DirNode]) -> bool:
         """检测目录是否包含lession文件
         
         Args:
@@ -78,14 +94,20 @@ class CourseBatchFinder:
         """
         try:
             # 检查是否存在lession文件（不区分大小写）
-            for item in path.iterdir():
-                if item.is_file() and item.name.lower() == self.lesson_file_name.lower():
-                    return True
-            return False
+            return bool(self._find_lesson_files(DirNode.of(path)))
         except Exception:
             return False
     
-    def _create_course_info(self, path: Path) -> Optional[CourseInfo]:
+    def _find_lesson_files(self, node: DirNode) -> List[Path]:
+        """查找目录下的lession文件（不区分大小写）"""
+        lesson_name = self.lesson_file_name.lower()
+        return [node.path / name for name in node.files if name.lower() == lesson_name]
+    
+    def scan_course(self, course_path: Path) -> Optional[CourseInfo]:
+        """重新识别单个课程目录（如快照中的课程已过期），不再是课程时返回None"""
+        return self._create_course_info(course_path)
+    
+    def _create_course_info(self, path: Union[Path, DirNode]) -> Optional[CourseInfo]:
         """创建课程信息
         
         Args:
@@ -94,21 +116,20 @@ class CourseBatchFinder:
         Returns:
             课程信息对象，如果无效则返回None
         """
+        node = DirNode.of(path)
+        path = node.path
         try:
             # 获取课程名称
             course_name = path.name
             
             # 查找lession文件
-            lesson_files = []
-            for item in path.iterdir():
-                if item.is_file() and item.name.lower() == self.lesson_file_name.lower():
-                    lesson_files.append(item)
+            lesson_files = self._find_lesson_files(node)
             
             if not lesson_files:
                 return None
             
             # 检查语言目录并解析实际路径
-            mandarin_paths, original_path = self._resolve_language_directories(path)
+            mandarin_paths, original_path = self._resolve_language_directories(node)
             has_mandarin = bool(mandarin_paths)
             has_original = original_path is not None
             
@@ -126,7 +147,7 @@ class CourseBatchFinder:
             print(f"创建课程信息时出错 {path}: {e}")
             return None
     
-    def _resolve_language_directories(self, path: Path) -> Tuple[List[Path], Optional[Path]]:
+    def _resolve_language_directories(self, path: Union[Path, DirNode]) -> Tuple[List[Path], Optional[Path]]:
         """解析课程目录中的语言子目录，返回实际路径
         
         Args:
@@ -138,15 +159,13 @@ class CourseBatchFinder:
         try:
             mandarin_paths = []
             original_path = None
-            for item in path.iterdir():
-                if not item.is_dir():
-                    continue
+            for item in DirNode.of(path).dirs:
                 # 普通话目录匹配（两种命名）
                 if item.name in self.mandarin_dir_names:
-                    mandarin_paths.append(item)
+                    mandarin_paths.append(item.path)
                 # 原版目录匹配（当前仅“原”）
                 if item.name in self.original_dir_names:
-                    original_path = item
+                    original_path = item.path
             mandarin_paths.sort(key=lambda p: p.name)
             return mandarin_paths, original_path
         except Exception:
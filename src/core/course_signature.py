@@ -0,0 +1,381 @@
+"""
+课程签名模块
+
+为每部 tvshow（课程或课程的一个语言版本）计算两种签名，保存在 tvshow.nfo 旁的签名文件中
+（配置 course_signature_file）：
+
+- 目录戳：tvshow 目录及其下各目录的 mtime。只需 stat 目录，
+  使用扫描索引时目录列表直接复用，不读取任何文件信息；
+- 内容签名：按相对路径排序的视频路径与大小、tvshow 目录名（语言目录）以及生成设置的哈希，
+  大小取自目录列表（DirEntry），只在目录戳变化时计算。
+
+目录戳按目录逐级汇总（Merkle 树）：上级目录的目录戳由其下各子目录的目录戳计算，同样保存在该目录中。
+自上而下比较，目录戳一致的目录整棵跳过，不再计算其中任何课程的内容签名、也不再读取课程的签名文件。
+目录戳变化但内容签名一致（且 tvshow.nfo 与每个视频的 NFO 都还在）的课程同样跳过，只更新目录戳。
+原地覆盖写入、不改变目录 mtime 的视频不会被发现（与扫描索引相同）。
+
+生成 NFO 会改变视频目录的 mtime，因此签名文件在生成完成后重新测量再写入；
+有写入失败、NFO 不完整或生成期间内容发生变化的课程（及其上级目录）不写入，下次仍会重新生成。
+签名文件先创建再测量，内容原地改写（长度固定），不改变 tvshow 目录的 mtime。
+"""
+import hashlib
+import os
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+from .dir_snapshot import DirNode
+from ..utils.config import config
+
+if TYPE_CHECKING:
+    from .scan_index import ScanIndex
+
+_VERSION = "2"  # 签名算法或签名文件格式变化时修改，旧签名全部失效
+
+
+@dataclass
+class ShowSignature:
+    """一部 tvshow 的签名"""
+    nfo_dir: Path
+    digest: str  # 内容签名
+    stamp: str  # 目录戳
+    complete: bool  # tvshow.nfo 与每个视频的 NFO 是否都已存在
+    videos: int
+
+
+def signature_file_name() -> str:
+    """签名文件名，未配置时为空字符串（不使用签名）"""
+    return config.get('course_signature_file') or ""
+
+
+def generator_settings(generator) -> List[str]:
+    """影响生成结果的生成器设置，计入签名"""
+    policy = generator.policy
+    return [type(policy).__name__, getattr(policy, "genre", ""),
+            "compact" if generator.writer.resolve_compact() else "pretty"]
+
+
+def _update(digest, *parts: str) -> None:
+    for part in parts:
+        digest.update(part.encode("utf-8", "surrogatepass"))
+        digest.update(b"\0")
+
+
+def _walk(node: DirNode, prune: Optional[Callable[[DirNode], bool]],
+          max_depth: Optional[int]) -> Iterator[Tuple[DirNode, int]]:
+    """遍历 tvshow 中参与签名的目录（与生成时收集视频的规则一致），产出 (目录快照, 层级)"""
+    stack = [(node, 0)]
+    while stack:
+        current, level = stack.pop()
+        yield current, level
+        if max_depth is None or level < max_depth:
+            for child in current.dirs:
+                if not child.is_symlink and not (prune and prune(child)):
+                    stack.append((child, level + 1))
+
+
+def _stamp(node: DirNode, settings: List[str], dirs: List[Tuple[str, int]]) -> str:
+    """目录戳：增删或重命名视频、删除 NFO 都会改变所在目录的 mtime"""
+    digest = hashlib.sha1()
+    _update(digest, _VERSION, node.name, *settings)
+    for relative, mtime_ns in sorted(dirs):
+        _update(digest, relative, str(mtime_ns))
+    return digest.hexdigest()
+
+
+def show_stamp(nfo_dir, settings: Iterable[str] = (), prune: Optional[Callable[[DirNode], bool]] = None,
+               max_depth: Optional[int] = None) -> str:
+    """只计算一部 tvshow 的目录戳（只列出目录，不读取文件大小），参数见 show_signature()"""
+    node = DirNode.of(nfo_dir)
+    dirs = [(current.path.relative_to(node.path).as_posix(), current.mtime_ns)
+            for current, _ in _walk(node, prune, max_depth)]
+    return _stamp(node, list(settings), dirs)
+
+
+def show_signature(nfo_dir, settings: Iterable[str] = (), prune: Optional[Callable[[DirNode], bool]] = None,
+                   max_depth: Optional[int] = None, video_extensions: Optional[Iterable[str]] = None) -> ShowSignature:
+    """计算一部 tvshow 的内容签名与目录戳
+
+    Args:
+        nfo_dir: tvshow.nfo 所在目录，或其目录快照
+        settings: 影响生成结果的其它设置（标题、语种、分类等）
+        prune: 返回 True 的子目录整棵跳过（与生成时收集视频的规则一致）
+        max_depth: 只统计不超过这一层级的视频，None 时不限
+        video_extensions: 视为视频的扩展名，None 时使用配置
+    """
+    node = DirNode.of(nfo_dir)
+    settings = list(settings)
+    extensions = {ext.lower() for ext in (video_extensions or config.get('video_extensions'))}
+    entries = []
+    dirs = []
+    complete = node.has_file("tvshow.nfo")
+    for current, _ in _walk(node, prune, max_depth):
+        relative_dir = current.path.relative_to(node.path).as_posix()
+        dirs.append((relative_dir, current.mtime_ns))
+        files = current.files
+        names = set(files)
+        sizes = None
+        for name in files:
+            stem, ext = os.path.splitext(name)
+            if ext.lower() not in extensions:
+                continue
+            if sizes is None:
+                sizes = current.file_sizes()
+            relative = name if relative_dir == "." else f"{relative_dir}/{name}"
+            entries.append((relative, sizes.get(name, -1)))
+            if f"{stem}.nfo" not in names:
+                complete = False
+
+    entries.sort()
+    digest = hashlib.sha1()
+    _update(digest, _VERSION, node.name, *settings)
+    for relative, size in entries:
+        _update(digest, relative, str(size))
+    return ShowSignature(node.path, digest.hexdigest(), _stamp(node, settings, dirs), complete, len(entries))
+
+
+def _store(path: Path, content: bytes) -> None:
+    """原地改写签名文件（不存在时创建）：改写已有文件的内容不会改变所在目录的 mtime
+
+    不是原子写入，中断时文件内容无法解析，下次视为没有签名、重新生成。
+    """
+    try:
+        f = open(path, 'r+b')
+    except FileNotFoundError:
+        f = open(path, 'wb')
+    with f:
+        f.write(content)
+        f.truncate()
+
+
+def read_signature(directory: Path) -> Optional[Tuple[str, str]]:
+    """读取目录中保存的 (内容签名, 目录戳)，没有或无法读取时返回 None（上级目录的内容签名为一串 "-"）"""
+    try:
+        with open(directory / signature_file_name(), 'r', encoding='utf-8') as f:
+            parts = f.read().split()
+    except (OSError, UnicodeDecodeError):
+        return None
+    return (parts[0], parts[1]) if len(parts) == 2 else None
+
+
+class SignatureTree:
+    """一次生成运行的签名树
+
+    用法：
+        tree = SignatureTree(scan_index=finder.scan_index)
+        tree.add(language_dir, settings, prune=...)
+        tree.compute()
+        for ...:
+            if tree.is_unchanged(language_dir):
+                continue
+            generate(tree.node(language_dir))
+            # 写入失败时 tree.fail(language_dir)
+        tree.commit()  # 全部写完后保存签名
+
+    叶子为各部 tvshow，汇总到所有 tvshow 目录的公共上级目录为止。
+    rollup 为 False 时不汇总，各 tvshow 单独比较，只写 tvshow 自己的签名文件，
+    可以多次 add()/compute()（边扫描边生成时逐个课程计算）；汇总时应只调用一次 compute()。
+    未配置签名文件名时 compute() 不做任何比较，所有课程都视为有变化，commit() 不写入。
+    """
+
+    def __init__(self, workers: Optional[int] = None, scan_index: Optional['ScanIndex'] = None,
+                 rollup: bool = True):
+        """
+        Args:
+            workers: 并发计算签名的线程数，None 时使用配置 nfo_read_workers
+            scan_index: 列出目录时使用的扫描索引，目录未变化时不再 scandir
+            rollup: 是否逐级汇总到公共上级目录
+        """
+        self.workers = workers or config.get('nfo_read_workers') or 1
+        self.enabled = bool(signature_file_name())
+        self.scan_index = scan_index
+        self.rollup = rollup
+        self.unchanged: Set[Path] = set()  # 可以跳过的 tvshow 目录
+        self._pending: List[Path] = []  # 已登记、尚未 compute() 的 tvshow
+        self._requests: Dict[Path, tuple] = {}  # tvshow 目录 -> 签名参数（不含目录快照）
+        self._nodes: Dict[Path, DirNode] = {}
+        self._show_stamps: Dict[Path, str] = {}
+        self._digests: Dict[Path, str] = {}  # 生成前计算的内容签名
+        self._stored: Dict[Path, Optional[str]] = {}  # 签名文件中的内容签名
+        self._children: Dict[Path, Set[Path]] = {}
+        self._parents: Dict[Path, Path] = {}
+        self._roots: List[Path] = []
+        self._stamps: Dict[Path, str] = {}  # 汇总后的目录戳
+        self._stale: List[Path] = []  # 签名文件需要更新的目录
+        self._failed: Set[Path] = set()
+
+    def add(self, nfo_dir: Path, settings: Iterable[str] = (), prune: Optional[Callable[[DirNode], bool]] = None,
+            max_depth: Optional[int] = None, video_extensions: Optional[Iterable[str]] = None) -> None:
+        """登记一部 tvshow，参数见 show_signature()"""
+        path = Path(nfo_dir)
+        self._nodes[path] = DirNode(path, scan_index=self.scan_index)
+        self._requests[path] = (list(settings), prune, max_depth, video_extensions)
+        self._pending.append(path)
+
+    def node(self, nfo_dir: Path) -> DirNode:
+        """计算签名时列出的目录快照，生成时复用（取出后不再保留）"""
+        return self._nodes.pop(Path(nfo_dir), None) or DirNode.of(nfo_dir)
+
+    def is_unchanged(self, nfo_dir: Path) -> bool:
+        return Path(nfo_dir) in self.unchanged
+
+    def fail(self, nfo_dir: Path) -> None:
+        """记录生成或写入失败的 tvshow，commit() 时不保存其（及上级目录的）签名"""
+        self._failed.add(Path(nfo_dir))
+
+    def _map(self, function, items: list) -> list:
+        if self.workers <= 1 or len(items) < 2:
+            return [function(item) for item in items]
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="signature") as executor:
+            return list(executor.map(function, items))
+
+    def _stamp_of(self, path: Path) -> str:
+        settings, prune, max_depth, _ = self._requests[path]
+        return show_stamp(self._nodes[path], settings, prune, max_depth)
+
+    def _signature_of(self, path: Path, node: Optional[DirNode] = None) -> ShowSignature:
+        settings, prune, max_depth, video_extensions = self._requests[path]
+        if node is None:
+            node = DirNode(path, scan_index=self.scan_index)
+        return show_signature(node, settings, prune, max_depth, video_extensions)
+
+    def compute(self) -> None:
+        """计算目录戳并逐级汇总，自上而下比较；目录戳变化的 tvshow 再比较内容签名"""
+        if not self.enabled or not self._pending:
+            return
+        shows, self._pending = self._pending, []
+        for path, stamp in zip(shows, self._map(self._stamp_of, shows)):
+            self._show_stamps[path] = stamp
+            self._children.setdefault(path, set())
+        roots = self._link(shows)
+        self._roots.extend(roots)
+
+        checks: List[Path] = []
+        for root in roots:
+            self._rollup(root)
+            self._compare(root, checks)
+        for path, signature in zip(checks, self._map(lambda path: self._signature_of(path, self._nodes[path]),
+                                                     checks)):
+            self._digests[path] = signature.digest
+            if signature.complete and signature.digest == self._stored.get(path):
+                # 内容未变化，只需更新目录戳
+                self.unchanged.add(path)
+        # 跳过的课程不再需要目录快照
+        for path in self.unchanged:
+            self._nodes.pop(path, None)
+        if self.scan_index is not None:
+            self.scan_index.flush()
+
+    def _link(self, shows: List[Path]) -> List[Path]:
+        """建立到公共上级目录的汇总树，返回根目录"""
+        if not self.rollup:
+            return list(shows)
+        try:
+            root = Path(os.path.commonpath([str(path) for path in shows]))
+        except ValueError:
+            # 不在同一驱动器（或混有相对路径）时不汇总，各课程单独比较
+            return list(shows)
+        for path in shows:
+            current = path
+            while current != root:
+                parent = current.parent
+                self._children.setdefault(parent, set()).add(current)
+                self._parents[current] = parent
+                current = parent
+        return [root]
+
+    def _rollup(self, directory: Path) -> None:
+        """自下而上汇总目录戳：自身的 tvshow 目录戳加上各子目录的目录戳"""
+        digest = hashlib.sha1()
+        _update(digest, _VERSION)
+        stamp = self._show_stamps.get(directory)
+        if stamp is not None:
+            _update(digest, "show", stamp)
+        for child in sorted(self._children[directory]):
+            self._rollup(child)
+            _update(digest, child.name, self._stamps[child])
+        self._stamps[directory] = digest.hexdigest()
+
+    def _compare(self, directory: Path, checks: List[Path]) -> None:
+        """自上而下比较目录戳，一致的目录整棵跳过；不一致的 tvshow 加入 checks 比较内容签名"""
+        stored = read_signature(directory)
+        if stored is not None and stored[1] == self._stamps[directory]:
+            self._mark_unchanged(directory)
+            return
+        self._stale.append(directory)
+        if directory in self._show_stamps:
+            self._stored[directory] = stored[0] if stored is not None else None
+            checks.append(directory)
+        for child in sorted(self._children[directory]):
+            self._compare(child, checks)
+
+    def _mark_unchanged(self, directory: Path) -> None:
+        if directory in self._show_stamps:
+            self.unchanged.add(directory)
+        for child in self._children[directory]:
+            self._mark_unchanged(child)
+
+    def commit(self) -> int:
+        """生成完成后保存有变化的签名
+
+        重新生成过的 tvshow 重新测量：写入失败、NFO 不完整或内容签名与生成前不一致的不保存，
+        其上级目录也不保存。
+
+        Returns:
+            写入的签名文件数
+        """
+        if not self.enabled:
+            return 0
+        stale, self._stale = self._stale, []
+        name = signature_file_name()
+        regenerated = []
+        created = []
+        blocked = {path for path in stale if path in self._failed}
+        for path in stale:
+            if path in self._show_stamps and path not in self.unchanged and path not in self._failed:
+                # 先创建签名文件，之后测量的 tvshow 目录 mtime 不再因写入签名而变化
+                try:
+                    if not (path / name).exists():
+                        _store(path / name, b"")
+                        created.append(path)
+                    regenerated.append(path)
+                except OSError as e:
+                    print(f"保存课程签名 {path} 时出错: {e}")
+                    blocked.add(path)
+        for path, signature in zip(regenerated, self._map(self._signature_of, regenerated)):
+            if signature.complete and signature.digest == self._digests.get(path):
+                self._show_stamps[path] = signature.stamp
+            else:
+                blocked.add(path)
+        for path in created:
+            if path in blocked:
+                try:
+                    os.remove(path / name)
+                except OSError:
+                    pass
+        for path in list(blocked):
+            while path in self._parents:
+                path = self._parents[path]
+                blocked.add(path)
+        for root in self._roots:
+            self._rollup(root)
+        if self.scan_index is not None:
+            self.scan_index.flush()
+
+        written = 0
+        for directory in stale:
+            if directory in blocked:
+                continue
+            digest = self._digests.get(directory, "-" * 40)
+            content = f"{digest} {self._stamps[directory]}\n"
+            try:
+                _store(directory / name, content.encode("ascii"))
+                written += 1
+            except OSError as e:
+                print(f"保存课程签名 {directory} 时出错: {e}")
+        return written
+
+    def __str__(self) -> str:
+        if not self.enabled:
+            return "未使用课程签名"
+        return f"签名未变化跳过 {len(self.unchanged)} 个，共 {len(self._show_stamps)} 个"
@@ -0,0 +1,245 @@
+"""
+目录快照模块
+
+基于 os.scandir 构建内存中的目录树快照：每个目录最多列出一次，
+并保留 DirEntry 提供的类型信息，避免反复调用 exists()/is_dir()。
+
+可选地绑定线程池：访问某个目录的子目录时，会并发预取这些兄弟目录的列表，
+在 SMB/NFS 等高延迟共享上隐藏网络往返；遍历本身仍是串行深度优先，结果顺序不变。
+
+也可绑定持久化扫描索引（ScanIndex）：mtime 未变化的目录直接复用上次的列表；
+索引出错（如数据库损坏或被锁定）时该目录及其子树退回普通 scandir。
+流式查找时，处理完的子树用 release() 释放，快照占用的内存不随目录规模增长。
+"""
+import os
+import sqlite3
+import threading
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from fnmatch import fnmatch
+from pathlib import Path
+from typing import TYPE_CHECKING, Callable, Dict, Iterator, List, Optional, Tuple, Union
+
+if TYPE_CHECKING:
+    from .scan_index import ScanIndex
+
+_prefetch_lock = threading.Lock()
+
+
+class DirNode:
+    """目录快照节点
+
+    子目录和文件在首次访问时通过一次 os.scandir 列出，之后直接使用缓存结果。
+    子目录与文件均保持 scandir 的返回顺序（与 iterdir()/rglob() 一致）。
+    """
+
+    __slots__ = ('path', 'name', 'is_symlink', '_dirs', '_files', '_by_name', '_error',
+                 '_executor', '_future', '_scan_index', '_mtime_ns', '_sizes')
+
+    def __init__(self, path: Path, name: Optional[str] = None, is_symlink: bool = False,
+                 executor: Optional[Executor] = None, scan_index: Optional['ScanIndex'] = None):
+        self.path = path
+        self.name = path.name if name is None else name
+        self.is_symlink = is_symlink
+        self._dirs: Optional[List['DirNode']] = None
+        self._files: Optional[List[str]] = None
+        self._by_name: Optional[Dict[str, 'DirNode']] = None
+        self._error: Optional[OSError] = None
+        self._executor = executor
+        self._future: Optional[Future] = None
+        self._scan_index = scan_index
+        self._mtime_ns: Optional[int] = None
+        self._sizes: Optional[Dict[str, int]] = None
+
+    @classmethod
+    def of(cls, target: Union[Path, str, 'DirNode']) -> 'DirNode':
+        """将路径或已有节点统一转换为快照节点"""
+        if isinstance(target, DirNode):
+            return target
+        return cls(Path(target))
+
+    def _list(self) -> None:
+        """执行 scandir 并保存结果，错误记录在节点上（可在线程池中运行）"""
+        executor = self._executor
+        scan_index = self._scan_index
+        dirs: List[DirNode] = []
+        files: List[str] = []
+        try:
+            if scan_index is not None:
+                key = str(self.path)
+                mtime_ns = self._mtime_ns = os.stat(self.path).st_mtime_ns
+                try:
+                    cached = scan_index.lookup(key, mtime_ns)
+                except sqlite3.Error as e:
+                    print(f"读取扫描索引失败，改为直接列出 {self.path}: {e}")
+                    cached = None
+                    scan_index = None
+                if cached is not None:
+                    cached_dirs, files = cached
+                    self._files = files
+                    self._dirs = [DirNode(self.path / name, name, is_link, executor, scan_index)
+                                  for name, is_link in cached_dirs]
+                    return
+            with os.scandir(self.path) as it:
+                for entry in it:
+                    try:
+                        is_dir = entry.is_dir()
+                    except OSError:
+                        is_dir = False
+                    if is_dir:
+                        dirs.append(DirNode(self.path / entry.name, entry.name, entry.is_symlink(),
+                                            executor, scan_index))
+                    else:
+                        files.append(entry.name)
+        except OSError as e:
+            self._error = e
+            return
+
+        if scan_index is not None:
+            try:
+                scan_index.store(key, mtime_ns, [(d.name, d.is_symlink) for d in dirs], files)
+            except sqlite3.Error as e:
+                print(f"写入扫描索引失败 {self.path}: {e}")
+        self._files = files
+        self._dirs = dirs
+
+    def _load(self) -> None:
+        """列出目录（仅执行一次）；已提交预取时等待其完成"""
+        if self._dirs is None and self._error is None:
+            future = self._future
+            if future is not None:
+                future.result()
+            else:
+                self._list()
+        if self._error is not None:
+            raise self._error
+
+    def _prefetch_children(self) -> None:
+        """将子目录的列出任务提交到线程池（每个节点只提交一次）"""
+        with _prefetch_lock:
+            executor = self._executor
+            if executor is None:
+                return
+            self._executor = None
+            for child in self._dirs:
+                if child._dirs is not None or child._future is not None:
+                    continue
+                try:
+                    child._future = executor.submit(child._list)
+                except RuntimeError:
+                    # 线程池已关闭，剩余目录在访问时同步列出
+                    break
+
+    @property
+    def dirs(self) -> List['DirNode']:
+        """子目录节点（scandir 顺序）"""
+        self._load()
+        if self._executor is not None:
+            self._prefetch_children()
+        return self._dirs
+
+    @property
+    def files(self) -> List[str]:
+        """非目录条目名称（scandir 顺序）"""
+        self._load()
+        return self._files
+
+    def release(self) -> None:
+        """释放已列出的子目录与文件（流式遍历处理完一棵子树后调用），再次访问时重新列出"""
+        self._dirs = None
+        self._files = None
+        self._by_name = None
+        self._error = None
+        self._future = None
+        self._mtime_ns = None
+        self._sizes = None
+
+    @property
+    def mtime_ns(self) -> int:
+        """目录的 mtime（纳秒），使用扫描索引时取列出时的值，无法访问时为 -1"""
+        if self._mtime_ns is None:
+            try:
+                self._mtime_ns = os.stat(self.path).st_mtime_ns
+            except OSError:
+                self._mtime_ns = -1
+        return self._mtime_ns
+
+    def file_sizes(self) -> Dict[str, int]:
+        """文件名 -> 大小，首次调用时再列出一次目录，大小取自 DirEntry
+
+        Windows 上 DirEntry 自带大小，不需要逐个 stat；其它平台每个文件一次 lstat。
+        """
+        if self._sizes is None:
+            sizes: Dict[str, int] = {}
+            try:
+                with os.scandir(self.path) as it:
+                    for entry in it:
+                        try:
+                            if not entry.is_dir():
+                                sizes[entry.name] = entry.stat(follow_symlinks=False).st_size
+                        except OSError:
+                            sizes[entry.name] = -1
+            except OSError:
+                pass
+            self._sizes = sizes
+        return self._sizes
+
+    def sorted_dirs(self) -> List['DirNode']:
+        """按路径排序的子目录，与 sorted(path.iterdir()) 的目录顺序一致"""
+        return sorted(self.dirs, key=lambda node: node.path)
+
+    def child(self, name: str) -> Optional['DirNode']:
+        """按名称查找直接子目录"""
+        if self._by_name is None:
+            self._by_name = {node.name: node for node in self.dirs}
+        return self._by_name.get(name)
+
+    def has_file(self, name: str) -> bool:
+        """目录下是否存在指定名称的文件"""
+        return name in self.files
+
+    def match_files(self, pattern: str) -> List[str]:
+        """按通配符匹配文件名（大小写规则与 Path.glob 相同）"""
+        return [name for name in self.files if fnmatch(name, pattern)]
+
+    def iter_files(self, prune: Optional[Callable[['DirNode'], bool]] = None) -> Iterator[Tuple['DirNode', str]]:
+        """递归遍历所有文件，产出 (所在目录节点, 文件名)
+
+        遍历顺序与 Path.rglob("*") 相同：先当前目录的文件，再按 scandir 顺序深度优先进入子目录，
+        不跟随符号链接目录。prune 返回 True 的子目录整棵跳过。
+        """
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            for name in node.files:
+                yield node, name
+            subdirs = [d for d in node.dirs if not d.is_symlink and not (prune and prune(d))]
+            stack.extend(reversed(subdirs))
+
+
+@contextmanager
+def open_tree(root: Union[Path, str, DirNode], max_workers: int = 1,
+              scan_index: Optional['ScanIndex'] = None) -> Iterator[DirNode]:
+    """打开目录快照
+
+    Args:
+        root: 根目录
+        max_workers: 并发列出目录的线程数，小于等于 1 时完全串行
+        scan_index: 持久化扫描索引，遍历结束后提交新记录
+    """
+    if isinstance(root, DirNode):
+        yield root
+        return
+    max_workers = int(max_workers or 1)
+    try:
+        if max_workers <= 1:
+            yield DirNode(Path(root), scan_index=scan_index)
+        else:
+            with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="scandir") as executor:
+                yield DirNode(Path(root), executor=executor, scan_index=scan_index)
+    finally:
+        if scan_index is not None:
+            try:
+                scan_index.flush()
+            except sqlite3.Error as e:
+                print(f"提交扫描索引失败: {e}")
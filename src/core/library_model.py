@@ -0,0 +1,336 @@
+"""
+课程库数据模型
+
+scanner、single_course_finder、course_batch_finder 共用的视频、章节、课程模型。
+百万级视频的目录中，每个视频一个保存完整 Path 的 dataclass 会占用数 GB 内存，因此：
+
+- VideoTable 按列保存视频：所在目录在目录表中的序号、文件名主干、扩展名序号、集数与全局集数，
+  目录表与扩展名表去重保存，文件名主干以 UTF-8 连续存放在一个 bytearray 中，整数列使用 array；
+  视频名称默认就是文件名主干，只有显式指定了不同名称的视频在字典中单独保存；
+- 章节树构建完成后由 pack_chapters() 按章节顺序把视频复制到一张新表，
+  每个章节只保存其视频在表中的区间（VideoRange）；
+- VideoFile 只是 (视频表, 行号) 的视图，path 等属性按需计算，原有代码无需修改即可使用。
+
+所有模型类都使用 __slots__，不再为每个实例分配 __dict__。
+"""
+import os
+from array import array
+from collections.abc import Sequence
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Union
+
+
+class _Slotted:
+    """按 __slots__ 比较与显示的基类（行为与 dataclass 生成的 __eq__ / __repr__ 一致）"""
+    __slots__ = ()
+    _fields = ()
+
+    def _values(self) -> tuple:
+        return tuple(getattr(self, name) for name in self._fields)
+
+    def __eq__(self, other):
+        if other.__class__ is not self.__class__:
+            return NotImplemented
+        return self._values() == other._values()
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        values = ", ".join(f"{name}={getattr(self, name)!r}" for name in self._fields)
+        return f"{type(self).__name__}({values})"
+
+
+class VideoTable:
+    """按列保存的视频表"""
+    __slots__ = ("_dirs", "_dir_ids", "_suffixes", "_suffix_ids", "_parents", "_stems", "_stem_ends",
+                 "_suffix_of", "_episodes", "_globals", "_names")
+
+    def __init__(self):
+        self._dirs: List[Path] = []  # 目录表，每个目录只保存一个 Path
+        self._dir_ids: Dict[Path, int] = {}
+        self._suffixes: List[str] = []  # 扩展名表
+        self._suffix_ids: Dict[str, int] = {}
+        self._parents = array('I')  # 所在目录序号
+        self._stems = bytearray()  # 文件名主干（即 VideoFile.name），UTF-8 编码依次存放
+        self._stem_ends = array('I')  # 每个文件名主干在 _stems 中的结束位置
+        self._suffix_of = array('H')  # 扩展名序号
+        self._episodes = array('i')
+        self._globals = array('i')
+        self._names: Optional[Dict[int, str]] = None  # 行号 -> 与文件名主干不同的视频名称
+
+    @classmethod
+    def from_columns(cls, dirs: List[Path], suffixes: List[str], parents, stems, stem_ends, suffix_of,
+                     episodes, global_episodes, names: Optional[Dict[int, str]] = None) -> "VideoTable":
+        """直接使用已有的列构造视频表（如 library_snapshot 映射的只读 memoryview，此时不能再添加或修改）"""
+        table = cls.__new__(cls)
+        table._dirs = dirs
+        table._dir_ids = {directory: i for i, directory in enumerate(dirs)}
+        table._suffixes = suffixes
+        table._suffix_ids = {suffix: i for i, suffix in enumerate(suffixes)}
+        table._parents = parents
+        table._stems = stems
+        table._stem_ends = stem_ends
+        table._suffix_of = suffix_of
+        table._episodes = episodes
+        table._globals = global_episodes
+        table._names = names or None
+        return table
+
+    def __len__(self) -> int:
+        return len(self._stem_ends)
+
+    def __getitem__(self, index: int) -> "VideoFile":
+        if not -len(self) <= index < len(self):
+            raise IndexError(index)
+        return VideoFile._view(self, index % len(self) if index < 0 else index)
+
+    def __iter__(self) -> Iterator["VideoFile"]:
+        return (VideoFile._view(self, i) for i in range(len(self)))
+
+    def _dir_id(self, directory: Path) -> int:
+        dir_id = self._dir_ids.get(directory)
+        if dir_id is None:
+            dir_id = self._dir_ids[directory] = len(self._dirs)
+            self._dirs.append(directory)
+        return dir_id
+
+    def _suffix_id(self, suffix: str) -> int:
+        suffix_id = self._suffix_ids.get(suffix)
+        if suffix_id is None:
+            suffix_id = self._suffix_ids[suffix] = len(self._suffixes)
+            self._suffixes.append(suffix)
+        return suffix_id
+
+    def add(self, directory: Path, file_name: str, episode_number: int = 1,
+            global_episode_number: int = 1, name: Optional[str] = None) -> "VideoFile":
+        """添加 directory 下的视频文件 file_name，返回其视图（name 省略时视频名称为文件名主干）"""
+        stem, suffix = os.path.splitext(file_name)
+        return self._append(self._dir_id(directory), stem, self._suffix_id(suffix),
+                            episode_number, global_episode_number, None if name == stem else name)
+
+    def add_video(self, video: "VideoFile") -> "VideoFile":
+        """复制另一张表中的视频"""
+        source, index = video._table, video._index
+        return self._append(self._dir_id(source._dirs[source._parents[index]]), source._stem_bytes(index),
+                            self._suffix_id(source._suffixes[source._suffix_of[index]]),
+                            source._episodes[index], source._globals[index],
+                            source._names.get(index) if source._names else None)
+
+    def _stem_bytes(self, index: int):
+        start = self._stem_ends[index - 1] if index else 0
+        return self._stems[start:self._stem_ends[index]]
+
+    def _stem(self, index: int) -> str:
+        return str(self._stem_bytes(index), "utf-8", "surrogateescape")
+
+    def _name(self, index: int) -> str:
+        names = self._names
+        if names:
+            name = names.get(index)
+            if name is not None:
+                return name
+        return self._stem(index)
+
+    def _append(self, dir_id: int, stem, suffix_id: int, episode_number: int,
+                global_episode_number: int, name: Optional[str] = None) -> "VideoFile":
+        if isinstance(stem, str):
+            stem = stem.encode("utf-8", "surrogateescape")
+        index = len(self._stem_ends)
+        self._parents.append(dir_id)
+        self._stems += stem
+        self._stem_ends.append(len(self._stems))
+        self._suffix_of.append(suffix_id)
+        self._episodes.append(episode_number)
+        self._globals.append(global_episode_number)
+        if name is not None:
+            if self._names is None:
+                self._names = {}
+            self._names[index] = name
+        return VideoFile._view(self, index)
+
+
+class VideoFile:
+    """视频文件信息（视频表中一行的视图）"""
+    __slots__ = ("_table", "_index")
+
+    def __init__(self, path: Path, name: Optional[str] = None, episode_number: int = 1,
+                 global_episode_number: int = 1):
+        """单独创建一个视频（使用只有一行的视频表）；批量创建请使用 VideoTable.add
+
+        Args:
+            path: 视频文件路径
+            name: 视频名称，省略时取 path.stem
+        """
+        path = Path(path)
+        table = VideoTable()
+        table.add(path.parent, path.name, episode_number, global_episode_number, name)
+        self._table = table
+        self._index = 0
+
+    @classmethod
+    def _view(cls, table: VideoTable, index: int) -> "VideoFile":
+        video = cls.__new__(cls)
+        video._table = table
+        video._index = index
+        return video
+
+    @property
+    def parent(self) -> Path:
+        """所在目录（同一目录的视频共用同一个 Path）"""
+        table = self._table
+        return table._dirs[table._parents[self._index]]
+
+    @property
+    def file_name(self) -> str:
+        """文件名（含扩展名）"""
+        table, index = self._table, self._index
+        return table._stem(index) + table._suffixes[table._suffix_of[index]]
+
+    @property
+    def path(self) -> Path:
+        return self.parent / self.file_name
+
+    @property
+    def name(self) -> str:
+        return self._table._name(self._index)
+
+    @property
+    def episode_number(self) -> int:
+        return self._table._episodes[self._index]
+
+    @episode_number.setter
+    def episode_number(self, value: int) -> None:
+        self._table._episodes[self._index] = value
+
+    @property
+    def global_episode_number(self) -> int:
+        """全局集数"""
+        return self._table._globals[self._index]
+
+    @global_episode_number.setter
+    def global_episode_number(self, value: int) -> None:
+        self._table._globals[self._index] = value
+
+    def _values(self) -> tuple:
+        return (self.path, self.name, self.episode_number, self.global_episode_number)
+
+    def __eq__(self, other):
+        if not isinstance(other, VideoFile):
+            return NotImplemented
+        return self._values() == other._values()
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return (f"VideoFile(path={self.path!r}, name={self.name!r}, episode_number={self.episode_number!r}, "
+                f"global_episode_number={self.global_episode_number!r})")
+
+
+class VideoRange(Sequence):
+    """视频表中 [start, stop) 区间的只读视图"""
+    __slots__ = ("_table", "_start", "_stop")
+
+    def __init__(self, table: VideoTable, start: int, stop: int):
+        self._table = table
+        self._start = start
+        self._stop = stop
+
+    def __len__(self) -> int:
+        return self._stop - self._start
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        return VideoFile._view(self._table, self._start + index)
+
+    def __iter__(self) -> Iterator[VideoFile]:
+        table = self._table
+        return (VideoFile._view(table, i) for i in range(self._start, self._stop))
+
+    def __eq__(self, other):
+        if not isinstance(other, (Sequence, list)) or isinstance(other, str):
+            return NotImplemented
+        return list(self) == list(other)
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return repr(list(self))
+
+
+class Chapter(_Slotted):
+    """章节信息"""
+    __slots__ = ("name", "videos", "sub_chapters")
+    _fields = __slots__
+
+    def __init__(self, name: str, videos: Union[List[VideoFile], VideoRange],
+                 sub_chapters: Optional[List["Chapter"]] = None):
+        self.name = name
+        self.videos = videos
+        self.sub_chapters = [] if sub_chapters is None else sub_chapters
+
+
+def pack_chapters(chapters: List[Chapter]) -> List[Chapter]:
+    """按章节树的顺序把各章节的视频复制到一张新的视频表，章节改为只保存区间
+
+    原先排序用的视频表不再被引用，随之释放。
+    """
+    table = VideoTable()
+
+    def pack(chapter: Chapter) -> None:
+        start = len(table)
+        for video in chapter.videos:
+            table.add_video(video)
+        chapter.videos = VideoRange(table, start, len(table))
+        for sub_chapter in chapter.sub_chapters:
+            pack(sub_chapter)
+
+    for chapter in chapters:
+        pack(chapter)
+    return chapters
+
+
+class Course(_Slotted):
+    """课程信息"""
+    __slots__ = ("path", "name", "structure_type", "chapters", "video_count")
+    _fields = __slots__
+
+    def __init__(self, path: Path, name: str, structure_type: int, chapters: List[Chapter], video_count: int):
+        self.path = path
+        self.name = name
+        self.structure_type = structure_type  # 1: 一级结构, 2: 二级结构, 3: 三级结构
+        self.chapters = chapters
+        self.video_count = video_count
+
+
+class SingleCourseInfo(_Slotted):
+    """Single文件课程信息"""
+    __slots__ = ("path", "name", "single_file", "video_count", "chapters")
+    _fields = __slots__
+
+    def __init__(self, path: Path, name: str, single_file: Path, video_count: int, chapters: List[Chapter]):
+        self.path = path
+        self.name = name
+        self.single_file = single_file
+        self.video_count = video_count
+        self.chapters = chapters
+
+
+class CourseInfo(_Slotted):
+    """课程信息（含语言版本目录）"""
+    __slots__ = ("path", "name", "has_mandarin", "has_original", "lesson_files", "mandarin_paths", "original_path")
+    _fields = __slots__
+
+    def __init__(self, path: Path, name: str, has_mandarin: bool, has_original: bool, lesson_files: List[Path],
+                 mandarin_paths: Optional[List[Path]] = None, original_path: Optional[Path] = None):
+        self.path = path
+        self.name = name
+        self.has_mandarin = has_mandarin
+        self.has_original = has_original
+        self.lesson_files = lesson_files
+        self.mandarin_paths = [] if mandarin_paths is None else mandarin_paths
+        self.original_path = original_path
@@ -0,0 +1,324 @@
+"""
+课程库快照模块
+
+每次扫描成功后把课程列表保存为按列存放的二进制快照（配置 library_snapshot_dir），
+标签页启动时直接映射（mmap）上次的快照，不必重新遍历共享目录即可显示课程列表。
+
+文件由固定头部、段表和若干段组成，每段是一个定长数组（按 8 字节对齐）：
+- 字符串表：路径片段、课程名、章节名等，UTF-8 连续存放，另有结束位置数组；
+- 目录表：上级目录序号与目录名（字符串序号），路径按片段逐级还原，每个目录只保存一次；
+- 课程、章节、视频与附加路径（lession 文件、语言目录）各自的列；
+  与文件名主干不同的视频名称另存为（视频行号, 字符串序号）两列。
+
+加载时各列直接作为 mmap 上的 memoryview 使用，不做解析；视频列交给 VideoTable.from_columns，
+章节保存为其中的区间（见 library_model），因此百万级视频的快照也能在一秒内打开。
+加载得到的视频只读；快照中的内容可能已过期，重新扫描后会被新的快照取代。
+
+加载的课程一直引用映射，而 Windows 上不能替换仍被映射的文件，因此每次保存写入一个
+带代数的新文件（name.<代数>.lsnap），加载时使用代数最大的文件；旧文件在保存后删除，
+仍被映射而删除失败的留到下次保存时再删除。
+"""
+import mmap
+import os
+import re
+import struct
+import sys
+import time
+from array import array
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+from .library_model import Chapter, Course, CourseInfo, SingleCourseInfo, VideoTable, VideoRange
+from .nfo_serializer import atomic_write
+from ..utils.config import config
+
+_MAGIC = b"NFOLIBS\0"
+_VERSION = 2
+_HEADER = struct.Struct("<8sBBHiq")  # 标识、版本、是否小端、段数、根目录序号、保存时间（纳秒）
+_SECTION = struct.Struct("<QQ")  # 段偏移、段长度
+_ALIGN = 8
+_SUFFIX = ".lsnap"
+
+# 段：名称与数组类型（"b" 为原始字节）
+_SECTIONS = (
+    ("strings", "b"), ("string_ends", "I"),
+    ("dir_parent", "i"), ("dir_name", "I"),
+    ("course_kind", "B"), ("course_flags", "B"), ("course_dir", "I"), ("course_name", "I"),
+    ("course_structure", "i"), ("course_videos", "I"), ("course_chapters", "I"), ("course_extras", "I"),
+    ("chapter_parent", "i"), ("chapter_name", "I"), ("chapter_start", "I"), ("chapter_stop", "I"),
+    ("suffixes", "I"),
+    ("video_dir", "I"), ("video_stems", "b"), ("video_stem_ends", "I"), ("video_suffix", "H"),
+    ("video_episode", "i"), ("video_global", "i"),
+    ("extra_kind", "B"), ("extra_dir", "I"), ("extra_name", "I"),
+    ("video_name_row", "I"), ("video_name", "I"),
+)
+
+# 课程类型
+_COURSE, _SINGLE, _BATCH = 0, 1, 2
+# CourseInfo 标志位
+_HAS_MANDARIN, _HAS_ORIGINAL = 1, 2
+# 附加路径类型
+_LESSON, _MANDARIN, _ORIGINAL, _SINGLE_FILE = 0, 1, 2, 3
+
+LibraryCourse = Union[Course, SingleCourseInfo, CourseInfo]
+
+
+@dataclass
+class LibrarySnapshot:
+    """加载的快照"""
+    root: Path
+    saved_at: float  # 保存时间（time.time()）
+    courses: List[LibraryCourse]
+
+    def describe(self) -> str:
+        saved = time.strftime("%Y-%m-%d %H:%M", time.localtime(self.saved_at))
+        return f"{saved} 扫描的 {self.root}"
+
+
+def _snapshot_dir() -> Optional[Path]:
+    return config.data_path('library_snapshot_dir')
+
+
+def _generations(name: str) -> List[Tuple[int, Path]]:
+    """已保存的各代快照文件，代数从大到小"""
+    directory = _snapshot_dir()
+    if directory is None:
+        return []
+    pattern = re.compile(re.escape(name) + r"\.(\d+)" + re.escape(_SUFFIX))
+    try:
+        names = os.listdir(directory)
+    except OSError:
+        return []
+    found = []
+    for file_name in names:
+        match = pattern.fullmatch(file_name)
+        if match:
+            found.append((int(match.group(1)), directory / file_name))
+    found.sort(reverse=True)
+    return found
+
+
+def snapshot_path(name: str) -> Optional[Path]:
+    """最新一代快照文件的路径，未配置快照目录或还没有快照时返回 None"""
+    generations = _generations(name)
+    return generations[0][1] if generations else None
+
+
+class _Writer:
+    """把课程列表整理为各段数组"""
+
+    def __init__(self):
+        self.columns: Dict[str, array] = {
+            name: (bytearray() if code == "b" else array(code)) for name, code in _SECTIONS}
+        self._strings: Dict[str, int] = {}
+        self._dirs: Dict[Path, int] = {}
+        self._suffixes: Dict[str, int] = {}
+
+    def string(self, text: str) -> int:
+        index = self._strings.get(text)
+        if index is None:
+            index = self._strings[text] = len(self._strings)
+            strings = self.columns["strings"]
+            strings += text.encode("utf-8", "surrogateescape")
+            self.columns["string_ends"].append(len(strings))
+        return index
+
+    def directory(self, path: Path) -> int:
+        index = self._dirs.get(path)
+        if index is None:
+            parent = path.parent
+            if parent == path:
+                # 根（"/" 或盘符）：整个保存为一个片段
+                parent_index, name = -1, str(path)
+            else:
+                parent_index, name = self.directory(parent), path.name
+            index = self._dirs[path] = len(self._dirs)
+            self.columns["dir_parent"].append(parent_index)
+            self.columns["dir_name"].append(self.string(name))
+        return index
+
+    def suffix(self, suffix: str) -> int:
+        index = self._suffixes.get(suffix)
+        if index is None:
+            index = self._suffixes[suffix] = len(self._suffixes)
+            self.columns["suffixes"].append(self.string(suffix))
+        return index
+
+    def extra(self, kind: int, path: Path) -> None:
+        columns = self.columns
+        columns["extra_kind"].append(kind)
+        columns["extra_dir"].append(self.directory(path.parent))
+        columns["extra_name"].append(self.string(path.name))
+
+    def chapters(self, chapters: List[Chapter], parent: int) -> None:
+        columns = self.columns
+        for chapter in chapters:
+            index = len(columns["chapter_parent"])
+            columns["chapter_parent"].append(parent)
+            columns["chapter_name"].append(self.string(chapter.name))
+            columns["chapter_start"].append(len(columns["video_dir"]))
+            for video in chapter.videos:
+                stem, suffix = os.path.splitext(video.file_name)
+                columns["video_dir"].append(self.directory(video.parent))
+                stems = columns["video_stems"]
+                stems += stem.encode("utf-8", "surrogateescape")
+                columns["video_stem_ends"].append(len(stems))
+                columns["video_suffix"].append(self.suffix(suffix))
+                columns["video_episode"].append(video.episode_number)
+                columns["video_global"].append(video.global_episode_number)
+                name = video.name
+                if name != stem:
+                    columns["video_name_row"].append(len(columns["video_dir"]) - 1)
+                    columns["video_name"].append(self.string(name))
+            columns["chapter_stop"].append(len(columns["video_dir"]))
+            self.chapters(chapter.sub_chapters, index)
+
+    def course(self, course: LibraryCourse) -> None:
+        columns = self.columns
+        flags, structure, videos, chapters = 0, 0, 0, []
+        if isinstance(course, Course):
+            kind, structure, videos, chapters = _COURSE, course.structure_type, course.video_count, course.chapters
+        elif isinstance(course, SingleCourseInfo):
+            kind, videos, chapters = _SINGLE, course.video_count, course.chapters
+            self.extra(_SINGLE_FILE, course.single_file)
+        else:
+            kind = _BATCH
+            flags = (_HAS_MANDARIN if course.has_mandarin else 0) | (_HAS_ORIGINAL if course.has_original else 0)
+            for path in course.lesson_files:
+                self.extra(_LESSON, path)
+            for path in course.mandarin_paths:
+                self.extra(_MANDARIN, path)
+            if course.original_path is not None:
+                self.extra(_ORIGINAL, course.original_path)
+        columns["course_kind"].append(kind)
+        columns["course_flags"].append(flags)
+        columns["course_dir"].append(self.directory(course.path))
+        columns["course_name"].append(self.string(course.name))
+        columns["course_structure"].append(structure)
+        columns["course_videos"].append(videos)
+        # 记录截至本课程结束时章节与附加路径的数量，加载时据此划分
+        self.chapters(chapters, -1)
+        columns["course_chapters"].append(len(columns["chapter_parent"]))
+        columns["course_extras"].append(len(columns["extra_kind"]))
+
+    def to_bytes(self, root: Path) -> bytes:
+        root_index = self.directory(root)
+        header_size = _HEADER.size + _SECTION.size * len(_SECTIONS)
+        offset = _aligned(header_size)
+        table, blobs = [], []
+        for name, _ in _SECTIONS:
+            column = self.columns[name]
+            data = bytes(column) if isinstance(column, bytearray) else column.tobytes()
+            table.append(_SECTION.pack(offset, len(data)))
+            blobs.append(data + b"\0" * (_aligned(len(data)) - len(data)))
+            offset += _aligned(len(data))
+        header = _HEADER.pack(_MAGIC, _VERSION, sys.byteorder == "little", len(_SECTIONS), root_index,
+                              time.time_ns())
+        head = header + b"".join(table)
+        return head + b"\0" * (_aligned(len(head)) - len(head)) + b"".join(blobs)
+
+
+def _aligned(size: int) -> int:
+    return (size + _ALIGN - 1) // _ALIGN * _ALIGN
+
+
+def save_library(name: str, root: Path, courses: List[LibraryCourse]) -> bool:
+    """保存扫描结果快照（扫描成功后调用），未配置快照目录或保存失败时返回 False"""
+    directory = _snapshot_dir()
+    if directory is None:
+        return False
+    generations = _generations(name)
+    path = directory / f"{name}.{generations[0][0] + 1 if generations else 1}{_SUFFIX}"
+    writer = _Writer()
+    try:
+        for course in courses:
+            writer.course(course)
+        data = writer.to_bytes(Path(root))
+        directory.mkdir(parents=True, exist_ok=True)
+        atomic_write(path, data)
+    except (OSError, ValueError, OverflowError) as e:
+        print(f"保存课程库快照 {path} 时出错: {e}")
+        return False
+    for _, old in generations:
+        try:
+            os.remove(old)
+        except OSError:
+            # Windows 上仍被映射（界面还在显示其中的课程），下次保存时再删除
+            pass
+    return True
+
+
+def load_library(name: str) -> Optional[LibrarySnapshot]:
+    """映射并加载最新一代快照，没有快照或格式不符时返回 None"""
+    path = snapshot_path(name)
+    if path is None:
+        return None
+    try:
+        with open(path, 'rb') as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return _load(memoryview(mapped))
+    except (OSError, ValueError, struct.error, IndexError) as e:
+        print(f"读取课程库快照 {path} 时出错: {e}")
+        return None
+
+
+def _load(buffer: memoryview) -> Optional[LibrarySnapshot]:
+    magic, version, little, count, root_index, saved_ns = _HEADER.unpack_from(buffer, 0)
+    if magic != _MAGIC or version != _VERSION or count != len(_SECTIONS) \
+            or bool(little) != (sys.byteorder == "little"):
+        return None
+    columns = {}
+    for i, (name, code) in enumerate(_SECTIONS):
+        offset, length = _SECTION.unpack_from(buffer, _HEADER.size + i * _SECTION.size)
+        if offset + length > len(buffer):
+            raise ValueError(f"快照段 {name} 超出文件范围")
+        data = buffer[offset:offset + length]
+        columns[name] = data if code == "b" else data.cast(code)
+
+    strings, string_ends = columns["strings"], columns["string_ends"]
+
+    def string(index: int) -> str:
+        start = string_ends[index - 1] if index else 0
+        return str(strings[start:string_ends[index]], "utf-8", "surrogateescape")
+
+    # 目录按先上级后下级的顺序保存，逐个还原路径
+    dirs: List[Path] = []
+    for parent, name in zip(columns["dir_parent"], columns["dir_name"]):
+        dirs.append(Path(string(name)) if parent < 0 else dirs[parent] / string(name))
+
+    names = {row: string(name) for row, name in zip(columns["video_name_row"], columns["video_name"])}
+    videos = VideoTable.from_columns(
+        dirs, [string(index) for index in columns["suffixes"]], columns["video_dir"], columns["video_stems"],
+        columns["video_stem_ends"], columns["video_suffix"], columns["video_episode"], columns["video_global"],
+        names)
+
+    chapter_parent = columns["chapter_parent"]
+    chapters: List[Chapter] = []
+    for i, (name, start, stop) in enumerate(zip(columns["chapter_name"], columns["chapter_start"],
+                                                columns["chapter_stop"])):
+        chapters.append(Chapter(string(name), VideoRange(videos, start, stop)))
+        if chapter_parent[i] >= 0:
+            chapters[chapter_parent[i]].sub_chapters.append(chapters[i])
+
+    extra_kind, extra_dir, extra_name = columns["extra_kind"], columns["extra_dir"], columns["extra_name"]
+    courses: List[LibraryCourse] = []
+    first_chapter = first_extra = 0
+    for i, kind in enumerate(columns["course_kind"]):
+        last_chapter, last_extra = columns["course_chapters"][i], columns["course_extras"][i]
+        top = [chapters[c] for c in range(first_chapter, last_chapter) if chapter_parent[c] < 0]
+        extras: Dict[int, List[Path]] = {}
+        for e in range(first_extra, last_extra):
+            extras.setdefault(extra_kind[e], []).append(dirs[extra_dir[e]] / string(extra_name[e]))
+        first_chapter, first_extra = last_chapter, last_extra
+
+        path, name = dirs[columns["course_dir"][i]], string(columns["course_name"][i])
+        if kind == _COURSE:
+            courses.append(Course(path, name, columns["course_structure"][i], top, columns["course_videos"][i]))
+        elif kind == _SINGLE:
+            courses.append(SingleCourseInfo(path, name, extras[_SINGLE_FILE][0], columns["course_videos"][i], top))
+        else:
+            flags = columns["course_flags"][i]
+            courses.append(CourseInfo(path, name, bool(flags & _HAS_MANDARIN), bool(flags & _HAS_ORIGINAL),
+                                      extras.get(_LESSON, []), extras.get(_MANDARIN, []),
+                                      extras.get(_ORIGINAL, [None])[0]))
+    return LibrarySnapshot(dirs[root_index], saved_ns / 1e9, courses)
@@ -0,0 +1,140 @@
+"""
+自然排序键模块
+
+集中各扫描器使用的序号提取规则（正则预编译、按名称缓存结果），
+以及基于相对路径分段的排序键构造函数。各规则保持原有扫描器的语义：
+
+- leading_number: 开头的整数（"004 认识讲师" -> 4），DirectoryScanner / CourseBatchTab 使用
+- dotted_prefix: 开头的点分层号（"2.1.3.查看文件" -> (2, 1, 3)），CourseBatchNestedTab 使用
+- episode_numbers: 任意位置的点分层号、EP/Part 标记或首个整数，SingleCourseFinder 使用
+- chapter_number: 后接分隔符的开头整数（"1. WELCOME" -> 1），Type4DirectoryScanner 使用
+"""
+import re
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Callable, Optional, Tuple
+
+# 无法提取序号时使用的大数，确保未编号的条目排在最后
+NO_NUMBER = 999999
+
+# 每个规则缓存的名称数量
+CACHE_SIZE = 1 << 16
+
+_LEADING_DIGITS = re.compile(r'\d+')
+_DOTTED = re.compile(r'\d+(?:\.\d+)+')
+_EPISODE_TOKEN = re.compile(r'(?i)\b(?:ep|e|episode|part|p)\s*0*(\d+)\b')
+_CHAPTER_NUMBER = re.compile(r'(\d+)(?:\.|、|\s|$)')
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def leading_number(name: str) -> int:
+    """提取名称开头的整数，例如 "1 - 引言"、"001引言" """
+    match = _LEADING_DIGITS.match(name)
+    if match:
+        return int(match.group())
+    return NO_NUMBER
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def dotted_prefix(name: str) -> Tuple[int, ...]:
+    """提取名称开头的点分层号（如 2.1.2、10.03.7），否则退化为开头的单个整数"""
+    s = name.strip()
+    match = _DOTTED.match(s)
+    if match:
+        return tuple(int(p) for p in match.group().split('.'))
+    match = _LEADING_DIGITS.match(s)
+    if match:
+        return (int(match.group()),)
+    return (NO_NUMBER,)
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def episode_numbers(name: str) -> Tuple[int, ...]:
+    """提取名称中任意位置的序号
+
+    依次尝试：点分层号（5.1.3）、EP/Episode/E/Part/P 标记（EP01、Part 2）、首个整数（Chapter 03）。
+    """
+    s = (name or "").strip()
+    match = _DOTTED.search(s)
+    if match:
+        return tuple(int(p) for p in match.group().split('.'))
+    match = _EPISODE_TOKEN.search(s)
+    if match:
+        return (int(match.group(1)),)
+    match = _LEADING_DIGITS.search(s)
+    if match:
+        return (int(match.group()),)
+    return (NO_NUMBER,)
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def chapter_number(name: str) -> Optional[int]:
+    """提取开头的序号，序号后必须是点、顿号、空白或结尾（如 "1. WELCOME"、"01 - 简介"）"""
+    match = _CHAPTER_NUMBER.match(name)
+    if match:
+        return int(match.group(1))
+    return None
+
+
+def relative_dirs(root: Path, path: Path) -> Tuple[str, ...]:
+    """文件相对 root 的中间目录名（不含文件名），不在 root 之下时返回空元组"""
+    root_parts = root.parts
+    parts = path.parts
+    n = len(root_parts)
+    if len(parts) <= n or parts[:n] != root_parts:
+        return ()
+    return parts[n:-1]
+
+
+def _video_dirs(root: Path, video) -> Tuple[str, ...]:
+    """视频相对 root 的中间目录名；视频提供所在目录 parent 时（见 library_model）不必拼接完整路径"""
+    parent = getattr(video, "parent", None)
+    if parent is None:
+        return relative_dirs(root, video.path)
+    root_parts = root.parts
+    parts = parent.parts
+    n = len(root_parts)
+    if len(parts) < n or parts[:n] != root_parts:
+        return ()
+    return parts[n:]
+
+
+def top_dir_key(root: Path, root_number: int = NO_NUMBER) -> Callable[[Any], tuple]:
+    """按 (顶层目录序号, 文件名序号, 文件名) 排序，中间层目录不影响排序
+
+    Args:
+        root: 语言目录
+        root_number: 直接位于 root 下的视频使用的顶层目录序号
+    """
+    def key(video) -> tuple:
+        dirs = _video_dirs(root, video)
+        top_num = leading_number(dirs[0]) if dirs else root_number
+        name = video.name
+        return (top_num, leading_number(name), name)
+    return key
+
+
+def dotted_dirs_key(root: Path, depth: int) -> Callable[[Any], tuple]:
+    """按各级目录与文件名的点分层号排序，目录不足 depth 级时以 0 补齐"""
+    def key(video) -> tuple:
+        names = _video_dirs(root, video)[-depth:] if depth > 0 else ()
+        seq = []
+        for n in names:
+            seq.extend(dotted_prefix(n))
+        seq.extend((0,) * (depth - len(names)))
+        name = video.name
+        seq.extend(dotted_prefix(name))
+        return (tuple(seq), name.lower())
+    return key
+
+
+def episode_dirs_key(root: Path) -> Callable[[Any], tuple]:
+    """按各级目录与文件名中的序号（点分层号 / EP 标记 / 首个整数）排序"""
+    def key(video) -> tuple:
+        seq = []
+        for n in _video_dirs(root, video):
+            seq.extend(episode_numbers(n))
+        name = video.name
+        seq.extend(episode_numbers(name))
+        return (tuple(seq), name.lower())
+    return key
@@ -0,0 +1,294 @@
+"""
+NFO清理模块
+
+批量删除 NFO 的流水线：用 os.scandir 逐个目录查找 NFO（不在内存中保存完整列表），
+按批提交到线程池删除，进度按时间间隔合并后回调，界面不会被逐个文件的消息淹没。
+可按条件只删除本程序生成的 NFO，或只删除有同名视频的 NFO。
+界面先查找并确认数量再删除：查找结果写入磁盘上的临时文件（PathSpool），删除时只删除
+确认过的这些文件，之后新出现的 NFO 不会被删除，内存占用也不随文件数增长。
+find_orphans() 在一次遍历中找出视频已被改名或删除后遗留的 NFO。
+"""
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from fnmatch import fnmatch
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, List, Optional, Set, Tuple
+from .nfo_serializer import is_temp_file, rendered_prefix
+from ..utils.config import config
+
+# 删除条件
+ALL = "all"  # 全部 NFO
+GENERATED = "generated"  # 本程序生成的 NFO
+WITH_VIDEO = "with_video"  # 与视频同名的 NFO
+
+FILTER_LABELS = {
+    ALL: "全部NFO",
+    GENERATED: "本程序生成的NFO",
+    WITH_VIDEO: "有同名视频的NFO",
+}
+
+# 本程序生成的 NFO 的开头（XML 声明 + 根元素），换行符为 LF 或 CRLF
+_SIGNATURES = tuple({
+    prefix.replace("\n", newline).encode("utf-8")
+    for compact in (False, True)
+    for root in ("tvshow", "episodedetails")
+    for prefix in (rendered_prefix(root, compact).replace("\r\n", "\n"),)
+    for newline in ("\n", "\r\n")
+})
+_SIGNATURE_LENGTH = max(len(signature) for signature in _SIGNATURES)
+
+_DELETE_BATCH_SIZE = 256  # 每个删除任务处理的文件数
+
+# 孤立 NFO 的类型
+ORPHAN_EPISODE = "episode"  # 同目录下没有同名视频
+ORPHAN_TVSHOW = "tvshow"  # 所在目录（含子目录）已没有视频
+
+ORPHAN_LABELS = {
+    ORPHAN_EPISODE: "剧集NFO（无同名视频）",
+    ORPHAN_TVSHOW: "tvshow.nfo（目录中无视频）",
+}
+
+# 不对应单个视频的 NFO
+_SHOW_NFO_NAMES = frozenset({"tvshow.nfo", "season.nfo"})
+
+
+class ProgressThrottle:
+    """合并进度回调：两次回调至少间隔 interval 秒，最后一次用 flush() 发出"""
+
+    def __init__(self, callback: Optional[Callable[..., None]], interval: float = 0.2):
+        self.callback = callback
+        self.interval = interval
+        self._last = 0.0
+        self._args: Optional[tuple] = None
+
+    def update(self, *args) -> None:
+        if self.callback is None:
+            return
+        self._args = args
+        now = time.monotonic()
+        if now - self._last >= self.interval:
+            self._last = now
+            self.callback(*args)
+            self._args = None
+
+    def flush(self) -> None:
+        if self.callback is not None and self._args is not None:
+            self.callback(*self._args)
+            self._args = None
+
+
+class PathSpool:
+    """按顺序暂存路径的磁盘临时文件（关闭后自动删除），可多次从头读取"""
+
+    def __init__(self):
+        self._file = tempfile.TemporaryFile()
+        self.count = 0
+
+    def add(self, path: Path) -> None:
+        # 文件名中不可能出现 NUL，用作分隔符
+        self._file.write(os.fsencode(str(path)) + b"\0")
+        self.count += 1
+
+    def __iter__(self) -> Iterator[Path]:
+        self._file.seek(0)
+        tail = b""
+        while True:
+            block = self._file.read(1 << 16)
+            if not block:
+                break
+            items = (tail + block).split(b"\0")
+            tail = items.pop()
+            for item in items:
+                yield Path(os.fsdecode(item))
+        self._file.seek(0, os.SEEK_END)
+
+    def close(self) -> None:
+        self._file.close()
+
+
+def is_generated_nfo(path: Path) -> bool:
+    """文件开头是否为本程序生成的 NFO 格式"""
+    try:
+        with open(path, 'rb') as f:
+            head = f.read(_SIGNATURE_LENGTH)
+    except OSError:
+        return False
+    return head.startswith(_SIGNATURES)
+
+
+def walk_files(root: Path) -> Iterator[Tuple[Path, List[str]]]:
+    """深度优先遍历目录，逐个产出 (目录, 文件名列表)
+
+    不跟随符号链接目录，无法列出的目录跳过。
+    """
+    stack = [Path(root)]
+    while stack:
+        directory = stack.pop()
+        files: List[str] = []
+        subdirs: List[Path] = []
+        try:
+            with os.scandir(directory) as it:
+                for entry in it:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            subdirs.append(directory / entry.name)
+                            continue
+                    except OSError:
+                        pass
+                    files.append(entry.name)
+        except OSError as e:
+            print(f"无法列出目录 {directory}: {e}")
+            continue
+        yield directory, files
+        stack.extend(reversed(subdirs))
+
+
+def video_stems(names: Iterable[str], video_extensions: Optional[Iterable[str]] = None) -> Set[str]:
+    """文件名列表中视频文件的主文件名"""
+    extensions = {ext.lower() for ext in (video_extensions or config.get('video_extensions'))}
+    stems = set()
+    for name in names:
+        stem, ext = os.path.splitext(name)
+        if ext.lower() in extensions:
+            stems.add(stem)
+    return stems
+
+
+def iter_nfo_files(root: Path, nfo_filter: str = ALL,
+                   video_extensions: Optional[Iterable[str]] = None) -> Iterator[Path]:
+    """逐个产出目录下符合条件的 NFO 文件
+
+    Args:
+        nfo_filter: ALL / GENERATED / WITH_VIDEO
+        video_extensions: WITH_VIDEO 时视为视频的扩展名，None 时使用配置
+    """
+    if nfo_filter not in FILTER_LABELS:
+        raise ValueError(f"未知的删除条件: {nfo_filter}")
+    for directory, names in walk_files(root):
+        nfo_names = [name for name in names if fnmatch(name, "*.nfo") and not is_temp_file(name)]
+        if not nfo_names:
+            continue
+        if nfo_filter == WITH_VIDEO:
+            stems = video_stems(names, video_extensions)
+            nfo_names = [name for name in nfo_names if os.path.splitext(name)[0] in stems]
+        for name in nfo_names:
+            path = directory / name
+            if nfo_filter == GENERATED and not is_generated_nfo(path):
+                continue
+            yield path
+
+
+def delete_files(paths: Iterable[Path], workers: Optional[int] = None,
+                 progress: Optional[Callable[[int, int], None]] = None,
+                 interval: float = 0.2) -> Tuple[int, int]:
+    """边查找边删除：paths 可以是生成器，按批提交到线程池
+
+    Args:
+        workers: 并发删除的线程数，None 时使用配置 nfo_write_workers
+        progress: 进度回调 progress(已删除数, 失败数)，按 interval 秒合并，在调用线程中执行
+
+    Returns:
+        (已删除数, 失败数)
+    """
+    workers = workers or config.get('nfo_write_workers') or 1
+    counts = [0, 0]
+    lock = threading.Lock()
+    throttle = ProgressThrottle(progress, interval)
+    slots = threading.BoundedSemaphore(workers * 2)  # 限制排队的批次，查找不会远远跑在删除前面
+
+    def delete_batch(batch: List[Path]) -> None:
+        deleted = failed = 0
+        try:
+            for path in batch:
+                try:
+                    path.unlink()
+                    deleted += 1
+                except FileNotFoundError:
+                    pass
+                except OSError as e:
+                    failed += 1
+                    print(f"删除文件 {path} 时出错: {e}")
+        finally:
+            with lock:
+                counts[0] += deleted
+                counts[1] += failed
+            slots.release()
+
+    def report() -> None:
+        with lock:
+            deleted, failed = counts
+        throttle.update(deleted, failed)
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="nfo-delete") as executor:
+        batch: List[Path] = []
+        for path in paths:
+            batch.append(path)
+            if len(batch) >= _DELETE_BATCH_SIZE:
+                slots.acquire()
+                executor.submit(delete_batch, batch)
+                batch = []
+                report()
+        if batch:
+            slots.acquire()
+            executor.submit(delete_batch, batch)
+    report()
+    throttle.flush()
+    return counts[0], counts[1]
+
+
+@dataclass
+class OrphanNFO:
+    """孤立的 NFO 文件"""
+    path: Path
+    kind: str  # ORPHAN_EPISODE / ORPHAN_TVSHOW
+
+
+def find_orphans(root: Path, video_extensions: Optional[Iterable[str]] = None,
+                 progress: Optional[Callable[[int, int], None]] = None) -> List[OrphanNFO]:
+    """一次遍历找出孤立的 NFO
+
+    每个目录内用集合运算比较 NFO 与视频的主文件名，不逐个检查文件是否存在；
+    含视频的目录向上标记各级上级目录，遍历结束后即可判断 tvshow.nfo 所在目录是否还有视频。
+
+    Args:
+        video_extensions: 视为视频的扩展名，None 时使用配置
+        progress: 进度回调 progress(已遍历目录数, 已找到数)，按时间间隔合并
+    """
+    root = Path(root)
+    throttle = ProgressThrottle(progress)
+    orphans: List[OrphanNFO] = []
+    show_nfos: List[Path] = []  # tvshow.nfo
+    has_video: Set[Path] = set()  # 自身或子目录中有视频的目录
+    visited = 0
+    for directory, names in walk_files(root):
+        visited += 1
+        nfo_stems = {}
+        for name in names:
+            if fnmatch(name, "*.nfo") and not is_temp_file(name):
+                if name.lower() in _SHOW_NFO_NAMES:
+                    if name.lower() == "tvshow.nfo":
+                        show_nfos.append(directory / name)
+                else:
+                    nfo_stems[os.path.splitext(name)[0]] = name
+        stems = video_stems(names, video_extensions)
+        if stems:
+            # 标记到已标记的上级为止，每个目录只标记一次
+            current = directory
+            while current not in has_video:
+                has_video.add(current)
+                if current == root:
+                    break
+                current = current.parent
+        for stem in nfo_stems.keys() - stems:
+            orphans.append(OrphanNFO(directory / nfo_stems[stem], ORPHAN_EPISODE))
+        throttle.update(visited, len(orphans))
+
+    for path in show_nfos:
+        if path.parent not in has_video:
+            orphans.append(OrphanNFO(path, ORPHAN_TVSHOW))
+    throttle.flush()
+    return orphans
@@ -0,0 +1,197 @@
+"""
+NFO生成引擎
+
+三种课程 NFO（目录课程、批量语言版本、Single文件课程）的生成流程相同：
+写入 tvshow.nfo，再为每个视频写入 episodedetails。差异只在标题、描述、分类等内容，
+由 NFOPolicy 决定；NFOEngine 负责章节遍历与写入（比较内容、原子替换、并发写入、计划模式），
+NFOGenerator、BatchNFOGenerator、SingleNFOGenerator 只是不同策略的配置。
+
+增量模式（配置 nfo_incremental）用于课程中增删视频后重新编号：已有的剧集 NFO 只比较
+集数与标题，一致的不生成也不写入；tvshow.nfo 只替换描述中的总集数，保留其它内容。
+在课程末尾追加一个视频只会写入新视频的 NFO 与 tvshow.nfo 两个文件。
+"""
+import re
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Iterator, List, Optional, Set, Tuple
+from .nfo_serializer import NFOWriter, Fields, WRITTEN
+from .nfo_write_pool import NFOWritePool
+from ..utils.config import config
+
+# 普通话目录的常见命名
+MANDARIN_DIR_NAMES = frozenset({
+    "普通话Deepl",
+    "普通话DeepL",
+    "普通话DeepL[男声]",
+    "普通话DeepL[女声]",
+    "普通话OpenAI-4o-mini",
+    "普通话gemini",
+})
+# 原版（英文）目录的命名
+ORIGINAL_DIR_NAMES = frozenset({"原"})
+
+# 增量模式下剧集 NFO 比较的元素
+RENUMBER_FIELDS = frozenset({"title", "episode"})
+
+_TOTAL_PATTERN = re.compile(r"总集数：(\d+)".encode("utf-8"))
+
+
+def strip_course_name(name: str) -> str:
+    """去掉课程名中方括号及其后的部分，作为标题"""
+    if "[" in name:
+        return name.split("[")[0].strip()
+    return name
+
+
+def count_videos(chapters) -> int:
+    """章节树中的视频总数"""
+    total = 0
+    for chapter in chapters:
+        total += len(chapter.videos)
+        # 检查sub_chapters是否为None，避免NoneType错误
+        if chapter.sub_chapters is not None:
+            total += count_videos(chapter.sub_chapters)
+    return total
+
+
+def iter_chapter_videos(chapters, parent_name: str = "") -> Iterator[Tuple[str, object]]:
+    """按章节顺序产出 (章节名, 视频)，子章节名以 " - " 连接上级章节名"""
+    for chapter in chapters:
+        chapter_name = f"{parent_name} - {chapter.name}" if parent_name else chapter.name
+        for video in chapter.videos:
+            yield chapter_name, video
+        if chapter.sub_chapters is not None:
+            yield from iter_chapter_videos(chapter.sub_chapters, chapter_name)
+
+
+@dataclass
+class ShowInfo:
+    """一部 tvshow：一个课程或课程的一个语言版本"""
+    course_path: Path  # 课程根目录
+    nfo_dir: Path  # tvshow.nfo 所在目录
+    chapters: list
+    course_name: str = ""  # 课程名，默认为课程目录名
+    total_videos: Optional[int] = None  # None 时按章节统计
+    is_mandarin: bool = True
+    language_label: str = ""
+    tags: Set[str] = field(default_factory=set)
+    course_types: Set[str] = field(default_factory=set)
+    structure_type: Optional[int] = None  # 目录课程的结构类型（1/2/3），其它课程为 None
+
+    def __post_init__(self):
+        if not self.course_name:
+            self.course_name = self.course_path.name
+        if self.total_videos is None:
+            self.total_videos = count_videos(self.chapters)
+
+    @property
+    def title(self) -> str:
+        """去掉方括号部分的课程名"""
+        return strip_course_name(self.course_name)
+
+
+class NFOPolicy:
+    """NFO 内容策略：子类覆盖需要定制的方法"""
+
+    def show_title(self, show: ShowInfo) -> str:
+        return show.title
+
+    def show_plot(self, show: ShowInfo) -> str:
+        return f"课程：{show.course_name}\n总集数：{show.total_videos}"
+
+    def show_extra_fields(self, show: ShowInfo) -> Fields:
+        """描述与分类之间的其它元素"""
+        return []
+
+    def show_genres(self, show: ShowInfo) -> List[str]:
+        return []
+
+    def episodes(self, show: ShowInfo) -> Iterator[Tuple[str, object]]:
+        """需要生成 NFO 的 (章节名, 视频)"""
+        return iter_chapter_videos(show.chapters)
+
+    def episode_plot(self, show: ShowInfo, chapter_name: str) -> str:
+        return f"章节：{chapter_name}" if chapter_name else ""
+
+    def show_fields(self, show: ShowInfo) -> Fields:
+        fields = [("title", self.show_title(show)), ("plot", self.show_plot(show))]
+        fields.extend(self.show_extra_fields(show))
+        fields.extend(("genre", genre) for genre in self.show_genres(show))
+        return fields
+
+    def episode_fields(self, show: ShowInfo, chapter_name: str, video) -> Fields:
+        return [
+            ("title", video.name),
+            ("plot", self.episode_plot(show, chapter_name)),
+            ("season", "1"),
+            ("episode", str(video.global_episode_number)),
+        ]
+
+
+class NFOEngine:
+    """按策略生成 tvshow 与 episode NFO，所有写入经过同一个写入池"""
+
+    def __init__(self, policy: NFOPolicy, overwrite: bool = True, incremental: Optional[bool] = None):
+        self.policy = policy
+        self.overwrite = overwrite  # 是否覆盖现有文件（内容未变化的文件不会重写）
+        # 增量模式：集数或标题变化的 NFO 不论 overwrite 都会重写，None 时读取配置 nfo_incremental
+        self.incremental = bool(config.get('nfo_incremental') if incremental is None else incremental)
+        self.writer = NFOWriter()
+        self.pool = NFOWritePool(self.writer)  # 并发写入，线程数见配置 nfo_write_workers
+
+    def generate_show(self, show: ShowInfo, with_tvshow: bool = True) -> None:
+        """生成一部 tvshow 的全部 NFO，写完后目录统一刷盘一次"""
+        with self.pool.course():
+            if with_tvshow:
+                self.write_tvshow(show)
+            self.write_episodes(show)
+
+    def write_tvshow(self, show: ShowInfo) -> None:
+        """生成 tvshow.nfo（增量模式下已有文件只更新总集数）"""
+        nfo_path = show.nfo_dir / "tvshow.nfo"
+        try:
+            if self.incremental and self._patch_total(nfo_path, show.total_videos):
+                return
+            self.pool.submit(nfo_path, "tvshow", self.policy.show_fields(show), self.overwrite,
+                             f"生成tvshow.nfo: {nfo_path}")
+        except Exception as e:
+            print(f"生成tvshow.nfo时出错: {e}")
+            self.pool.record_failure()
+
+    def write_episodes(self, show: ShowInfo) -> None:
+        """为策略选出的每个视频生成 NFO（增量模式下只重写集数或标题变化的 NFO）"""
+        compare = RENUMBER_FIELDS if self.incremental else None
+        overwrite = self.overwrite or self.incremental
+        try:
+            for chapter_name, video in self.policy.episodes(show):
+                try:
+                    self.pool.submit(video.path.with_suffix('.nfo'), "episodedetails",
+                                     self.policy.episode_fields(show, chapter_name, video), overwrite,
+                                     f"生成视频NFO: {video.name} (集数: {video.global_episode_number})",
+                                     compare=compare)
+                except Exception as e:
+                    print(f"生成视频NFO文件时出错 {video.name}: {e}")
+                    self.pool.record_failure()
+        except Exception as e:
+            print(f"生成视频NFO文件时出错: {e}")
+            self.pool.record_failure()
+
+    def _patch_total(self, nfo_path: Path, total: int) -> bool:
+        """将已有 tvshow.nfo 描述中的总集数改为 total，其它内容保持不变
+
+        Returns:
+            是否已处理；文件不存在或其中没有总集数时返回 False，由调用方按完整内容生成
+        """
+        try:
+            with open(nfo_path, 'rb') as f:
+                content = f.read()
+        except FileNotFoundError:
+            return False
+        match = _TOTAL_PATTERN.search(content)
+        if match is None:
+            return False
+        patched = b"".join((content[:match.start(1)], str(total).encode("ascii"), content[match.end(1):]))
+        # 计划模式下记录修改后的完整内容，执行计划时原样写入
+        if self.writer.write_data(nfo_path, patched, root_tag="tvshow") == WRITTEN:
+            print(f"更新tvshow.nfo总集数: {nfo_path} ({match.group(1).decode('ascii')} -> {total})")
+        return True
@@ -0,0 +1,270 @@
+"""
+NFO撤销日志模块
+
+每次生成运行（NFOWriter.begin_run() 到 finish()）在日志目录下追加写入一个 JSONL 文件，
+记录本次运行新建的文件和被覆盖文件的原内容，undo_run() 据此批量恢复：
+
+    {"run": "课程批量查找", "started": "2026-10-18 12:00:00", "pid": 1234}
+    {"op": "create", "path": "/课程/01.nfo", "crc": 305419896}
+    {"op": "overwrite", "path": "/课程/tvshow.nfo", "crc": 2271560481, "mode": 420, "prior": "<?xml ..."}
+    {"op": "undone", "at": "2026-10-18 12:30:00"}
+
+日志在文件真正写入前记录（内容未变化、跳过的文件不记录），每条记录一次追加写入，
+无需缓冲，进程中断时已写入的 NFO 均有记录。crc 为写入内容的 CRC32，
+撤销时文件已被再次修改的不会被恢复或删除。
+"""
+import base64
+import itertools
+import json
+import os
+import threading
+import time
+import zlib
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Union
+from ..utils.config import config
+
+# 日志记录的操作
+CREATED = "create"
+OVERWRITTEN = "overwrite"
+UNDONE = "undone"
+
+JOURNAL_SUFFIX = ".jsonl"
+
+_journal_ids = itertools.count(1)
+
+
+def _now() -> str:
+    return time.strftime("%Y-%m-%d %H:%M:%S")
+
+
+def journal_dir() -> Optional[Path]:
+    """日志目录（相对路径位于程序数据目录下），配置 nfo_journal_dir 为空时不记录日志"""
+    return config.data_path('nfo_journal_dir')
+
+
+class RunJournal:
+    """一次生成运行的撤销日志（只追加写入，可在多个线程中同时记录）"""
+
+    def __init__(self, path: Path, label: str = ""):
+        self.path = path
+        self.entries = 0
+        self._lock = threading.Lock()
+        self._fd: Optional[int] = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_APPEND
+                                          | getattr(os, 'O_BINARY', 0), 0o644)
+        self._append({"run": label, "started": _now(), "pid": os.getpid()})
+
+    @classmethod
+    def create(cls, label: str = "") -> Optional["RunJournal"]:
+        """在日志目录下新建日志，并清理超出保留数量的旧日志；未启用日志时返回 None"""
+        directory = journal_dir()
+        if directory is None:
+            return None
+        directory.mkdir(parents=True, exist_ok=True)
+        name = f"run-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{next(_journal_ids)}{JOURNAL_SUFFIX}"
+        journal = cls(directory / name, label)
+        keep = config.get('nfo_journal_keep')
+        if keep:
+            for old in list_runs(directory)[keep:]:
+                try:
+                    old.unlink()
+                except OSError as e:
+                    print(f"删除旧撤销日志 {old} 时出错: {e}")
+        return journal
+
+    def _append(self, record: dict) -> None:
+        line = (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8")
+        with self._lock:
+            if self._fd is None:
+                raise ValueError(f"撤销日志已关闭: {self.path}")
+            os.write(self._fd, line)
+            self.entries += 1
+
+    def created(self, path: Path, data: bytes) -> None:
+        """记录即将新建的文件"""
+        self._append({"op": CREATED, "path": os.path.abspath(path), "crc": zlib.crc32(data)})
+
+    def overwritten(self, path: Path, prior: bytes, mode: Optional[int], data: bytes) -> None:
+        """记录即将被覆盖的文件及其原内容"""
+        record = {"op": OVERWRITTEN, "path": os.path.abspath(path), "crc": zlib.crc32(data), "mode": mode}
+        try:
+            record["prior"] = prior.decode("utf-8")
+        except UnicodeDecodeError:
+            record["prior_b64"] = base64.b64encode(prior).decode("ascii")
+        self._append(record)
+
+    def sync(self) -> None:
+        """将日志刷入磁盘"""
+        with self._lock:
+            if self._fd is not None:
+                os.fsync(self._fd)
+
+    def close(self) -> None:
+        with self._lock:
+            fd, self._fd = self._fd, None
+        if fd is not None:
+            os.close(fd)
+
+
+def list_runs(directory: Optional[Path] = None) -> List[Path]:
+    """日志目录中的撤销日志，最新的在前"""
+    directory = directory if directory is not None else journal_dir()
+    if directory is None or not directory.is_dir():
+        return []
+    runs = [p for p in directory.iterdir() if p.name.startswith("run-") and p.suffix == JOURNAL_SUFFIX]
+    return sorted(runs, key=lambda p: (p.stat().st_mtime, p.name), reverse=True)
+
+
+def _reversed_lines(path: Path, block_size: int = 1 << 16) -> Iterator[bytes]:
+    """从文件末尾开始逐行读取，不把整个日志读入内存"""
+    with open(path, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        position = f.tell()
+        tail = b""
+        while position > 0:
+            step = min(block_size, position)
+            position -= step
+            f.seek(position)
+            lines = (f.read(step) + tail).split(b"\n")
+            tail = lines.pop(0)
+            for line in reversed(lines):
+                if line.strip():
+                    yield line
+        if tail.strip():
+            yield tail
+
+
+def is_undone(journal_path: Union[str, Path]) -> bool:
+    """日志是否已完整撤销（最后一条记录为撤销标记）"""
+    try:
+        for line in _reversed_lines(Path(journal_path)):
+            try:
+                return json.loads(line).get("op") == UNDONE
+            except ValueError:
+                return False
+    except OSError:
+        return False
+    return False
+
+
+def last_undoable_run(directory: Optional[Path] = None) -> Optional[Path]:
+    """最近一次尚未撤销的运行日志"""
+    return next((run for run in list_runs(directory) if not is_undone(run)), None)
+
+
+@dataclass
+class UndoStats:
+    """一次撤销的统计"""
+    restored: int = 0  # 恢复原内容
+    removed: int = 0  # 删除本次运行新建的文件
+    skipped: int = 0  # 运行后已被修改或已不存在，未处理
+    failed: int = 0
+
+    def __str__(self) -> str:
+        return (f"恢复 {self.restored} 个，删除 {self.removed} 个，"
+                f"跳过 {self.skipped} 个（已被修改或不存在），失败 {self.failed} 个")
+
+
+def _current_crc(path: Path) -> Optional[int]:
+    try:
+        with open(path, 'rb') as f:
+            return zlib.crc32(f.read())
+    except FileNotFoundError:
+        return None
+
+
+def _undo_entry(record: dict) -> str:
+    """撤销一条记录，返回 UndoStats 中对应的字段名"""
+    from .nfo_serializer import atomic_write
+
+    path = Path(record["path"])
+    if _current_crc(path) != record["crc"]:
+        return "skipped"
+    if record["op"] == CREATED:
+        path.unlink()
+        return "removed"
+    if "prior_b64" in record:
+        prior = base64.b64decode(record["prior_b64"])
+    else:
+        prior = record["prior"].encode("utf-8")
+    atomic_write(path, prior, record.get("mode"))
+    return "restored"
+
+
+def undo_run(journal_path: Union[str, Path], workers: Optional[int] = None,
+             force: bool = False) -> UndoStats:
+    """撤销一次生成运行：删除新建的文件，恢复被覆盖文件的原内容
+
+    从日志末尾向前处理，同一文件被写入多次时最终恢复为运行前的内容。
+    不同文件并发处理，同一文件的记录按顺序处理。全部成功时在日志末尾追加撤销标记；
+    有失败的记录时不追加，之后可以再次撤销（已恢复的文件因内容已变化而跳过）。
+
+    Args:
+        journal_path: 撤销日志
+        workers: 并发线程数，None 时使用配置 nfo_write_workers
+        force: 日志已撤销过时仍然执行
+
+    Raises:
+        ValueError: 日志已撤销过且未指定 force
+    """
+    from .nfo_serializer import fsync_dirs
+
+    journal_path = Path(journal_path)
+    stats = UndoStats()
+    lock = threading.Lock()
+    pending: Dict[str, Future] = {}  # 每个文件最后提交的撤销任务
+    dirs = set()
+
+    def run(record: dict, previous: Optional[Future]) -> None:
+        try:
+            if previous is not None:
+                previous.result()
+            result = _undo_entry(record)
+        except Exception as e:
+            print(f"撤销 {record['path']} 时出错: {e}")
+            result = "failed"
+        finally:
+            slots.release()
+        with lock:
+            setattr(stats, result, getattr(stats, result) + 1)
+            if result in ("restored", "removed"):
+                dirs.add(Path(record["path"]).parent)
+
+    def forget(path: str, future: Future) -> None:
+        with lock:
+            if pending.get(path) is future:
+                del pending[path]
+
+    workers = workers or config.get('nfo_write_workers') or 1
+    slots = threading.BoundedSemaphore(workers * 4)  # 限制排队的记录数，日志再大内存占用也有上限
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="nfo-undo") as executor:
+        for line_no, line in enumerate(_reversed_lines(journal_path)):
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # 进程中断时最后一行可能不完整
+                print(f"撤销日志 {journal_path} 中有无法解析的记录，已忽略")
+                continue
+            op = record.get("op")
+            if op == UNDONE:
+                if line_no == 0 and not force:
+                    raise ValueError(f"该运行已于 {record.get('at')} 撤销: {journal_path}")
+                continue
+            if op not in (CREATED, OVERWRITTEN):
+                continue
+            path = record["path"]
+            slots.acquire()
+            with lock:
+                previous = pending.get(path)
+            future = executor.submit(run, record, previous)
+            with lock:
+                pending[path] = future
+            future.add_done_callback(lambda f, p=path: forget(p, f))
+    fsync_dirs(sorted(dirs))
+
+    if stats.failed == 0:
+        with open(journal_path, 'a', encoding='utf-8', newline='\n') as f:
+            f.write(json.dumps({"op": UNDONE, "at": _now()}, ensure_ascii=False) + "\n")
+    return stats
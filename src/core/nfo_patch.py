@@ -0,0 +1,152 @@
+"""
+NFO修改模块
+
+编辑界面保存时只修改有变化的部分：描述、课程类型、分类（标签）与现有 NFO 一致的不动，
+三者都一致时不解析也不写入文件。只有 "根元素 + 一层文本子元素" 的 NFO 按模板重新输出
+（与生成器的格式一致），其它结构的 NFO 用 ElementTree 修改。
+批量保存在线程池中并发处理各个课程，写入经过 NFOWriter（内容相同不写入、原子替换、撤销日志）。
+"""
+import threading
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Iterable, List, Optional, Set, Tuple
+from .nfo_reader import NFOData, nfo_reader
+from .nfo_serializer import NFOWriter, WriteStats, render_nfo, WRITTEN, UNCHANGED
+from .tags import TagManager
+from ..utils.config import config
+
+_BATCH_SIZE = 32  # 批量保存时每个任务处理的课程数
+
+
+@dataclass
+class CourseEdit:
+    """编辑界面对课程的修改"""
+    plot: str
+    course_types: Set[str] = field(default_factory=set)
+    tags: Set[str] = field(default_factory=set)
+
+    def differs_from(self, nfo_data: Optional[NFOData]) -> bool:
+        """与现有 NFO 的内容是否不同"""
+        return (nfo_data is None
+                or nfo_data.plot != self.plot
+                or nfo_data.course_types != self.course_types
+                or nfo_data.tags != self.tags)
+
+
+def _replace_all(root: ET.Element, tag: str, values: Set[str]) -> None:
+    """删除全部 tag 元素，在末尾按顺序添加新的"""
+    for elem in root.findall(tag):
+        root.remove(elem)
+    for value in sorted(values):
+        ET.SubElement(root, tag).text = value
+
+
+def _is_simple(root: ET.Element) -> bool:
+    """是否为 "根元素 + 一层文本子元素" 的结构（生成器输出的格式）"""
+    if root.attrib or (root.text and root.text.strip()):
+        return False
+    return all(not child.attrib and len(child) == 0 and not (child.tail and child.tail.strip())
+               for child in root)
+
+
+def patch_tvshow(nfo_path: Path, edit: CourseEdit, title: Optional[str] = None,
+                 compact: bool = False) -> bytes:
+    """按修改生成新的 tvshow.nfo 内容
+
+    Args:
+        title: 文件不存在时新建 NFO 使用的标题，None 时不写标题
+        compact: 按模板输出时是否使用紧凑格式
+
+    Raises:
+        ET.ParseError: 现有 NFO 不是合法的 XML
+    """
+    current = nfo_reader.read(nfo_path)
+    if nfo_path.exists():
+        root = ET.parse(nfo_path).getroot()
+    else:
+        root = ET.Element("tvshow")
+        if title is not None:
+            ET.SubElement(root, "title").text = title
+
+    if current is None or current.plot != edit.plot:
+        plot = root.find("plot")
+        if plot is None:
+            plot = ET.SubElement(root, "plot")
+        plot.text = edit.plot
+    if current is None or current.course_types != edit.course_types:
+        _replace_all(root, "coursetype", edit.course_types)
+    if current is None or current.tags != edit.tags:
+        _replace_all(root, "genre", edit.tags)
+
+    if _is_simple(root):
+        return render_nfo(root.tag, [(child.tag, child.text) for child in root], compact)
+    return ET.tostring(root, encoding='unicode').encode('utf-8')
+
+
+def save_course_edit(course_path: Path, edit: CourseEdit, writer: NFOWriter,
+                     tag_manager: Optional[TagManager] = None, title: Optional[str] = None) -> str:
+    """保存一个课程的修改：标签文件与 tvshow.nfo
+
+    Returns:
+        NFOWriter 的写入结果，NFO 内容已与修改一致时为 UNCHANGED
+    """
+    if tag_manager is not None:
+        tag_manager.save_tags(course_path, edit.tags)
+    nfo_path = course_path / "tvshow.nfo"
+    if not edit.differs_from(nfo_reader.read(nfo_path)):
+        return UNCHANGED
+    result = writer.write_data(nfo_path, patch_tvshow(nfo_path, edit, title, writer.resolve_compact()))
+    nfo_reader.invalidate(nfo_path)
+    return result
+
+
+def save_course_edits(courses: Iterable[Tuple[str, Path]], edit: CourseEdit, writer: NFOWriter,
+                      tag_manager: Optional[TagManager] = None, workers: Optional[int] = None,
+                      callback: Optional[Callable[[str, Optional[str]], None]] = None) -> WriteStats:
+    """将同一修改并发应用到多个课程
+
+    Args:
+        courses: (课程名, 课程目录)，课程名作为新建 NFO 的标题
+        workers: 并发线程数，None 时使用配置 nfo_write_workers
+        callback: 每个课程处理完后调用 callback(课程名, 写入结果)，出错时结果为 None；
+            在工作线程中调用
+
+    Returns:
+        本次保存的统计，出错的课程计入跳过
+    """
+    courses = list(courses)
+    workers = workers or config.get('nfo_write_workers') or 1
+    stats = WriteStats()
+    lock = threading.Lock()
+
+    def save_batch(batch: List[Tuple[str, Path]]) -> None:
+        for course_name, course_path in batch:
+            try:
+                result = save_course_edit(course_path, edit, writer, tag_manager, course_name)
+            except Exception as e:
+                print(f"保存课程 {course_name} 时出错: {e}")
+                result = None
+            with lock:
+                if result == WRITTEN:
+                    stats.written += 1
+                elif result == UNCHANGED:
+                    stats.unchanged += 1
+                else:
+                    stats.skipped += 1
+                if callback is not None:
+                    callback(course_name, result)
+
+    writer.begin_run("NFO编辑")
+    try:
+        batches = [courses[i:i + _BATCH_SIZE] for i in range(0, len(courses), _BATCH_SIZE)]
+        if workers <= 1 or len(batches) < 2:
+            for batch in batches:
+                save_batch(batch)
+        else:
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="nfo-edit") as executor:
+                list(executor.map(save_batch, batches))
+    finally:
+        writer.finish()
+    return stats
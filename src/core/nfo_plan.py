@@ -0,0 +1,206 @@
+"""
+NFO生成计划模块
+
+计划阶段：在 NFOWriter.planning(plan) 中运行任意生成器（NFOGenerator、BatchNFOGenerator、
+SingleNFOGenerator），生成器的逻辑不变，但所有写入只被判断并记录为计划，不写入磁盘：
+
+    plan = NFOPlan()
+    with generator.writer.planning(plan):
+        generator.generate_course_nfos(course_path, language_path, chapters)
+    print(plan.summary())
+    plan.save("plan.jsonl")
+
+执行阶段：NFOPlan.load("plan.jsonl").apply() 按计划写入，无需重新扫描目录。
+直接给出内容的写入（NFOWriter.write_data，如增量模式只更新总集数的 tvshow.nfo）在计划中
+保存完整内容，执行时原样写入，与直接运行的结果逐字节一致。
+plan_directory() 按“NFO生成”标签页的流程为整个目录生成计划。
+"""
+import base64
+import json
+import threading
+from collections import Counter
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+from .nfo_serializer import NFOWriter, WriteStats, CREATE, OVERWRITE, UNCHANGED, SKIPPED
+from .nfo_write_pool import NFOWritePool
+from .scanner import DirectoryScanner
+from .nfo import NFOGenerator
+from .tags import TagResolver
+from .dir_snapshot import open_tree
+
+ACTIONS = (CREATE, OVERWRITE, UNCHANGED, SKIPPED)
+
+_ACTION_LABELS = {
+    CREATE: "新建",
+    OVERWRITE: "覆盖",
+    UNCHANGED: "未变化",
+    SKIPPED: "跳过",
+}
+
+
+@dataclass
+class PlannedWrite:
+    """一条计划中的 NFO 操作"""
+    action: str  # CREATE / OVERWRITE / UNCHANGED / SKIPPED
+    path: Path
+    root_tag: str
+    fields: List[Tuple[str, Optional[str]]] = field(default_factory=list)
+    size: int = 0  # 生成的 NFO 字节数（跳过的文件为 0）
+    compact: bool = False
+    data: Optional[bytes] = None  # 直接给出的完整内容（write_data），此时不按 fields 生成
+
+    def to_json(self) -> str:
+        record = {
+            "action": self.action,
+            "path": str(self.path),
+            "root": self.root_tag,
+            "fields": self.fields,
+            "bytes": self.size,
+            "compact": self.compact,
+        }
+        if self.data is not None:
+            try:
+                record["data"] = self.data.decode("utf-8")
+            except UnicodeDecodeError:
+                record["data_b64"] = base64.b64encode(self.data).decode("ascii")
+        return json.dumps(record, ensure_ascii=False)
+
+    @classmethod
+    def from_json(cls, line: str) -> "PlannedWrite":
+        data = json.loads(line)
+        if data["action"] not in ACTIONS:
+            raise ValueError(f"未知的操作类型: {data['action']}")
+        if "data_b64" in data:
+            content = base64.b64decode(data["data_b64"])
+        elif "data" in data:
+            content = data["data"].encode("utf-8")
+        else:
+            content = None
+        return cls(
+            action=data["action"],
+            path=Path(data["path"]),
+            root_tag=data["root"],
+            fields=[(tag, text) for tag, text in data["fields"]],
+            size=data.get("bytes", 0),
+            compact=data.get("compact", False),
+            data=content,
+        )
+
+
+class NFOPlan:
+    """NFO 生成计划（按记录顺序保存的操作清单，每个文件一条）"""
+
+    def __init__(self, entries: Optional[List[PlannedWrite]] = None):
+        self.entries: List[PlannedWrite] = []
+        self._index: Dict[Path, int] = {}
+        self._lock = threading.Lock()
+        for entry in entries or []:
+            self._record(entry)
+
+    def add(self, action: str, path: Path, root_tag: str, fields: List[Tuple[str, Optional[str]]],
+            size: int, compact: bool, data: Optional[bytes] = None) -> None:
+        """记录一条操作（由 NFOWriter 在计划模式下调用）"""
+        entry = PlannedWrite(action, path, root_tag, fields, size, compact, data)
+        with self._lock:
+            self._record(entry)
+
+    def _record(self, entry: PlannedWrite) -> None:
+        """同一文件被多次写入时（如课程被重复扫描到），以最后一次写入的内容为准"""
+        i = self._index.get(entry.path)
+        if i is None:
+            self._index[entry.path] = len(self.entries)
+            self.entries.append(entry)
+        elif entry.action != SKIPPED:
+            # 实际运行时第一次写入后文件已存在，不覆盖的后续写入会被跳过，保留之前的计划
+            self.entries[i] = entry
+
+    def counts(self) -> Dict[str, int]:
+        """各类操作的数量"""
+        counter = Counter(entry.action for entry in self.entries)
+        return {action: counter.get(action, 0) for action in ACTIONS}
+
+    def bytes_to_write(self) -> int:
+        """执行计划将写入的字节数（新建与覆盖）"""
+        return sum(entry.size for entry in self.entries if entry.action in (CREATE, OVERWRITE))
+
+    def summary(self) -> str:
+        counts = self.counts()
+        parts = [f"{_ACTION_LABELS[action]} {counts[action]} 个" for action in ACTIONS]
+        return "，".join(parts) + f"，共写入 {self.bytes_to_write()} 字节"
+
+    def save(self, path: Union[str, Path]) -> None:
+        """导出为 JSONL，每行一条操作"""
+        with open(path, 'w', encoding='utf-8', newline='\n') as f:
+            for entry in self.entries:
+                f.write(entry.to_json())
+                f.write("\n")
+
+    @classmethod
+    def load(cls, path: Union[str, Path]) -> "NFOPlan":
+        """读取 save() 导出的计划"""
+        entries = []
+        with open(path, 'r', encoding='utf-8') as f:
+            for line_no, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    entries.append(PlannedWrite.from_json(line))
+                except (ValueError, KeyError, TypeError) as e:
+                    raise ValueError(f"计划文件 {path} 第 {line_no} 行格式错误: {e}") from e
+        return cls(entries)
+
+    def apply(self, pool: Optional[NFOWritePool] = None) -> WriteStats:
+        """执行计划中的新建与覆盖操作
+
+        计划为新建、但执行时文件已存在的不会被覆盖；写入前仍会比较内容，
+        与计划时相比已相同的文件不再写入。
+
+        Args:
+            pool: 写入池，None 时按配置创建
+
+        Returns:
+            本次执行的写入统计
+        """
+        if pool is None:
+            pool = NFOWritePool(NFOWriter())
+        pool.writer.begin_run("执行计划")
+        with pool.course():
+            for entry in self.entries:
+                if entry.action not in (CREATE, OVERWRITE):
+                    continue
+                if entry.data is not None:
+                    pool.submit_data(entry.path, entry.data, overwrite=entry.action == OVERWRITE,
+                                     message=f"写入NFO: {entry.path}")
+                    continue
+                pool.submit(entry.path, entry.root_tag, entry.fields,
+                            overwrite=entry.action == OVERWRITE,
+                            message=f"写入NFO: {entry.path}", compact=entry.compact)
+        pool.writer.finish()
+        return pool.writer.stats
+
+
+def plan_directory(root: Path, generator: Optional[NFOGenerator] = None) -> NFOPlan:
+    """扫描目录，为其中所有课程生成 NFO 计划（不写入磁盘）
+
+    Args:
+        root: 根目录
+        generator: NFOGenerator，None 时新建
+    """
+    if generator is None:
+        generator = NFOGenerator()
+    scanner = DirectoryScanner()
+    tag_resolver = TagResolver()
+    with open_tree(Path(root), scanner.max_workers, scanner.scan_index) as node:
+        courses = scanner.scan_directory(node)
+        language_dirs = {scanner.mandarin_dir_name, scanner.original_dir_name}
+        tags_by_dir = tag_resolver.resolve_tree(node, prune=lambda d: d.name in language_dirs)
+
+    plan = NFOPlan()
+    with generator.writer.planning(plan):
+        for course in courses:
+            tags = tags_by_dir.get(course.path)
+            if tags is None:
+                tags = tag_resolver.resolve(course.path)
+            generator.generate_course_nfo(course, tags)
+    return plan
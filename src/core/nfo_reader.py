@@ -0,0 +1,153 @@
+"""
+NFO读取模块
+
+编辑界面只需要 tvshow.nfo 中的标题、描述、课程类型和分类，
+用 expat 流式解析只取这几个根元素下的子元素，不构建 ElementTree。
+解析结果按路径缓存，以 (mtime, 大小) 判断文件是否变化，重新打开目录时无需再次解析；
+read_many() 在线程池中批量读取，网络共享上的大量小文件读取可以并发进行。
+"""
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+from xml.parsers import expat
+from ..utils.config import config
+
+
+@dataclass
+class NFOData:
+    """NFO数据类"""
+    title: str
+    plot: str = ""
+    tags: Set[str] = field(default_factory=set)
+    poster: Optional[Path] = None
+    season: int = 1
+    episode: int = 1
+    course_types: Set[str] = field(default_factory=set)
+
+
+# 缓存的解析结果：(标题, 描述, 分类, 课程类型)，None 表示文件无法解析
+_Parsed = Optional[Tuple[str, str, FrozenSet[str], FrozenSet[str]]]
+
+_FIELDS = frozenset({"title", "plot", "coursetype", "genre"})
+
+_BATCH_SIZE = 64  # read_many 每个任务读取的文件数
+
+
+def parse_fields(content: bytes, names: FrozenSet[str]) -> Dict[str, List[str]]:
+    """取根元素下指定名称的子元素文本，按出现顺序
+
+    与 ElementTree 的 findall() 结果一致：只取子元素自身的文本（不含其中的下级元素），空元素为 ""。
+
+    Raises:
+        expat.ExpatError: 内容不是合法的 XML
+        ValueError: 编码声明为 expat 不支持的多字节编码（与 ElementTree 相同）
+    """
+    # 文本片段直接追加到列表，元素事件只记录名称与当时的片段数，解析后再按层级取文本
+    chunks: List[str] = []
+    events: List[Tuple[Optional[str], int]] = []  # (开始的元素名，结束时为 None, 片段数)
+    parser = expat.ParserCreate()
+    parser.buffer_text = True
+    parser.CharacterDataHandler = chunks.append
+    parser.StartElementHandler = lambda name, attrs: events.append((name, len(chunks)))
+    parser.EndElementHandler = lambda name: events.append((None, len(chunks)))
+    parser.Parse(content, True)
+
+    values: Dict[str, List[str]] = {name: [] for name in names}
+    depth = 0
+    current: Optional[str] = None  # 正在取文本的子元素名
+    begin = 0
+    for name, index in events:
+        if current is not None:
+            # 子元素结束，或其中出现下级元素（ElementTree 的 text 到此为止）
+            values[current].append("".join(chunks[begin:index]))
+            current = None
+        elif name is not None and depth == 1 and name in names:
+            current, begin = name, index
+        depth += 1 if name is not None else -1
+    return values
+
+
+def parse_nfo(path: Path) -> _Parsed:
+    """解析 NFO，取根元素下第一个 title、plot 以及全部非空的 coursetype、genre
+
+    Raises:
+        OSError: 文件无法读取
+        expat.ExpatError / ValueError: 见 parse_fields
+    """
+    with open(path, 'rb') as f:
+        values = parse_fields(f.read(), _FIELDS)
+    title = values["title"][0] if values["title"] else ""
+    plot = values["plot"][0] if values["plot"] else ""
+    tags = frozenset(t for t in values["genre"] if t)
+    course_types = frozenset(t for t in values["coursetype"] if t)
+    return title, plot, tags, course_types
+
+
+class NFOReader:
+    """带缓存的 NFO 读取器，可在多个线程中同时调用"""
+
+    def __init__(self, workers: Optional[int] = None):
+        self.workers = workers or config.get('nfo_read_workers') or 1  # read_many 的并发线程数
+        self._cache: Dict[Path, Tuple[Tuple[int, int], _Parsed]] = {}
+        self._lock = threading.Lock()
+
+    def read(self, nfo_path: Path) -> Optional[NFOData]:
+        """读取 NFO，文件不存在或无法解析时返回 None
+
+        每次返回新的 NFOData，调用方可以修改其中的集合。
+        """
+        try:
+            st = os.stat(nfo_path)
+        except OSError:
+            self.invalidate(nfo_path)
+            return None
+        key = (st.st_mtime_ns, st.st_size)
+        with self._lock:
+            cached = self._cache.get(nfo_path)
+        if cached is not None and cached[0] == key:
+            parsed = cached[1]
+        else:
+            try:
+                parsed = parse_nfo(nfo_path)
+            except (OSError, ValueError, expat.ExpatError) as e:
+                print(f"读取NFO文件时出错: {e}")
+                parsed = None
+            with self._lock:
+                self._cache[nfo_path] = (key, parsed)
+        if parsed is None:
+            return None
+        title, plot, tags, course_types = parsed
+        return NFOData(title=title, plot=plot, tags=set(tags), course_types=set(course_types))
+
+    def read_many(self, nfo_paths: Iterable[Path]) -> Dict[Path, Optional[NFOData]]:
+        """在线程池中批量读取，返回 {路径: NFOData 或 None}"""
+        paths = list(nfo_paths)
+        if self.workers <= 1 or len(paths) < 2:
+            return {path: self.read(path) for path in paths}
+        # 按批提交，避免为每个小文件创建一个任务
+        size = max(1, min(_BATCH_SIZE, len(paths) // (self.workers * 4)))
+        batches = [paths[i:i + size] for i in range(0, len(paths), size)]
+        results: Dict[Path, Optional[NFOData]] = {}
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="nfo-read") as executor:
+            for batch, data in zip(batches, executor.map(self._read_batch, batches)):
+                results.update(zip(batch, data))
+        return results
+
+    def _read_batch(self, paths: List[Path]) -> List[Optional[NFOData]]:
+        return [self.read(path) for path in paths]
+
+    def invalidate(self, nfo_path: Path) -> None:
+        """丢弃文件的缓存（写入后 mtime 与大小可能均未变化时调用）"""
+        with self._lock:
+            self._cache.pop(nfo_path, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._cache.clear()
+
+
+# 全局读取器，各标签页共享缓存
+nfo_reader = NFOReader()
@@ -0,0 +1,453 @@
+"""
+NFO序列化模块
+
+NFO 文件只有 tvshow / episodedetails 这类“根元素 + 一层文本子元素”的固定结构，
+因此直接按模板拼接输出，不再经过 ElementTree 序列化、minidom 解析再美化的三次处理。
+默认输出与 minidom.toprettyxml(indent="  ") 的结果逐字节一致，另提供紧凑模式；
+换行符与原先以文本模式写入时相同（os.linesep，Windows 上为 CRLF）。
+NFOWriter 在内容未变化时不重写文件（只有换行符不同也视为未变化），避免媒体服务器因 mtime 变化而重新扫描；
+写入时先写同目录下的临时文件再重命名覆盖，读取方不会看到写了一半的 NFO。
+每次运行新建和覆盖的文件记录在撤销日志中（见 nfo_journal），可整体撤销。
+"""
+import io
+import itertools
+import os
+import re
+import stat
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, FrozenSet, Iterable, Iterator, List, Optional, Set, Tuple
+from xml.dom import minidom
+from xml.parsers import expat
+from ..utils.config import config
+from .nfo_journal import RunJournal
+from .nfo_reader import parse_fields
+
+# NFOWriter.write 的结果
+WRITTEN = "written"  # 新建或内容有变化，已写入
+UNCHANGED = "unchanged"  # 已存在且内容相同，未写入
+SKIPPED = "skipped"  # 已存在且不覆盖，未写入
+PLANNED = "planned"  # 计划模式，只记录不写入
+
+# 计划中的写入操作（另见 UNCHANGED / SKIPPED）
+CREATE = "create"  # 新建
+OVERWRITE = "overwrite"  # 覆盖已有文件
+
+# 输出的换行符，与原先 open(path, 'w') 文本模式写入一致
+NEWLINE = os.linesep
+
+# 临时文件后缀（扫描与监视时忽略）
+TEMP_SUFFIX = ".nfotmp"
+
+_temp_ids = itertools.count()
+
+# 元素列表：(标签名, 文本)，文本为 None 或空字符串时输出空元素
+Fields = Iterable[Tuple[str, Optional[str]]]
+
+_DECLARATION = '<?xml version="1.0" ?>\n'
+_COMPACT_DECLARATION = '<?xml version="1.0" encoding="utf-8"?>\n'
+
+# XML 1.0 不允许的字符（含孤立代理项，来自无法解码的文件名）
+_INVALID_CHARS = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f\ud800-\udfff\ufffe\uffff]')
+
+
+def _probe_quote_escaping() -> bool:
+    """minidom 是否在文本节点中转义双引号（Python 3.13 起不再转义）"""
+    writer = io.StringIO()
+    minidom.Document().createTextNode('"').writexml(writer)
+    return writer.getvalue() != '"'
+
+
+_ESCAPE_QUOTES = _probe_quote_escaping()
+
+
+def escape_text(text: str) -> str:
+    """按 minidom 的规则转义文本，并与解析器一样将 \\r\\n、\\r 规范化为 \\n
+
+    Raises:
+        ValueError: 文本包含 XML 不允许的字符
+    """
+    match = _INVALID_CHARS.search(text)
+    if match:
+        raise ValueError(f"包含 XML 不允许的字符 {match.group()!r}: {text!r}")
+    if "\r" in text:
+        text = text.replace("\r\n", "\n").replace("\r", "\n")
+    if "&" in text:
+        text = text.replace("&", "&amp;")
+    if "<" in text:
+        text = text.replace("<", "&lt;")
+    if _ESCAPE_QUOTES and '"' in text:
+        text = text.replace('"', "&quot;")
+    if ">" in text:
+        text = text.replace(">", "&gt;")
+    return text
+
+
+_templates: Dict[Tuple[str, bool], Tuple[str, str, str]] = {}
+
+
+def _template(tag: str, compact: bool) -> Tuple[str, str, str]:
+    """(开始标签, 结束标签, 空元素) 模板，按标签名缓存"""
+    key = (tag, compact)
+    template = _templates.get(key)
+    if template is None:
+        if compact:
+            template = (f"<{tag}>", f"</{tag}>", f"<{tag}/>")
+        else:
+            template = (f"  <{tag}>", f"</{tag}>\n", f"  <{tag}/>\n")
+        _templates[key] = template
+    return template
+
+
+def _prefix(root_tag: str, compact: bool) -> str:
+    if compact:
+        return f"{_COMPACT_DECLARATION}<{root_tag}>"
+    return f"{_DECLARATION}<{root_tag}>\n"
+
+
+def rendered_prefix(root_tag: str, compact: bool = False) -> str:
+    """render_nfo 输出的开头：XML 声明与根元素开始标签"""
+    prefix = _prefix(root_tag, compact)
+    return prefix if NEWLINE == "\n" else prefix.replace("\n", NEWLINE)
+
+
+def render_nfo(root_tag: str, fields: Fields, compact: bool = False) -> bytes:
+    """生成 NFO 文件内容（UTF-8 编码）
+
+    Args:
+        root_tag: 根元素名，如 tvshow、episodedetails
+        fields: 按顺序排列的 (子元素名, 文本)
+        compact: 紧凑模式，不缩进不换行
+    """
+    parts = [_prefix(root_tag, compact)]
+    for tag, text in fields:
+        start, end, empty = _template(tag, compact)
+        if text:
+            parts.append(start)
+            parts.append(escape_text(text))
+            parts.append(end)
+        else:
+            parts.append(empty)
+    parts.append(f"</{root_tag}>\n")
+    content = "".join(parts)
+    if NEWLINE != "\n":
+        content = content.replace("\n", NEWLINE)
+    return content.encode("utf-8")
+
+
+def _lf(data: bytes) -> bytes:
+    """换行符统一为 LF"""
+    return data.replace(b"\r\n", b"\n")
+
+
+def _same_content(existing: Optional[bytes], data: bytes) -> bool:
+    """已有内容与新内容一致；只有换行符（LF / CRLF）不同也视为一致，
+    避免在另一个系统上运行时重写整个库"""
+    if existing is None:
+        return False
+    return existing == data or _lf(existing) == _lf(data)
+
+
+def _may_be_same(size: Optional[int], data: bytes) -> bool:
+    """按文件大小判断是否可能与 data 一致（换行符为 LF 或 CRLF 时的大小）"""
+    if size is None:
+        return False
+    if size == len(data):
+        return True
+    lf_size = len(data) - data.count(b"\r\n")
+    return size in (lf_size, lf_size + data.count(b"\n"))
+
+
+def is_temp_file(name: str) -> bool:
+    """是否为写入 NFO 时使用的临时文件"""
+    return name.endswith(TEMP_SUFFIX)
+
+
+def atomic_write(path: Path, data: bytes, mode: Optional[int] = None, fsync: bool = False) -> None:
+    """先写入同目录下的临时文件，再重命名覆盖目标文件
+
+    读取方只会看到旧文件或完整的新文件，写入中断时目标文件保持不变。
+
+    Args:
+        mode: 文件权限，None 时按 umask 创建
+        fsync: 重命名前是否将文件内容刷入磁盘
+    """
+    tmp = path.with_name(f".{path.name}.{os.getpid()}-{next(_temp_ids)}{TEMP_SUFFIX}")
+    fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, 'O_BINARY', 0), 0o666)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            if fsync:
+                f.flush()
+                os.fsync(f.fileno())
+        if mode is not None:
+            os.chmod(tmp, mode)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+
+
+def fsync_dirs(dirs: Iterable[Path]) -> None:
+    """将目录项（重命名结果）刷入磁盘；Windows 无法打开目录，直接跳过"""
+    if os.name == 'nt':
+        return
+    for directory in dirs:
+        try:
+            fd = os.open(directory, os.O_RDONLY)
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+        except OSError as e:
+            print(f"同步目录 {directory} 时出错: {e}")
+
+
+def _stat_target(path: Path) -> Tuple[Path, Optional[int], Optional[int]]:
+    """(实际写入的路径, 大小, 权限)，文件不存在时大小与权限为 None
+
+    符号链接：替换链接指向的文件，保留链接本身。
+    """
+    try:
+        st = os.lstat(path)
+        if stat.S_ISLNK(st.st_mode):
+            path = Path(os.path.realpath(path))
+            st = os.stat(path)
+        return path, st.st_size, stat.S_IMODE(st.st_mode)
+    except FileNotFoundError:
+        return path, None, None
+
+
+def _read_existing(path: Path) -> Optional[bytes]:
+    """读取已有文件的内容，无法读取时返回 None"""
+    try:
+        with open(path, 'rb') as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def _same_fields(content: bytes, fields: List[Tuple[str, Optional[str]]], names: FrozenSet[str]) -> bool:
+    """已有内容中 names 指定的元素文本是否与 fields 一致（其它元素不比较）"""
+    try:
+        values = parse_fields(content, names)
+    except (ValueError, expat.ExpatError):
+        return False
+    expected: Dict[str, List[str]] = {name: [] for name in names}
+    for tag, text in fields:
+        if tag in names:
+            expected[tag].append(text or "")
+    return values == expected
+
+
+@dataclass
+class WriteStats:
+    """一次运行的 NFO 写入统计"""
+    written: int = 0
+    unchanged: int = 0
+    skipped: int = 0
+
+    def __str__(self) -> str:
+        return f"写入 {self.written} 个，未变化 {self.unchanged} 个，跳过 {self.skipped} 个"
+
+
+class NFOWriter:
+    """仅在内容变化时写入 NFO 的写入器
+
+    先比较文件大小，大小相同再比较内容；内容一致时不写入，保留原有 mtime。
+    文件以临时文件加重命名的方式原子替换，并保留原文件权限。
+    被修改的目录在 flush() 时统一刷盘，调用方每处理完一个课程调用一次即可。
+    begin_run() 与 finish() 之间为一次运行，实际写入的文件记录在本次运行的撤销日志中，
+    日志在第一次写入时创建（配置 nfo_journal_dir 为空时不记录）。
+    可在多个线程中同时调用 write()；传入 compare 时只比较指定元素的文本（增量重新编号）。
+    设置 plan 后进入计划模式：write() 只判断将要执行的操作并记录到 plan，不写入磁盘。
+    """
+
+    def __init__(self, compact: Optional[bool] = None):
+        self.compact = compact  # None 时每次写入读取配置 nfo_compact
+        self.stats = WriteStats()
+        self.plan: Optional[Any] = None  # 计划模式下记录操作的 NFOPlan
+        self.journal: Optional[RunJournal] = None  # 本次运行的撤销日志
+        self.run_label = ""
+        self._journal_opened = False
+        self._dirty_dirs: Set[Path] = set()
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def planning(self, plan: Any) -> Iterator[Any]:
+        """在 with 块内进入计划模式，生成器的所有写入记录到 plan（NFOPlan）"""
+        self.plan = plan
+        try:
+            yield plan
+        finally:
+            self.plan = None
+
+    def reset(self) -> None:
+        """清零统计，开始新的一次运行"""
+        with self._lock:
+            self.stats = WriteStats()
+
+    def begin_run(self, label: str = "") -> None:
+        """开始新的一次运行：结束上一次运行，清零统计
+
+        Args:
+            label: 运行名称，记录在撤销日志中
+        """
+        self.finish()
+        self.reset()
+        self.run_label = label
+
+    def finish(self) -> Optional[Path]:
+        """结束本次运行：刷盘并关闭撤销日志
+
+        Returns:
+            本次运行的撤销日志，没有写入任何文件时为 None
+        """
+        self.flush()
+        with self._lock:
+            journal, self.journal = self.journal, None
+            self._journal_opened = False
+        if journal is None:
+            return None
+        journal.close()
+        print(f"撤销日志: {journal.path}（{journal.entries - 1} 条记录）")
+        return journal.path
+
+    def flush(self) -> None:
+        """将本批写入涉及的目录（以及撤销日志）刷入磁盘"""
+        with self._lock:
+            dirs, self._dirty_dirs = self._dirty_dirs, set()
+            journal = self.journal
+        if journal is not None and config.get('nfo_fsync'):
+            journal.sync()
+        fsync_dirs(sorted(dirs))
+
+    def _run_journal(self) -> Optional[RunJournal]:
+        """本次运行的撤销日志，第一次写入时创建"""
+        with self._lock:
+            if not self._journal_opened:
+                self._journal_opened = True
+                try:
+                    self.journal = RunJournal.create(self.run_label)
+                except OSError as e:
+                    print(f"创建撤销日志时出错，本次运行不记录撤销日志: {e}")
+            return self.journal
+
+    def write(self, path: Path, root_tag: str, fields: Fields, overwrite: bool = True,
+              compact: Optional[bool] = None, compare: Optional[FrozenSet[str]] = None) -> str:
+        """写入 NFO 文件
+
+        Args:
+            overwrite: 文件已存在时是否覆盖，False 时直接跳过
+            compact: 是否使用紧凑格式，None 时使用写入器的设置
+            compare: 增量模式下比较的元素名：已有文件中这些元素的文本与 fields 一致时不写入，
+                不比较其它元素，也不生成新内容
+
+        Returns:
+            WRITTEN / UNCHANGED / SKIPPED，计划模式下为 PLANNED
+        """
+        plan = self.plan
+        if plan is not None:
+            fields = list(fields)
+            target = path
+        path, size, mode = _stat_target(path)
+        compact = self.resolve_compact(compact)
+        if size is not None and not overwrite:
+            if plan is not None:
+                plan.add(SKIPPED, target, root_tag, fields, 0, compact)
+                return PLANNED
+            with self._lock:
+                self.stats.skipped += 1
+            return SKIPPED
+
+        existing = None
+        if compare is not None and size is not None:
+            fields = list(fields)
+            existing = _read_existing(path)
+            if existing is not None and _same_fields(existing, fields, compare):
+                if plan is not None:
+                    plan.add(UNCHANGED, target, root_tag, fields, size, compact)
+                    return PLANNED
+                with self._lock:
+                    self.stats.unchanged += 1
+                return UNCHANGED
+
+        data = render_nfo(root_tag, fields, compact)
+        if existing is None and _may_be_same(size, data):
+            existing = _read_existing(path)
+        if _same_content(existing, data):
+            if plan is not None:
+                plan.add(UNCHANGED, target, root_tag, fields, len(data), compact)
+                return PLANNED
+            with self._lock:
+                self.stats.unchanged += 1
+            return UNCHANGED
+        if plan is not None:
+            plan.add(CREATE if size is None else OVERWRITE, target, root_tag, fields, len(data), compact)
+            return PLANNED
+        return self._replace(path, data, size, mode, existing)
+
+    def write_data(self, path: Path, data: bytes, overwrite: bool = True, root_tag: str = "") -> str:
+        """写入已生成的 NFO 内容（如编辑界面修改后的 NFO、只更新总集数的 tvshow.nfo）
+
+        计划模式下与 write() 相同只判断并记录，计划中保存这份内容（root_tag 仅用于计划记录）。
+
+        Returns:
+            WRITTEN / UNCHANGED / SKIPPED，计划模式下为 PLANNED
+        """
+        plan = self.plan
+        target = path
+        path, size, mode = _stat_target(path)
+        if size is not None and not overwrite:
+            if plan is not None:
+                plan.add(SKIPPED, target, root_tag, [], 0, False)
+                return PLANNED
+            with self._lock:
+                self.stats.skipped += 1
+            return SKIPPED
+        existing = _read_existing(path) if _may_be_same(size, data) else None
+        if _same_content(existing, data):
+            if plan is not None:
+                plan.add(UNCHANGED, target, root_tag, [], len(data), False, data)
+                return PLANNED
+            with self._lock:
+                self.stats.unchanged += 1
+            return UNCHANGED
+        if plan is not None:
+            plan.add(CREATE if size is None else OVERWRITE, target, root_tag, [], len(data), False, data)
+            return PLANNED
+        return self._replace(path, data, size, mode, existing)
+
+    def resolve_compact(self, compact: Optional[bool] = None) -> bool:
+        """是否使用紧凑格式：参数、写入器设置、配置 nfo_compact 依次生效"""
+        if compact is None:
+            compact = self.compact
+        if compact is None:
+            compact = bool(config.get('nfo_compact'))
+        return compact
+
+    def _replace(self, path: Path, data: bytes, size: Optional[int], mode: Optional[int],
+                 existing: Optional[bytes]) -> str:
+        """记录撤销日志并原子替换文件（existing 为已读取的原内容）"""
+        journal = self._run_journal()
+        if journal is not None:
+            # 先记录再替换，写入中断时日志中也有记录
+            if size is None:
+                journal.created(path, data)
+            else:
+                if existing is None:
+                    existing = _read_existing(path)
+                if existing is None:
+                    print(f"无法读取原文件，覆盖后将不能撤销: {path}")
+                else:
+                    journal.overwritten(path, existing, mode, data)
+        atomic_write(path, data, mode, bool(config.get('nfo_fsync')))
+        with self._lock:
+            self._dirty_dirs.add(path.parent)
+            self.stats.written += 1
+        return WRITTEN
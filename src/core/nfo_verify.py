@@ -0,0 +1,253 @@
+"""
+NFO一致性检查模块
+
+扫描整个目录，按当前的视频排序（DirectoryScanner._get_video_files_sorted）重新计算集数，
+与磁盘上已有 NFO 比较，不写入任何文件：
+
+- 视频缺少 NFO、NFO 无法解析
+- episode 与重新计算的全局集数不一致
+- 同一课程中重复的集数、缺失的集数
+- tvshow.nfo 缺失，或描述中的“总集数”已过期
+
+边扫描边检查：扫描到的课程立即提交到线程池（排队的课程数有上限，内存占用不随目录规模增长），
+扫描使用持久化扫描索引。结果按课程顺序写入 JSONL 报告：
+第一行为检查信息，之后每个有问题的课程一行，最后一行为汇总，便于定时任务解析。
+"""
+import json
+import os
+import re
+import time
+from collections import defaultdict, deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from itertools import groupby
+from pathlib import Path
+from typing import Any, Callable, Deque, Dict, Iterable, Iterator, List, Optional, Union
+from xml.parsers import expat
+from .scanner import Course, DirectoryScanner
+from .scan_index import ScanIndex
+from .nfo import NFOGenerator
+from .nfo_engine import ShowInfo, iter_chapter_videos
+from .nfo_reader import parse_fields
+from .nfo_cleanup import ProgressThrottle
+from ..utils.config import config
+
+# 问题类型
+MISSING_NFO = "missing_nfo"  # 视频没有 NFO
+UNREADABLE = "unreadable"  # NFO 无法解析
+WRONG_EPISODE = "wrong_episode"  # episode 与重新计算的集数不一致
+DUPLICATE_EPISODE = "duplicate_episode"  # 多个 NFO 使用同一集数
+MISSING_EPISODE = "missing_episode"  # 应有的集数没有任何 NFO 使用
+MISSING_TVSHOW = "missing_tvshow"  # 语言目录下没有 tvshow.nfo
+STALE_TOTAL = "stale_total"  # tvshow.nfo 的总集数已过期
+
+ISSUE_TYPES = (MISSING_NFO, UNREADABLE, WRONG_EPISODE, DUPLICATE_EPISODE, MISSING_EPISODE,
+               MISSING_TVSHOW, STALE_TOTAL)
+
+_EPISODE_FIELDS = frozenset({"episode"})
+_SHOW_FIELDS = frozenset({"plot"})
+_TOTAL_PATTERN = re.compile(r"总集数：(\d+)")
+
+
+@dataclass
+class CourseReport:
+    """一个课程语言版本的检查结果"""
+    course: Path
+    language: str
+    episodes: int
+    issues: List[Dict[str, Any]] = field(default_factory=list)
+
+    def to_json(self) -> str:
+        return json.dumps({
+            "course": str(self.course),
+            "language": self.language,
+            "episodes": self.episodes,
+            "issues": self.issues,
+        }, ensure_ascii=False)
+
+
+@dataclass
+class VerifySummary:
+    """整个目录的检查汇总"""
+    courses: int = 0
+    episodes: int = 0
+    courses_with_issues: int = 0
+    issues: Dict[str, int] = field(default_factory=lambda: {kind: 0 for kind in ISSUE_TYPES})
+
+    @property
+    def ok(self) -> bool:
+        return self.courses_with_issues == 0
+
+    def add(self, report: CourseReport) -> None:
+        self.courses += 1
+        self.episodes += report.episodes
+        if report.issues:
+            self.courses_with_issues += 1
+        for issue in report.issues:
+            self.issues[issue["type"]] += 1
+
+    def to_json(self) -> str:
+        return json.dumps({"summary": {
+            "courses": self.courses,
+            "episodes": self.episodes,
+            "courses_with_issues": self.courses_with_issues,
+            "issues": self.issues,
+        }}, ensure_ascii=False)
+
+    def __str__(self) -> str:
+        detail = "，".join(f"{kind} {count}" for kind, count in self.issues.items() if count)
+        return (f"检查 {self.courses} 个课程、{self.episodes} 集，"
+                f"{self.courses_with_issues} 个课程有问题" + (f"（{detail}）" if detail else ""))
+
+
+def _read_values(path: Path, names) -> Optional[Dict[str, List[str]]]:
+    """读取 NFO 中的字段，文件不存在时返回 None
+
+    Raises:
+        OSError / expat.ExpatError / ValueError: 文件无法读取或解析
+    """
+    try:
+        with open(path, 'rb') as f:
+            content = f.read()
+    except FileNotFoundError:
+        return None
+    return parse_fields(content, names)
+
+
+class NFOVerifier:
+    """按 NFOGenerator 的规则检查课程 NFO"""
+
+    def __init__(self, generator: Optional[NFOGenerator] = None):
+        self.generator = generator or NFOGenerator()
+
+    def verify_course(self, course: Course, totals: List[int]) -> CourseReport:
+        """检查一个课程语言版本
+
+        Args:
+            totals: 同一课程目录下各语言版本的视频数。生成时两个语言目录的 tvshow.nfo
+                写入的是其中一个版本的总集数，取值在其中即视为未过期
+        """
+        language = self._language_dir(course)
+        show = ShowInfo(course_path=course.path, nfo_dir=course.path, chapters=course.chapters,
+                        course_name=course.name, total_videos=course.video_count,
+                        structure_type=course.structure_type)
+        report = CourseReport(course.path, language or "", 0)
+        issues = report.issues
+        expected_numbers = set()
+        paths_by_number: Dict[int, List[str]] = defaultdict(list)
+
+        for _, video in self.generator.policy.episodes(show):
+            report.episodes += 1
+            expected = video.global_episode_number
+            expected_numbers.add(expected)
+            nfo_path = video.path.with_suffix('.nfo')
+            try:
+                values = _read_values(nfo_path, _EPISODE_FIELDS)
+            except (OSError, ValueError, expat.ExpatError) as e:
+                issues.append({"type": UNREADABLE, "path": str(nfo_path), "error": str(e)})
+                continue
+            if values is None:
+                issues.append({"type": MISSING_NFO, "path": str(nfo_path), "expected": expected})
+                continue
+            found = values["episode"][0].strip() if values["episode"] else ""
+            if found.isdigit():
+                paths_by_number[int(found)].append(str(nfo_path))
+            if found != str(expected):
+                issues.append({"type": WRONG_EPISODE, "path": str(nfo_path),
+                               "expected": expected, "found": found})
+
+        for number, paths in sorted(paths_by_number.items()):
+            if len(paths) > 1:
+                issues.append({"type": DUPLICATE_EPISODE, "episode": number, "paths": paths})
+        missing = sorted(expected_numbers - paths_by_number.keys())
+        if missing:
+            issues.append({"type": MISSING_EPISODE, "episodes": missing})
+
+        if language:
+            self._verify_tvshow(course.path / language, totals, issues)
+        return report
+
+    @staticmethod
+    def _language_dir(course: Course) -> Optional[str]:
+        """课程所属的语言目录名（课程目录下包含视频的那一级）"""
+        for _, video in iter_chapter_videos(course.chapters):
+            return video.path.relative_to(course.path).parts[0]
+        return None
+
+    def _verify_tvshow(self, language_dir: Path, totals: List[int], issues: List[Dict[str, Any]]) -> None:
+        nfo_path = language_dir / "tvshow.nfo"
+        try:
+            values = _read_values(nfo_path, _SHOW_FIELDS)
+        except (OSError, ValueError, expat.ExpatError) as e:
+            issues.append({"type": UNREADABLE, "path": str(nfo_path), "error": str(e)})
+            return
+        if values is None:
+            issues.append({"type": MISSING_TVSHOW, "path": str(nfo_path)})
+            return
+        plot = values["plot"][0] if values["plot"] else ""
+        match = _TOTAL_PATTERN.search(plot)
+        found = int(match.group(1)) if match else None
+        if found not in totals:
+            issues.append({"type": STALE_TOTAL, "path": str(nfo_path),
+                           "expected": sorted(set(totals)), "found": found})
+
+    def verify_course_dir(self, courses: List[Course]) -> List[CourseReport]:
+        """检查同一课程目录下的各语言版本"""
+        totals = [course.video_count for course in courses]
+        return [self.verify_course(course, totals) for course in courses]
+
+
+def _group_by_course_dir(courses: Iterable[Course]) -> Iterator[List[Course]]:
+    """扫描结果中同一课程目录的语言版本相邻，可直接对流式扫描分组"""
+    for _, group in groupby(courses, key=lambda course: course.path):
+        yield list(group)
+
+
+def verify_library(root: Path, report_path: Union[str, Path], workers: Optional[int] = None,
+                   progress: Optional[Callable[[int, int], None]] = None) -> VerifySummary:
+    """检查目录下所有课程的 NFO，并写入 JSONL 报告
+
+    Args:
+        workers: 并发检查的线程数，None 时使用配置 nfo_read_workers
+        progress: 进度回调 progress(已检查课程数, 已扫描课程数)，按时间间隔合并
+
+    Returns:
+        检查汇总
+    """
+    root = Path(root)
+    scanner = DirectoryScanner()
+    scanner.scan_index = ScanIndex.from_config()
+    verifier = NFOVerifier()
+    summary = VerifySummary()
+    throttle = ProgressThrottle(progress)
+    workers = workers or config.get('nfo_read_workers') or 1
+    window: Deque[Future] = deque()  # 已提交、按扫描顺序等待写入报告的课程目录
+    scanned = 0
+
+    try:
+        with open(report_path, 'w', encoding='utf-8', newline='\n') as f, \
+                ThreadPoolExecutor(max_workers=workers, thread_name_prefix="nfo-verify") as executor:
+            f.write(json.dumps({"root": str(root.resolve()), "started": time.strftime("%Y-%m-%d %H:%M:%S"),
+                                "pid": os.getpid()}, ensure_ascii=False) + "\n")
+
+            def write_next() -> None:
+                # 按提交顺序取结果，报告中课程的顺序与扫描顺序一致
+                for report in window.popleft().result():
+                    summary.add(report)
+                    if report.issues:
+                        f.write(report.to_json() + "\n")
+                throttle.update(summary.courses, scanned)
+
+            for group in _group_by_course_dir(scanner.iter_courses(root)):
+                scanned += len(group)
+                window.append(executor.submit(verifier.verify_course_dir, group))
+                if len(window) >= workers * 4:
+                    write_next()
+            while window:
+                write_next()
+            f.write(summary.to_json() + "\n")
+    finally:
+        if scanner.scan_index is not None:
+            scanner.scan_index.close()
+    throttle.flush()
+    return summary
@@ -0,0 +1,171 @@
+"""
+NFO并发写入模块
+
+生成器只负责组织 NFO 内容，写入（比较、临时文件、重命名）交给有界线程池并发完成，
+以掩盖 NAS 上每个文件的往返延迟。写入任务按课程分组，课程的全部 NFO 写完后
+统一刷盘并回调（附带失败数），供界面更新进度、决定是否保存课程签名。
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, FrozenSet, Iterator, Optional
+from .nfo_serializer import NFOWriter, Fields, WRITTEN
+from ..utils.config import config
+
+
+class _CourseBatch:
+    """一个课程的写入任务计数"""
+
+    def __init__(self, callback: Optional[Callable[[int], None]]):
+        self.callback = callback
+        self.pending = 0  # 已提交但未完成的写入
+        self.failed = 0  # 写入失败（或由 record_failure() 记录的失败）数
+        self.open = True  # 是否仍在提交任务
+        self.done = threading.Event()
+
+
+class NFOWritePool:
+    """有界线程池写入阶段
+
+    用法：
+        with pool.course(on_done):
+            pool.submit(path, "tvshow", fields)
+            ...
+    course() 可以嵌套，嵌套的 course() 并入最外层课程，只在最外层回调一次。
+    最外层 course() 默认在退出时等待本课程写完；界面批量生成时传入 wait=False，
+    提交完一个课程即可继续组织下一个课程，最后调用 wait() 等待全部完成。
+    workers 小于等于 1 时在提交线程中直接写入，行为与同步写入一致。
+    """
+
+    def __init__(self, writer: NFOWriter, workers: Optional[int] = None, max_pending: Optional[int] = None):
+        """
+        Args:
+            writer: 实际执行写入的 NFOWriter
+            workers: 写入线程数，None 时读取配置 nfo_write_workers
+            max_pending: 最多排队的写入任务数，超出时 submit() 阻塞，默认为线程数的 4 倍
+        """
+        self.writer = writer
+        self.workers = int(workers if workers is not None else config.get('nfo_write_workers') or 1)
+        self._slots = threading.BoundedSemaphore(max_pending or self.workers * 4)
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self._in_flight = 0
+        self._local = threading.local()
+
+    @contextmanager
+    def course(self, callback: Optional[Callable[[int], None]] = None, wait: bool = True) -> Iterator[None]:
+        """将期间提交的写入归为一个课程，全部写完后刷盘并调用 callback(失败数)（可能在写入线程中调用）
+
+        Args:
+            wait: 退出时是否等待本课程的写入全部完成
+        """
+        outer = getattr(self._local, "batch", None)
+        if outer is not None:
+            # 嵌套：并入外层课程
+            yield
+            return
+        batch = _CourseBatch(callback)
+        self._local.batch = batch
+        try:
+            yield
+        finally:
+            self._local.batch = None
+            with self._lock:
+                batch.open = False
+                done = batch.pending == 0
+            if done:
+                self._complete(batch)
+            elif wait:
+                batch.done.wait()
+
+    def submit(self, path: Path, root_tag: str, fields: Fields, overwrite: bool = True,
+               message: Optional[str] = None, compact: Optional[bool] = None,
+               compare: Optional[FrozenSet[str]] = None) -> None:
+        """提交一个 NFO 写入，内容有变化并写入后输出 message（compare 见 NFOWriter.write）"""
+        fields = list(fields)
+        self._dispatch(path, message,
+                       lambda: self.writer.write(path, root_tag, fields, overwrite, compact, compare))
+
+    def submit_data(self, path: Path, data: bytes, overwrite: bool = True, message: Optional[str] = None,
+                    root_tag: str = "") -> None:
+        """提交一个已生成内容的 NFO 写入（见 NFOWriter.write_data）"""
+        self._dispatch(path, message, lambda: self.writer.write_data(path, data, overwrite, root_tag))
+
+    def _dispatch(self, path: Path, message: Optional[str], write: Callable[[], str]) -> None:
+        batch = getattr(self._local, "batch", None)
+        if self.workers <= 1 or self.writer.plan is not None:
+            # 计划模式不写入磁盘，直接在提交线程中记录，保持计划顺序
+            self._write(batch, path, message, write)
+            return
+
+        self._slots.acquire()
+        with self._lock:
+            self._in_flight += 1
+            if batch is not None:
+                batch.pending += 1
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="nfo-write")
+        self._executor.submit(self._run, batch, path, message, write)
+
+    def record_failure(self) -> None:
+        """在当前课程中记录一次写入以外的失败（如组织 NFO 内容时出错），不在 course() 中时忽略"""
+        batch = getattr(self._local, "batch", None)
+        if batch is not None:
+            with self._lock:
+                batch.failed += 1
+
+    def wait(self) -> None:
+        """等待已提交的写入全部完成"""
+        with self._idle:
+            while self._in_flight:
+                self._idle.wait()
+
+    def shutdown(self) -> None:
+        """等待写入完成并结束写入线程"""
+        self.wait()
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown()
+
+    def _run(self, batch: Optional[_CourseBatch], path: Path, message: Optional[str],
+             write: Callable[[], str]) -> None:
+        try:
+            self._write(batch, path, message, write)
+        finally:
+            self._slots.release()
+            done = False
+            with self._lock:
+                if batch is not None:
+                    batch.pending -= 1
+                    done = not batch.open and batch.pending == 0
+            if done:
+                self._complete(batch)
+            with self._idle:
+                self._in_flight -= 1
+                if not self._in_flight:
+                    self._idle.notify_all()
+
+    def _write(self, batch: Optional[_CourseBatch], path: Path, message: Optional[str],
+               write: Callable[[], str]) -> None:
+        try:
+            if write() == WRITTEN and message:
+                print(message)
+        except Exception as e:
+            print(f"写入XML文件时出错 {path}: {e}")
+            if batch is not None:
+                with self._lock:
+                    batch.failed += 1
+
+    def _complete(self, batch: _CourseBatch) -> None:
+        """课程写入完成：目录刷盘并回调"""
+        try:
+            self.writer.flush()
+            if batch.callback is not None:
+                batch.callback(batch.failed)
+        except Exception as e:
+            print(f"课程写入完成回调出错: {e}")
+        finally:
+            batch.done.set()
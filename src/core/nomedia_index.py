@@ -0,0 +1,115 @@
+"""
+.nomedia 索引模块
+
+一次迭代遍历目录树，记录哪些目录包含 .nomedia（遍历时不进入这些目录），
+之后可 O(1) 判断任意路径是否被屏蔽，也可据此批量添加或移除 .nomedia。
+"""
+import os
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import List, Optional, Set, Union
+from .dir_snapshot import DirNode
+
+NOMEDIA_FILE = ".nomedia"
+
+
+@dataclass
+class NoMediaDiff:
+    """批量修改 .nomedia 的结果"""
+    added: List[Path] = field(default_factory=list)  # 新建了 .nomedia 的目录
+    removed: List[Path] = field(default_factory=list)  # 删除了 .nomedia 的目录
+    unchanged: List[Path] = field(default_factory=list)  # 已是目标状态的目录
+    failed: List[Path] = field(default_factory=list)  # 操作失败的目录
+
+
+class NoMediaIndex:
+    """目录树的 .nomedia 索引
+
+    visible 为未被屏蔽（已进入）的目录，marked 为包含 .nomedia 的目录（未进入），
+    两者均按遍历顺序（先序，scandir 顺序）记录。
+    """
+
+    def __init__(self, root: Union[Path, DirNode]):
+        node = DirNode.of(root)
+        self.root = node.path
+        self.visible: List[Path] = []
+        self.marked: List[Path] = []
+        self._visible_set: Set[Path] = set()
+        self._marked_set: Set[Path] = set()
+        # 根目录的上级目录中存在 .nomedia 时，整棵树都被屏蔽
+        self.root_suppressed = any((parent / NOMEDIA_FILE).exists() for parent in self.root.parents)
+        self._build(node)
+
+    def _build(self, root: DirNode) -> None:
+        stack = [root]
+        while stack:
+            node = stack.pop()
+            try:
+                if node.has_file(NOMEDIA_FILE):
+                    self.marked.append(node.path)
+                    self._marked_set.add(node.path)
+                    continue
+                self.visible.append(node.path)
+                self._visible_set.add(node.path)
+                subdirs = [d for d in node.dirs if not d.is_symlink]
+            except OSError as e:
+                print(f"扫描目录 {node.path} 时出错: {e}")
+                continue
+            stack.extend(reversed(subdirs))
+
+    def is_suppressed(self, path: Path, is_dir: bool = False) -> bool:
+        """路径是否被屏蔽（自身或任一上级目录包含 .nomedia）
+
+        文件按所在目录判断；不在根目录之下、遍历中未到达的路径视为被屏蔽。
+        """
+        if self.root_suppressed:
+            return True
+        directory = path if is_dir else path.parent
+        return directory not in self._visible_set
+
+    def dirs_named(self, name: str, marked: Optional[bool] = None) -> List[Path]:
+        """按名称查找目录
+
+        Args:
+            name: 目录名
+            marked: True 只返回包含 .nomedia 的目录，False 只返回未屏蔽的目录，None 两者都返回
+        """
+        result = []
+        if marked is not True:
+            result.extend(p for p in self.visible if p.name == name)
+        if marked is not False:
+            result.extend(p for p in self.marked if p.name == name)
+        return result
+
+    def apply(self, name: str, present: bool) -> NoMediaDiff:
+        """为所有指定名称的目录添加（present=True）或移除 .nomedia
+
+        被其它目录的 .nomedia 屏蔽的目录不受影响；索引本身不随之更新。
+        """
+        diff = NoMediaDiff()
+        if present:
+            targets, already = self.dirs_named(name, marked=False), self.dirs_named(name, marked=True)
+        else:
+            targets, already = self.dirs_named(name, marked=True), self.dirs_named(name, marked=False)
+        diff.unchanged.extend(already)
+        targets.reverse()
+        while targets:
+            directory = targets.pop()
+            nomedia_file = directory / NOMEDIA_FILE
+            try:
+                if present:
+                    open(str(nomedia_file), 'a').close()
+                    diff.added.append(directory)
+                else:
+                    os.remove(nomedia_file)
+                    diff.removed.append(directory)
+                    # 移除后该目录重新可见，继续处理其中原先被屏蔽的同名目录
+                    nested = NoMediaIndex(directory)
+                    targets.extend(reversed([p for p in nested.marked if p.name == name]))
+                    diff.unchanged.extend(p for p in nested.visible if p != directory and p.name == name)
+            except FileNotFoundError:
+                diff.unchanged.append(directory)
+            except OSError as e:
+                print(f"修改 {nomedia_file} 时出错: {e}")
+                diff.failed.append(directory)
+        return diff
@@ -0,0 +1,113 @@
+"""
+扫描索引模块
+
+将目录列表持久化到 SQLite，按目录路径和 mtime 作为键。
+再次扫描时只需 stat 目录：mtime 未变化的目录直接复用上次的列表，
+只有发生变化的目录才会重新 scandir。
+索引只缓存原始目录列表，课程识别每次仍在（缓存的）列表上重新进行。
+索引文件默认位于程序数据目录（见 config.app_data_dir），不随工作目录变化。
+"""
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import List, Optional, Tuple, Union
+from ..utils.config import config
+
+# 目录在列出前后这段时间内被修改时，mtime 精度（FAT/SMB 为 2 秒）不足以判断后续变化，不写入索引
+RACY_WINDOW_NS = 2_000_000_000
+# 累积多少条待写记录后提交一次
+FLUSH_THRESHOLD = 500
+
+_SEP = "\0"  # 文件名中不可能出现的分隔符
+
+DirListing = Tuple[List[Tuple[str, bool]], List[str]]  # ([(子目录名, 是否符号链接)], [文件名])
+
+
+class ScanIndex:
+    """目录列表持久化索引（线程安全）"""
+
+    def __init__(self, db_path: Union[Path, str]):
+        self.db_path = Path(db_path)
+        self._lock = threading.Lock()
+        self._pending: List[Tuple[str, int, str, str, str]] = []
+        self.hits = 0
+        self.misses = 0
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS dirs ("
+            "path TEXT PRIMARY KEY, mtime_ns INTEGER NOT NULL, "
+            "dirs TEXT NOT NULL, links TEXT NOT NULL, files TEXT NOT NULL)"
+        )
+        self._conn.commit()
+
+    @classmethod
+    def from_config(cls) -> Optional['ScanIndex']:
+        """按配置打开索引，未配置或打开失败时返回 None"""
+        db_file = config.data_path('scan_index_file')
+        if db_file is None:
+            return None
+        try:
+            db_file.parent.mkdir(parents=True, exist_ok=True)
+            return cls(db_file)
+        except (OSError, sqlite3.Error) as e:
+            print(f"打开扫描索引失败 {db_file}: {e}")
+            return None
+
+    def lookup(self, path: str, mtime_ns: int) -> Optional[DirListing]:
+        """查询目录列表，mtime 不一致时视为未命中"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT mtime_ns, dirs, links, files FROM dirs WHERE path = ?", (path,)
+            ).fetchone()
+            if row is None or row[0] != mtime_ns:
+                self.misses += 1
+                return None
+            self.hits += 1
+        links = set(_split(row[2]))
+        return [(name, name in links) for name in _split(row[1])], _split(row[3])
+
+    def store(self, path: str, mtime_ns: int, dirs: List[Tuple[str, bool]], files: List[str]) -> None:
+        """记录目录列表，并清理已消失子目录的旧记录"""
+        if time.time_ns() - mtime_ns < RACY_WINDOW_NS:
+            return
+        names = [name for name, _ in dirs]
+        links = [name for name, is_link in dirs if is_link]
+        with self._lock:
+            row = self._conn.execute("SELECT dirs FROM dirs WHERE path = ?", (path,)).fetchone()
+            if row is not None:
+                for removed in set(_split(row[0])) - set(names):
+                    self._delete_subtree(os.path.join(path, removed))
+            self._pending.append((path, mtime_ns, _SEP.join(names), _SEP.join(links), _SEP.join(files)))
+            if len(self._pending) >= FLUSH_THRESHOLD:
+                self._flush_locked()
+
+    def _delete_subtree(self, path: str) -> None:
+        """删除目录及其所有子目录的记录"""
+        prefix = path.rstrip(os.sep) + os.sep
+        upper = prefix[:-1] + chr(ord(os.sep) + 1)
+        self._conn.execute("DELETE FROM dirs WHERE path = ? OR (path >= ? AND path < ?)", (path, prefix, upper))
+
+    def _flush_locked(self) -> None:
+        if self._pending:
+            self._conn.executemany("INSERT OR REPLACE INTO dirs VALUES (?, ?, ?, ?, ?)", self._pending)
+            self._pending.clear()
+        self._conn.commit()
+
+    def flush(self) -> None:
+        """提交待写入的记录"""
+        with self._lock:
+            self._flush_locked()
+
+    def close(self) -> None:
+        """提交并关闭索引"""
+        with self._lock:
+            self._flush_locked()
+            self._conn.close()
+
+
+def _split(value: str) -> List[str]:
+    return value.split(_SEP) if value else []
@@ -0,0 +1,104 @@
+"""
+扫描-生成流水线
+
+查找器的流式接口（iter_courses、iter_courses_with_lession、iter_single_courses）每找到一个课程就产出。
+流水线在后台线程中扫描，通过有界队列交给调用线程生成：队列满时扫描暂停（背压），
+扫描与写入重叠进行，第一个课程扫描完即可开始写入 NFO；内存中只有队列里的少量课程，
+不随目录规模增长。
+"""
+import threading
+from dataclasses import dataclass
+from queue import Empty, Full, Queue
+from typing import Callable, Iterable, List, Optional, TypeVar
+from ..utils.config import config
+
+T = TypeVar("T")
+
+_DONE = object()  # 扫描结束标记
+_POLL_INTERVAL = 0.1  # 等待队列时检查是否停止的间隔（秒）
+
+
+@dataclass
+class PipelineStats:
+    """流水线进度"""
+    found: int = 0  # 已扫描到的课程数
+    processed: int = 0  # 已处理的课程数
+    failed: int = 0  # 处理出错的课程数
+
+    def __str__(self) -> str:
+        return f"找到 {self.found} 个课程，处理 {self.processed} 个，出错 {self.failed} 个"
+
+
+def run_pipeline(source: Iterable[T], consume: Callable[[T], None], max_pending: Optional[int] = None,
+                 progress: Optional[Callable[[PipelineStats], None]] = None) -> PipelineStats:
+    """边扫描边处理
+
+    Args:
+        source: 课程迭代器，在扫描线程中迭代
+        consume: 处理一个课程，在调用线程中按扫描顺序执行；出错时记录并继续处理下一个
+        max_pending: 队列中最多等待处理的课程数，None 时使用配置 pipeline_queue_size
+        progress: 每处理完一个课程后调用 progress(统计)，在调用线程中执行
+
+    Returns:
+        流水线统计
+
+    Raises:
+        扫描线程中的异常：已扫描到的课程处理完后重新抛出
+    """
+    queue: Queue = Queue(maxsize=max(1, int(max_pending or config.get('pipeline_queue_size') or 1)))
+    stop = threading.Event()
+    errors: List[BaseException] = []
+    stats = PipelineStats()
+
+    def put(item) -> bool:
+        """放入队列，队列满时等待；处理方已停止时放弃"""
+        while not stop.is_set():
+            try:
+                queue.put(item, timeout=_POLL_INTERVAL)
+                return True
+            except Full:
+                continue
+        return False
+
+    def produce() -> None:
+        iterator = iter(source)
+        try:
+            for item in iterator:
+                stats.found += 1  # 只在扫描线程中修改
+                if not put(item):
+                    break
+        except BaseException as e:
+            errors.append(e)
+        finally:
+            # 提前停止时关闭生成器，释放目录快照与列目录线程
+            close = getattr(iterator, "close", None)
+            if close is not None:
+                close()
+            put(_DONE)
+
+    thread = threading.Thread(target=produce, name="scan-pipeline", daemon=True)
+    thread.start()
+    try:
+        while True:
+            try:
+                item = queue.get(timeout=_POLL_INTERVAL)
+            except Empty:
+                if not thread.is_alive() and queue.empty():
+                    break
+                continue
+            if item is _DONE:
+                break
+            try:
+                consume(item)
+            except Exception as e:
+                stats.failed += 1
+                print(f"处理课程时出错: {e}")
+            stats.processed += 1
+            if progress is not None:
+                progress(stats)
+    finally:
+        stop.set()
+        thread.join()
+    if errors:
+        raise errors[0]
+    return stats
@@ -2,35 +2,14 @@
 目录扫描模块
 """
 from pathlib import Path
-from typing import List, Optional, Dict
-from dataclasses import dataclass, field
-import re
+from typing import Iterator, List, Optional, Dict, Union
+import os
+from .dir_snapshot import DirNode, open_tree
+from .chapter_builder import ChapterBuilder
+from .library_model import Chapter, Course, VideoFile, VideoTable
+from .natural_sort import leading_number, top_dir_key
 from ..utils.config import config
 
-@dataclass
-class VideoFile:
-    """视频文件信息"""
-    path: Path
-    name: str
-    episode_number: int = 1
-    global_episode_number: int = 1  # 全局集数
-
-@dataclass
-class Chapter:
-    """章节信息"""
-    name: str
-    videos: List[VideoFile]
-    sub_chapters: List['Chapter'] = field(default_factory=list)
-
-@dataclass
-class Course:
-    """课程信息"""
-    path: Path
-    name: str
-    structure_type: int  # 1: 一级结构, 2: 二级结构, 3: 三级结构
-    chapters: List[Chapter]
-    video_count: int
-
 class DirectoryScanner:
     """目录扫描器"""
     
@@ -40,17 +19,27 @@ class DirectoryScanner:
         self.mandarin_dir_name = "普通话Deepl"  # 普通话目录名称
         self.original_dir_name = "原"  # 原始目录名称
         self.check_nomedia = config.get('check_nomedia')  # 是否检查 .nomedia 文件
+        self.max_workers = config.get('scan_workers')  # 并发列出目录的线程数
+        self.scan_index = None  # 可选的持久化扫描索引（ScanIndex）
     
     def is_video_file(self, path: Path) -> bool:
         """判断是否为视频文件"""
         return path.suffix.lower() in self.video_extensions
     
-    def _should_skip_directory(self, path: Path) -> bool:
+    def is_video_name(self, name: str) -> bool:
+        """根据文件名判断是否为视频文件"""
+        return os.path.splitext(name)[1].lower() in self.video_extensions
+    
+    def _should_skip_directory(self, path: Union[Path, DirNode]) -> bool:
         """检查是否应该跳过目录扫描
         
         如果启用了 .nomedia 检查，且目录中存在 .nomedia 文件，则跳过该目录
         """
-        return self.check_nomedia and (path / ".nomedia").exists()
+        if not self.check_nomedia:
+            return False
+        if isinstance(path, DirNode):
+            return path.has_file(".nomedia")
+        return (path / ".nomedia").exists()
     
     def _extract_number(self, filename: str) -> int:
         """从文件名中提取数字
@@ -65,15 +54,10 @@ class DirectoryScanner:
         - 001-引言.mp4
         - 001 - 引言.mp4
         """
-        # 匹配文件名开头的数字部分
-        match = re.match(r'^(\d+)(?:\s*-\s*|\s+|\-)?', filename)
-        if match:
-            return int(match.group(1))
-            
         # 如果没有找到数字，返回一个大数，确保未命名的文件排在最后
-        return 999999  # 使用固定的大整数替代 float('inf')
+        return leading_number(filename)
     
-    def _get_video_files_sorted(self, path: Path) -> List[VideoFile]:
+    def _get_video_files_sorted(self, path: Union[Path, DirNode]) -> List[VideoFile]:
         """获取目录下所有视频文件并排序
         
         排序规则：
@@ -81,37 +65,16 @@ class DirectoryScanner:
         2. 在同一顶层目录内，按视频文件名的序号排序
         3. 中间层目录的序号不影响排序
         """
+        node = DirNode.of(path)
+        path = node.path
+        table = VideoTable()
         video_files = []
-        for file in path.rglob("*"):
-            if self.is_video_file(file):
-                video_files.append(VideoFile(
-                    path=file,
-                    name=file.stem,
-                    episode_number=1  # 临时值，稍后更新
-                ))
-        
-        # 按最顶层目录名称中的数字和文件名中的数字排序
-        def sort_key(video: VideoFile) -> tuple:
-            # 获取视频文件的所有父目录路径（从下往上）
-            parents = list(video.path.parents)
-            # 找到最顶层目录（在path目录下的第一级目录）
-            top_level_dir = None
-            for parent in reversed(parents):
-                if parent.parent == path:
-                    top_level_dir = parent
-                    break
-            
-            # 获取最顶层目录的序号（如果存在）
-            top_dir_num = self._extract_number(top_level_dir.name) if top_level_dir else 999999
-            
-            # 获取文件名中的数字
-            file_num = self._extract_number(video.name)
-            
-            # 返回排序元组：(最顶层目录数字, 文件名数字, 完整文件名)
-            return (top_dir_num, file_num, video.name)
+        for parent, name in node.iter_files():
+            if self.is_video_name(name):
+                video_files.append(table.add(parent.path, name, episode_number=1))  # 集数为临时值，稍后更新
         
-        # 按复合键排序
-        video_files.sort(key=sort_key)
+        # 按最顶层目录名称中的数字和文件名中的数字排序：(最顶层目录数字, 文件名数字, 完整文件名)
+        video_files.sort(key=top_dir_key(path))
         
         # 更新全局集数
         for i, video in enumerate(video_files, 1):
@@ -122,86 +85,135 @@ class DirectoryScanner:
     def scan_directory(self, root_path: Path) -> List[Course]:
         """扫描目录"""
         courses = []
-        self._scan_directory_recursive(root_path, courses)
+        with open_tree(root_path, self.max_workers, self.scan_index) as root:
+            self._scan_directory_recursive(root, courses)
         return courses
     
-    def _scan_directory_recursive(self, current_path: Path, courses: List[Course]):
+    def iter_courses(self, root_path: Path) -> Iterator[Course]:
+        """流式扫描：每扫描完一个课程立即产出，扫描完的子目录快照随即释放"""
+        with open_tree(root_path, self.max_workers, self.scan_index) as root:
+            yield from self._iter_directory(root, release=True)
+    
+    def _scan_directory_recursive(self, current_path: Union[Path, DirNode], courses: List[Course]):
         """递归扫描目录"""
+        courses.extend(self._iter_directory(current_path))
+    
+    def _iter_directory(self, current_path: Union[Path, DirNode], release: bool = False) -> Iterator[Course]:
+        """递归扫描目录，按顺序产出课程（release 为 True 时子目录扫描完后释放其快照）"""
+        node = DirNode.of(current_path)
         # 检查是否应该跳过该目录
-        if self._should_skip_directory(current_path):
+        if self._should_skip_directory(node):
             return
             
         # 扫描当前目录
-        for path in current_path.iterdir():
-            if not path.is_dir():
-                continue
-                
+        for child in node.dirs:
             # 检查是否为课程目录（包含"普通话Deepl"或"原"子目录）
-            mandarin_path = path / self.mandarin_dir_name
-            original_path = path / self.original_dir_name
-            
-            if (mandarin_path.exists() and mandarin_path.is_dir()) or (original_path.exists() and original_path.is_dir()):
-                # 如果目录名长度符合要求，添加为课程
-                if len(path.name) >= self.min_length:
-                    # 检查并处理"普通话Deepl"目录
-                    if mandarin_path.exists() and mandarin_path.is_dir():
-                        structure_type = self._detect_structure_type(mandarin_path)
-                        if structure_type > 0:
-                            # 先获取所有视频文件并排序
-                            all_videos = self._get_video_files_sorted(mandarin_path)
-                            if all_videos:
-                                # 根据结构类型组织章节
-                                chapters = self._scan_chapters(mandarin_path, structure_type, all_videos)
-                                courses.append(Course(
-                                    path=path,
-                                    name=path.name,
-                                    structure_type=structure_type,
-                                    chapters=chapters,
-                                    video_count=len(all_videos)
-                                ))
-                    
-                    # 检查并处理"原"目录
-                    if original_path.exists() and original_path.is_dir():
-                        structure_type = self._detect_structure_type(original_path)
-                        if structure_type > 0:
-                            # 先获取所有视频文件并排序
-                            all_videos = self._get_video_files_sorted(original_path)
-                            if all_videos:
-                                # 根据结构类型组织章节
-                                chapters = self._scan_chapters(original_path, structure_type, all_videos)
-                                courses.append(Course(
-                                    path=path,
-                                    name=path.name,
-                                    structure_type=structure_type,
-                                    chapters=chapters,
-                                    video_count=len(all_videos)
-                                ))
+            if self._is_course_candidate(child):
+                yield from self._scan_course_node(child)
             else:
                 # 如果不是课程目录，递归扫描子目录
-                self._scan_directory_recursive(path, courses)
+                yield from self._iter_directory(child, release)
+            if release:
+                child.release()
     
-    def _detect_structure_type(self, path: Path) -> int:
+    def _is_course_candidate(self, node: DirNode) -> bool:
+        """目录下是否包含"普通话Deepl"或"原"子目录"""
+        return bool(node.child(self.mandarin_dir_name) or node.child(self.original_dir_name))
+    
+    def _scan_course_node(self, node: DirNode) -> List[Course]:
+        """扫描单个课程目录，每个语言目录生成一个课程"""
+        courses = []
+        # 如果目录名长度符合要求，添加为课程
+        if len(node.name) >= self.min_length:
+            # 依次处理"普通话Deepl"和"原"目录
+            for language_node in (node.child(self.mandarin_dir_name), node.child(self.original_dir_name)):
+                if language_node:
+                    course = self._create_course(node, language_node)
+                    if course:
+                        courses.append(course)
+        return courses
+    
+    def find_course_dir(self, root_path: Path, path: Path) -> Optional[Path]:
+        """查找路径所属的课程目录
+        
+        按与 scan_directory 相同的规则从根目录逐级向下判断，
+        路径不在任何课程内（或位于被 .nomedia 跳过的目录中）时返回 None
+        """
+        try:
+            parts = path.relative_to(root_path).parts
+        except ValueError:
+            return None
+        current = root_path
+        for part in parts:
+            if self._should_skip_directory(current):
+                return None
+            current = current / part
+            if (current / self.mandarin_dir_name).is_dir() or (current / self.original_dir_name).is_dir():
+                return current if len(current.name) >= self.min_length else None
+        return None
+    
+    def is_suppressed(self, root_path: Path, path: Path) -> bool:
+        """路径本身或其位于根目录之下的任一上级目录是否因 .nomedia 被跳过"""
+        try:
+            parts = path.relative_to(root_path).parts
+        except ValueError:
+            return False
+        current = root_path
+        if self._should_skip_directory(current):
+            return True
+        for part in parts:
+            current = current / part
+            if self._should_skip_directory(current):
+                return True
+        return False
+    
+    def scan_course(self, course_path: Path) -> List[Course]:
+        """扫描单个课程目录"""
+        node = DirNode.of(course_path)
+        if not self._is_course_candidate(node):
+            return []
+        return self._scan_course_node(node)
+    
+    def _create_course(self, course_node: DirNode, language_node: DirNode) -> Optional[Course]:
+        """根据语言目录创建课程信息"""
+        structure_type = self._detect_structure_type(language_node)
+        if structure_type <= 0:
+            return None
+        # 先获取所有视频文件并排序
+        all_videos = self._get_video_files_sorted(language_node)
+        if not all_videos:
+            return None
+        # 根据结构类型组织章节
+        chapters = self._scan_chapters(language_node, structure_type, all_videos)
+        return Course(
+            path=course_node.path,
+            name=course_node.name,
+            structure_type=structure_type,
+            chapters=chapters,
+            video_count=len(all_videos)
+        )
+    
+    def _detect_structure_type(self, path: Union[Path, DirNode]) -> int:
         """检测目录结构类型"""
+        node = DirNode.of(path)
         # 检查是否为一级结构（直接包含视频）
-        has_videos = any(self.is_video_file(f) for f in path.iterdir())
+        has_videos = any(self.is_video_name(f) for f in node.files)
         if has_videos:
             return 1
             
         # 检查二级结构
-        for item in path.iterdir():
-            if item.is_dir():
-                # 如果章节目录下有子目录，则为三级结构
-                has_subdirs = any(f.is_dir() for f in item.iterdir())
-                if has_subdirs:
-                    return 3
-                # 如果章节目录下直接有视频，则为二级结构
-                has_videos = any(self.is_video_file(f) for f in item.iterdir())
-                if has_videos:
-                    return 2
+        for item in node.dirs:
+            # 如果章节目录下有子目录，则为三级结构
+            if item.dirs:
+                return 3
+            # 如果章节目录下直接有视频，则为二级结构
+            has_videos = any(self.is_video_name(f) for f in item.files)
+            if has_videos:
+                return 2
         
         return 0
     
-    def _scan_chapters(self, path: Path, structure_type: int, all_videos: List[VideoFile]) -> List[Chapter]:
+    def _scan_chapters(self, path: Union[Path, DirNode], structure_type: int, all_videos: List[VideoFile]) -> List[Chapter]:
         """扫描章节
         
         Args:
@@ -209,51 +221,4 @@ class DirectoryScanner:
             structure_type: 目录结构类型
             all_videos: 所有视频文件（已排序且已设置全局集数）
         """
-        if structure_type == 1:
-            # 一级结构：直接返回视频列表
-            videos = [v for v in all_videos if v.path.parent == path]
-            return [Chapter(name="", videos=videos)]
-            
-        elif structure_type == 2:
-            # 二级结构：每个目录是一个章节
-            chapters = []
-            for chapter_dir in sorted(path.iterdir()):
-                if not chapter_dir.is_dir():
-                    continue
-                    
-                # 获取当前章节的视频
-                videos = [v for v in all_videos if v.path.parent == chapter_dir]
-                if videos:
-                    chapters.append(Chapter(
-                        name=chapter_dir.name,
-                        videos=videos
-                    ))
-            return chapters
-            
-        else:  # structure_type == 3
-            # 三级结构：大章节下包含小章节
-            chapters = []
-            for major_chapter in sorted(path.iterdir()):
-                if not major_chapter.is_dir():
-                    continue
-                    
-                sub_chapters = []
-                for minor_chapter in sorted(major_chapter.iterdir()):
-                    if not minor_chapter.is_dir():
-                        continue
-                        
-                    # 获取当前小章节的视频
-                    videos = [v for v in all_videos if v.path.parent == minor_chapter]
-                    if videos:
-                        sub_chapters.append(Chapter(
-                            name=minor_chapter.name,
-                            videos=videos
-                        ))
-                        
-                if sub_chapters:
-                    chapters.append(Chapter(
-                        name=major_chapter.name,
-                        videos=[],
-                        sub_chapters=sub_chapters
-                    ))
-            return chapters 
\ No newline at end of file
+        return ChapterBuilder(all_videos).build(path, structure_type)
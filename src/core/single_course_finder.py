@@ -2,34 +2,13 @@
 Single文件课程查找模块
 """
 from pathlib import Path
-from typing import List, Optional
-from dataclasses import dataclass
-import glob
-import re
-
-@dataclass
-class VideoFile:
-    """视频文件信息"""
-    path: Path
-    name: str
-    episode_number: int = 1
-    global_episode_number: int = 1  # 全局集数
-
-@dataclass
-class Chapter:
-    """章节信息"""
-    name: str
-    videos: List[VideoFile]
-    sub_chapters: List['Chapter'] = None
-
-@dataclass
-class SingleCourseInfo:
-    """Single文件课程信息"""
-    path: Path
-    name: str
-    single_file: Path
-    video_count: int
-    chapters: List[Chapter]
+from typing import Iterator, List, Optional, Union
+import os
+from .dir_snapshot import DirNode, open_tree
+from .chapter_builder import ChapterBuilder
+from .library_model import Chapter, SingleCourseInfo, VideoFile, VideoTable
+from .natural_sort import episode_dirs_key, leading_number, top_dir_key
+from ..utils.config import config
 
 class SingleCourseFinder:
     """Single文件课程查找器"""
@@ -37,112 +16,36 @@ class SingleCourseFinder:
     def __init__(self):
         self.single_file_patterns = ["single", "single.*"]  # 支持无后缀和任意后缀
         self.video_extensions = ['.mp4', '.mkv', '.avi']
+        self.max_workers = config.get('scan_workers')  # 并发列出目录的线程数
+        self.scan_index = None  # 可选的持久化扫描索引（ScanIndex）
     
     def is_video_file(self, path: Path) -> bool:
         """判断是否为视频文件"""
         return path.suffix.lower() in self.video_extensions
     
+    def is_video_name(self, name: str) -> bool:
+        """根据文件名判断是否为视频文件"""
+        return os.path.splitext(name)[1].lower() in self.video_extensions
+    
     def _extract_number(self, filename: str) -> int:
         """从文件名中提取数字"""
-        match = re.match(r'^(\d+)(?:\s*-\s*|\s+|\-)?', filename)
-        if match:
-            return int(match.group(1))
-        return 999999
+        return leading_number(filename)
     
-    def _get_video_files_sorted(self, path: Path) -> List[VideoFile]:
+    def _get_video_files_sorted(self, path: Union[Path, DirNode]) -> List[VideoFile]:
         """获取目录下所有视频文件并排序"""
+        node = DirNode.of(path)
+        path = node.path
+        table = VideoTable()
         video_files = []
-        for file in path.rglob("*"):
-            if self.is_video_file(file):
-                video_files.append(VideoFile(
-                    path=file,
-                    name=file.stem,
-                    episode_number=1
-                ))
-        
-        # 按最顶层目录名称中的数字和文件名中的数字排序
-        def sort_key(video: VideoFile) -> tuple:
-            parents = list(video.path.parents)
-            top_level_dir = None
-            for parent in reversed(parents):
-                if parent.parent == path:
-                    top_level_dir = parent
-                    break
-            
-            # 根目录视频优先级最高（序号为0）
-            if top_level_dir is None:
-                file_num = self._extract_number(video.name)
-                return (0, file_num, video.name)
-            
-            # 二级目录视频：目录数字 * 1000 + 文件名数字
-            top_dir_num = self._extract_number(top_level_dir.name)
-            file_num = self._extract_number(video.name)
-            
-            return (top_dir_num, file_num, video.name)
+        for parent, name in node.iter_files():
+            if self.is_video_name(name):
+                video_files.append(table.add(parent.path, name, episode_number=1))
         
-        video_files.sort(key=sort_key)
+        # 按最顶层目录名称中的数字和文件名中的数字排序（根目录视频优先级最高，序号为0）
+        video_files.sort(key=top_dir_key(path, root_number=0))
 
-        # 追加：支持 5.1.3、5.1.3.2 等点分数字前缀进行精确排序
-        def __extract_numeric_tuple(name: str):
-            import re
-            s = name.strip()
-            m = re.match(r'^(\d+(?:\.\d+)+)', s)
-            if m:
-                try:
-                    return tuple(int(p) for p in m.group(1).split('.'))
-                except Exception:
-                    pass
-            m2 = re.match(r'^(\d+)(?:\s*[-_\.]?\s*)?', s)
-            if m2:
-                try:
-                    return (int(m2.group(1)),)
-                except Exception:
-                    pass
-            return (999999,)
-
-        def __extract_numeric_tuple_ep(name: str):
-            import re
-            s = (name or "").strip()
-            # 点分数字（如 5.1.3）
-            m = re.search(r'(\d+(?:\.\d+)+)', s)
-            if m:
-                try:
-                    return tuple(int(p) for p in m.group(1).split('.'))
-                except Exception:
-                    pass
-            # EP/Episode/E/P + 数字（如 EP01、E2、Episode 12）
-            m = re.search(r'(?i)\b(?:ep|e|episode|part|p)\s*0*(\d+)\b', s)
-            if m:
-                try:
-                    return (int(m.group(1)),)
-                except Exception:
-                    pass
-            # 任意位置的首个数字序列（如 Chapter 03）
-            m = re.search(r'0*(\d+)', s)
-            if m:
-                try:
-                    return (int(m.group(1)),)
-                except Exception:
-                    pass
-            return (999999,)
-
-        def __final_key(video: VideoFile):
-            names = []
-            curr = video.path.parent
-            try:
-                while curr != path and path in curr.parents:
-                    names.append(curr.name)
-                    curr = curr.parent
-            except Exception:
-                pass
-            names.reverse()
-            seq = []
-            for n in names:
-                seq.extend(__extract_numeric_tuple_ep(n))
-            seq.extend(__extract_numeric_tuple_ep(video.name))
-            return (tuple(seq), video.name.lower())
-
-        video_files.sort(key=__final_key)
+        # 再按各级目录与文件名中的序号精确排序，支持 5.1.3、EP01 等格式
+        video_files.sort(key=episode_dirs_key(path))
         
         # 更新全局集数
         for i, video in enumerate(video_files, 1):
@@ -150,7 +53,7 @@ class SingleCourseFinder:
             
         return video_files
     
-    def _detect_structure_type(self, path: Path) -> int:
+    def _detect_structure_type(self, path: Union[Path, DirNode]) -> int:
         """检测目录结构类型
         返回值：
         1: 一级结构（仅根目录有视频）
@@ -159,25 +62,23 @@ class SingleCourseFinder:
         4: 混合结构（根目录有视频 + 二级目录有视频）
         0: 无有效结构
         """
+        node = DirNode.of(path)
         # 检查根目录是否有直接视频
-        root_has_videos = any(self.is_video_file(f) for f in path.iterdir())
+        root_has_videos = any(self.is_video_name(f) for f in node.files)
         
         # 检查是否有二级目录包含视频
         subdir_has_videos = False
         has_three_level = False
         
-        for item in path.iterdir():
-            if item.is_dir():
-                # 检查二级目录下是否有视频
-                subdir_videos = any(self.is_video_file(f) for f in item.iterdir())
-                if subdir_videos:
-                    subdir_has_videos = True
-                
-                # 检查是否有三级目录
-                for subitem in item.iterdir():
-                    if subitem.is_dir():
-                        has_three_level = True
-                        break
+        for item in node.dirs:
+            # 检查二级目录下是否有视频
+            subdir_videos = any(self.is_video_name(f) for f in item.files)
+            if subdir_videos:
+                subdir_has_videos = True
+            
+            # 检查是否有三级目录
+            if item.dirs:
+                has_three_level = True
         
         # 判断结构类型
         if root_has_videos and subdir_has_videos:
@@ -191,79 +92,9 @@ class SingleCourseFinder:
         
         return 0
     
-    def _scan_chapters(self, path: Path, structure_type: int, all_videos: List[VideoFile]) -> List[Chapter]:
+    def _scan_chapters(self, path: Union[Path, DirNode], structure_type: int, all_videos: List[VideoFile]) -> List[Chapter]:
         """扫描章节"""
-        if structure_type == 1:
-            # 一级结构：直接返回视频列表
-            videos = [v for v in all_videos if v.path.parent == path]
-            return [Chapter(name="", videos=videos)]
-            
-        elif structure_type == 2:
-            # 二级结构：每个目录是一个章节
-            chapters = []
-            for chapter_dir in sorted(path.iterdir()):
-                if not chapter_dir.is_dir():
-                    continue
-                    
-                videos = [v for v in all_videos if v.path.parent == chapter_dir]
-                if videos:
-                    chapters.append(Chapter(
-                        name=chapter_dir.name,
-                        videos=videos
-                    ))
-            return chapters
-            
-        elif structure_type == 4:
-            # 混合结构：根目录视频 + 二级目录视频
-            chapters = []
-            
-            # 首先添加根目录视频作为第一个章节
-            root_videos = [v for v in all_videos if v.path.parent == path]
-            if root_videos:
-                chapters.append(Chapter(
-                    name="根目录",
-                    videos=root_videos
-                ))
-            
-            # 然后添加二级目录视频
-            for chapter_dir in sorted(path.iterdir()):
-                if not chapter_dir.is_dir():
-                    continue
-                    
-                videos = [v for v in all_videos if v.path.parent == chapter_dir]
-                if videos:
-                    chapters.append(Chapter(
-                        name=chapter_dir.name,
-                        videos=videos
-                    ))
-            return chapters
-            
-        else:  # structure_type == 3
-            # 三级结构：大章节下包含小章节
-            chapters = []
-            for major_chapter in sorted(path.iterdir()):
-                if not major_chapter.is_dir():
-                    continue
-                    
-                sub_chapters = []
-                for minor_chapter in sorted(major_chapter.iterdir()):
-                    if not minor_chapter.is_dir():
-                        continue
-                        
-                    videos = [v for v in all_videos if v.path.parent == minor_chapter]
-                    if videos:
-                        sub_chapters.append(Chapter(
-                            name=minor_chapter.name,
-                            videos=videos
-                        ))
-                        
-                if sub_chapters:
-                    chapters.append(Chapter(
-                        name=major_chapter.name,
-                        videos=[],
-                        sub_chapters=sub_chapters
-                    ))
-            return chapters
+        return ChapterBuilder(all_videos).build(path, structure_type)
     
     def find_single_courses(self, root_path: Path) -> List[SingleCourseInfo]:
         """递归查找包含single文件的课程目录
@@ -275,38 +106,60 @@ class SingleCourseFinder:
             找到的Single文件课程信息列表
         """
         courses = []
-        self._scan_directory_recursive(root_path, courses)
+        with open_tree(root_path, self.max_workers, self.scan_index) as root:
+            self._scan_directory_recursive(root, courses)
         return courses
     
-    def _scan_directory_recursive(self, current_path: Path, courses: List[SingleCourseInfo]):
+    def iter_single_courses(self, root_path: Path) -> Iterator[SingleCourseInfo]:
+        """流式查找：每找到一个课程立即产出，扫描完的子目录快照随即释放
+        
+        Args:
+            root_path: 根目录路径
+        """
+        with open_tree(root_path, self.max_workers, self.scan_index) as root:
+            yield from self._iter_directory(root, release=True)
+    
+    def _scan_directory_recursive(self, current_path: Union[Path, DirNode], courses: List[SingleCourseInfo]):
         """递归扫描目录
         
         Args:
             current_path: 当前扫描的目录
             courses: 课程信息列表
         """
+        courses.extend(self._iter_directory(current_path))
+    
+    def _iter_directory(self, current_path: Union[Path, DirNode], release: bool = False) -> Iterator[SingleCourseInfo]:
+        """递归扫描目录，按顺序产出课程
+        
+        Args:
+            current_path: 当前扫描的目录
+            release: 子目录扫描完后是否释放其快照
+        """
+        node = DirNode.of(current_path)
+        current_path = node.path
         try:
             # 检查当前目录是否包含single文件
-            single_file = self._find_single_file(current_path)
+            single_file = self._find_single_file(node)
             if single_file:
                 # 如果包含single文件，则这是一个课程目录
-                course_info = self._create_single_course_info(current_path, single_file)
+                course_info = self._create_single_course_info(node, single_file)
                 if course_info:
-                    courses.append(course_info)
+                    yield course_info
                 # 找到课程目录后，不再递归扫描其子目录
                 return
             
             # 如果不是课程目录，继续递归扫描子目录
-            for item in current_path.iterdir():
-                if item.is_dir():
-                    self._scan_directory_recursive(item, courses)
+            for item in node.dirs:
+                yield from self._iter_directory(item, release)
+                if release:
+                    item.release()
                     
         except PermissionError:
             print(f"权限不足，无法访问目录: {current_path}")
         except Exception as e:
             print(f"扫描目录时出错 {current_path}: {e}")
     
-    def _find_single_file(self, path: Path) -> Optional[Path]:
+    def _find_single_file(self, path: Union[Path, DirNode]) -> Optional[Path]:
         """检测目录是否包含single文件
         
         Args:
@@ -316,22 +169,22 @@ class SingleCourseFinder:
             single文件路径，如果不存在则返回None
         """
         try:
+            node = DirNode.of(path)
             # 检查是否存在single文件（无后缀）
-            single_file = path / "single"
-            if single_file.exists() and single_file.is_file():
-                return single_file
+            if node.has_file("single"):
+                return node.path / "single"
             
             # 检查是否存在single.*文件（任意后缀）
             for pattern in self.single_file_patterns:
-                matches = list(path.glob(pattern))
+                matches = node.match_files(pattern)
                 if matches:
-                    return matches[0]  # 返回第一个匹配的文件
+                    return node.path / matches[0]  # 返回第一个匹配的文件
             
             return None
         except Exception:
             return None
     
-    def _create_single_course_info(self, path: Path, single_file: Path) -> Optional[SingleCourseInfo]:
+    def _create_single_course_info(self, path: Union[Path, DirNode], single_file: Path) -> Optional[SingleCourseInfo]:
         """创建Single文件课程信息
         
         Args:
@@ -341,22 +194,24 @@ class SingleCourseFinder:
         Returns:
             课程信息对象，如果无效则返回None
         """
+        node = DirNode.of(path)
+        path = node.path
         try:
             # 获取课程名称
             course_name = path.name
             
             # 检测目录结构类型
-            structure_type = self._detect_structure_type(path)
+            structure_type = self._detect_structure_type(node)
             if structure_type == 0:
                 return None
             
             # 获取所有视频文件并排序
-            all_videos = self._get_video_files_sorted(path)
+            all_videos = self._get_video_files_sorted(node)
             if not all_videos:
                 return None
             
             # 根据结构类型组织章节
-            chapters = self._scan_chapters(path, structure_type, all_videos)
+            chapters = self._scan_chapters(node, structure_type, all_videos)
             
             return SingleCourseInfo(
                 path=path,
@@ -370,6 +225,14 @@ class SingleCourseFinder:
             print(f"创建Single文件课程信息时出错 {path}: {e}")
             return None
     
+    def scan_course(self, course_path: Path) -> Optional[SingleCourseInfo]:
+        """重新扫描单个课程目录（如快照中的课程已过期），不再是课程时返回None"""
+        node = DirNode.of(course_path)
+        single_file = self._find_single_file(node)
+        if not single_file:
+            return None
+        return self._create_single_course_info(node, single_file)
+    
     def get_scan_statistics(self, courses: List[SingleCourseInfo]) -> dict:
         """获取扫描统计信息
         
@@ -2,8 +2,11 @@
 标签管理模块
 """
 from pathlib import Path
-from typing import Set, List
+from typing import Callable, Dict, FrozenSet, Iterable, List, Optional, Set, Union
+from fnmatch import fnmatch
 from ..utils.config import config
+from .dir_snapshot import DirNode
+from .nomedia_index import NoMediaIndex
 import os
 
 class TagManager:
@@ -34,26 +37,38 @@ class TagManager:
         tag_files = list(directory.glob(f'*{self.tag_extension}'))
         
         for tag_file in tag_files:
-            try:
-                with open(tag_file, 'r', encoding='utf-8') as f:
-                    # 读取文件中的每一行作为一个标签
-                    for line in f:
-                        tag = line.strip()
-                        if tag and not tag.startswith('#'):  # 忽略空行和注释
-                            tags.add(tag)
-            except Exception as e:
-                print(f"读取标签文件 {tag_file} 时出错: {e}")
+            tags.update(self._read_tags_from(tag_file))
                 
         return tags
     
+    def _read_tags_from(self, tag_file: Path) -> Set[str]:
+        """读取单个标签文件"""
+        tags = set()
+        try:
+            with open(tag_file, 'r', encoding='utf-8') as f:
+                # 读取文件中的每一行作为一个标签
+                for line in f:
+                    tag = line.strip()
+                    if tag and not tag.startswith('#'):  # 忽略空行和注释
+                        tags.add(tag)
+        except Exception as e:
+            print(f"读取标签文件 {tag_file} 时出错: {e}")
+        return tags
+    
     def save_tags(self, course_path: Path, tags: Set[str]) -> None:
-        """保存课程标签"""
+        """保存课程标签（内容未变化时不重写标签文件）"""
         tag_file = course_path / f"course{self.tag_extension}"
         try:
             # 保存标签文件
-            with open(tag_file, 'w', encoding='utf-8') as f:
-                for tag in sorted(tags):
-                    f.write(f"{tag}\n")
+            content = "".join(f"{tag}\n" for tag in sorted(tags))
+            try:
+                with open(tag_file, 'r', encoding='utf-8') as f:
+                    unchanged = f.read() == content
+            except (OSError, UnicodeDecodeError):
+                unchanged = False
+            if not unchanged:
+                with open(tag_file, 'w', encoding='utf-8') as f:
+                    f.write(content)
             
             # 处理 .nomedia 文件
             # 检查是否存在 "原" 目录（与 "普通话Deepl" 目录同级）
@@ -86,17 +101,10 @@ class TagManager:
         Returns:
             创建的文件数量
         """
-        created_count = 0
-        original_dirs = self._find_original_dirs(root_path)
-        
-        for directory in original_dirs:
-            if self._create_nomedia_file(directory):
-                created_count += 1
-                
-        return created_count
+        return len(NoMediaIndex(root_path).apply(self.original_dir_name, True).added)
         
     def _find_original_dirs(self, current_path: Path) -> List[Path]:
-        """递归查找所有"原"目录
+        """查找所有"原"目录（跳过包含 .nomedia 的目录及其子目录）
         
         Args:
             current_path: 当前目录路径
@@ -104,26 +112,7 @@ class TagManager:
         Returns:
             找到的"原"目录列表
         """
-        original_dirs = []
-        
-        try:
-            # 如果当前目录有.nomedia文件，跳过该目录
-            if (current_path / ".nomedia").exists():
-                return []
-                
-            # 如果当前目录是"原"目录，添加到列表
-            if current_path.name == self.original_dir_name:
-                original_dirs.append(current_path)
-            
-            # 递归处理子目录
-            for path in current_path.iterdir():
-                if path.is_dir():
-                    original_dirs.extend(self._find_original_dirs(path))
-                    
-        except Exception as e:
-            print(f"扫描目录 {current_path} 时出错: {e}")
-            
-        return original_dirs
+        return NoMediaIndex(current_path).dirs_named(self.original_dir_name, marked=False)
         
     def _create_nomedia_file(self, directory: Path) -> bool:
         """在指定目录中创建.nomedia文件
@@ -141,4 +130,93 @@ class TagManager:
                 return True
         except Exception as e:
             print(f"在目录 {directory} 中创建 .nomedia 文件时出错: {e}")
-        return False 
\ No newline at end of file
+        return False 
+
+
+class TagResolver:
+    """带目录缓存的标签解析器
+    
+    与 TagManager.collect_tags 的结果相同（目录自身及所有上级目录的标签，不含文件系统根目录），
+    但每个目录的标签文件在一次运行中最多读取一次，合并结果也按目录缓存，
+    同一分类下的大量课程只需读取一次公共上级目录。
+    """
+    
+    def __init__(self, tag_manager: Optional[TagManager] = None):
+        self.tag_manager = tag_manager or TagManager()
+        self._own: Dict[Path, FrozenSet[str]] = {}
+        self._merged: Dict[Path, FrozenSet[str]] = {}
+    
+    def _own_tags(self, directory: Path, names: Optional[Iterable[str]] = None) -> FrozenSet[str]:
+        """目录自身标签文件中的标签（names 为已知的文件名列表时不再列出目录）"""
+        own = self._own.get(directory)
+        if own is not None:
+            return own
+        pattern = f'*{self.tag_manager.tag_extension}'
+        tags: Set[str] = set()
+        try:
+            if names is None:
+                with os.scandir(directory) as it:
+                    names = [entry.name for entry in it if not entry.is_dir()]
+            for name in names:
+                if fnmatch(name, pattern):
+                    tags.update(self.tag_manager._read_tags_from(directory / name))
+        except OSError:
+            pass
+        own = frozenset(tags)
+        self._own[directory] = own
+        return own
+    
+    def _merge(self, directory: Path, inherited: FrozenSet[str], own: FrozenSet[str]) -> FrozenSet[str]:
+        merged = inherited | own if own else inherited
+        self._merged[directory] = merged
+        return merged
+    
+    def resolve(self, course_path: Path) -> Set[str]:
+        """收集目录的所有标签（含继承自上级目录的标签）"""
+        # 向上找到最近的已缓存目录，再自上而下合并
+        pending = []
+        current = course_path
+        inherited: FrozenSet[str] = frozenset()
+        while current.parent != current:
+            cached = self._merged.get(current)
+            if cached is not None:
+                inherited = cached
+                break
+            pending.append(current)
+            current = current.parent
+        for directory in reversed(pending):
+            inherited = self._merge(directory, inherited, self._own_tags(directory))
+        return set(inherited)
+    
+    def resolve_tree(self, root: Union[Path, DirNode],
+                     prune: Optional[Callable[[DirNode], bool]] = None) -> Dict[Path, Set[str]]:
+        """一次自上而下遍历，计算目录树中每个目录的继承标签
+        
+        Args:
+            root: 根目录或已列出的目录快照（复用快照中的文件列表）
+            prune: 返回 True 的目录及其子树不计算
+        """
+        node = DirNode.of(root)
+        root_path = node.path
+        inherited = frozenset(self.resolve(root_path.parent)) if root_path.parent != root_path else frozenset()
+        result: Dict[Path, Set[str]] = {}
+        stack = [(node, inherited)]
+        while stack:
+            current, parent_tags = stack.pop()
+            cached = self._merged.get(current.path)
+            if cached is None:
+                try:
+                    names = current.files
+                except OSError:
+                    names = []
+                cached = self._merge(current.path, parent_tags, self._own_tags(current.path, names))
+            result[current.path] = set(cached)
+            try:
+                children = current.dirs
+            except OSError:
+                continue
+            for child in children:
+                if child.is_symlink or (prune and prune(child)):
+                    continue
+                stack.append((child, cached))
+        return result
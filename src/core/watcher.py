@@ -0,0 +1,306 @@
+"""
+监视模式模块
+
+长期运行，监听课程库的文件创建、删除和重命名事件，只为受影响的课程重新生成
+tvshow.nfo 和视频 NFO。Linux 下通过 ctypes 直接调用 inotify，其它平台或
+inotify 不可用时退回到按目录 mtime 轮询。短时间内的连续事件（例如 rsync
+拷入整个课程）会按课程合并，静默一段时间后才生成。
+"""
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Set
+from .scanner import DirectoryScanner
+from .tags import TagResolver
+from .nfo import NFOGenerator
+from .nfo_serializer import is_temp_file
+
+# inotify 事件掩码（见 <sys/inotify.h>）
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = (IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+              | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR)
+
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+
+class WatchEvent(NamedTuple):
+    """变化事件：path 为 None 表示事件可能已丢失（如 inotify 队列溢出），需要全量处理"""
+    path: Optional[Path]
+    new_dir: bool = False
+
+
+RESCAN_ALL = WatchEvent(None)
+
+
+def _is_own_output(name: str) -> bool:
+    """是否为本程序自己写出的文件（避免生成 NFO 后再次触发）"""
+    return name.lower().endswith(".nfo") or is_temp_file(name)
+
+
+class InotifyWatcher:
+    """基于 inotify 的递归目录监视器"""
+
+    def __init__(self, root: Path):
+        self.root = Path(root)
+        libc_name = ctypes.util.find_library("c") or "libc.so.6"
+        self._libc = ctypes.CDLL(libc_name, use_errno=True)
+        self._libc.inotify_init1.argtypes = [ctypes.c_int]
+        self._libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self._libc.inotify_rm_watch.argtypes = [ctypes.c_int, ctypes.c_int]
+        self._fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self._fd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err))
+        self._watches: Dict[int, Path] = {}
+        self._add_tree(self.root)
+
+    def _add_watch(self, path: Path) -> None:
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(str(path)), WATCH_MASK)
+        if wd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, f"{os.strerror(err)}: {path}")
+        self._watches[wd] = path
+
+    def _add_tree(self, top: Path) -> None:
+        """为目录及其所有子目录添加监视"""
+        stack = [top]
+        while stack:
+            current = stack.pop()
+            try:
+                self._add_watch(current)
+                with os.scandir(current) as it:
+                    for entry in it:
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append(current / entry.name)
+            except FileNotFoundError:
+                continue
+
+    def poll(self, timeout: float) -> List[WatchEvent]:
+        """等待事件，返回发生变化的路径；队列溢出时包含 RESCAN_ALL"""
+        ready, _, _ = select.select([self._fd], [], [], timeout)
+        if not ready:
+            return []
+        changed: List[WatchEvent] = []
+        while True:
+            try:
+                data = os.read(self._fd, 64 * 1024)
+            except BlockingIOError:
+                break
+            if not data:
+                break
+            offset = 0
+            while offset < len(data):
+                wd, mask, _cookie, length = _EVENT_HEADER.unpack_from(data, offset)
+                offset += _EVENT_HEADER.size
+                name = os.fsdecode(data[offset:offset + length].rstrip(b"\0"))
+                offset += length
+                if mask & IN_Q_OVERFLOW:
+                    changed.append(RESCAN_ALL)
+                    continue
+                parent = self._watches.get(wd)
+                if mask & IN_IGNORED:
+                    self._watches.pop(wd, None)
+                    continue
+                if parent is None:
+                    continue
+                if not name:
+                    changed.append(WatchEvent(parent))
+                    continue
+                if _is_own_output(name):
+                    continue
+                path = parent / name
+                new_dir = bool(mask & IN_ISDIR and mask & (IN_CREATE | IN_MOVED_TO))
+                if new_dir:
+                    # 新目录：补充监视，其中在监视建立前写入的文件由课程重新扫描覆盖
+                    try:
+                        self._add_tree(path)
+                    except OSError as e:
+                        print(f"添加目录监视失败 {path}: {e}")
+                changed.append(WatchEvent(path, new_dir))
+        return changed
+
+    def close(self) -> None:
+        """关闭 inotify 句柄"""
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+
+class PollingWatcher:
+    """轮询目录内容的后备监视器
+
+    每轮 scandir 所有目录，比较各目录（忽略 NFO 后）的条目名称，
+    因此本程序自己写出的 NFO 不会再次触发生成。
+    """
+
+    def __init__(self, root: Path, interval: float = 30.0):
+        self.root = Path(root)
+        self.interval = interval
+        self._last_poll = time.monotonic()
+        self._signatures = self._collect()
+
+    def _collect(self) -> Dict[Path, int]:
+        signatures: Dict[Path, int] = {}
+        stack = [self.root]
+        while stack:
+            current = stack.pop()
+            names = []
+            try:
+                with os.scandir(current) as it:
+                    for entry in it:
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append(current / entry.name)
+                        elif _is_own_output(entry.name):
+                            continue
+                        names.append(entry.name)
+            except OSError:
+                continue
+            signatures[current] = hash(frozenset(names))
+        return signatures
+
+    def poll(self, timeout: float) -> List[WatchEvent]:
+        """到达轮询间隔时比较目录内容，返回新增、删除或内容变化的目录"""
+        remaining = self.interval - (time.monotonic() - self._last_poll)
+        if remaining > 0:
+            time.sleep(min(timeout, remaining))
+            if time.monotonic() - self._last_poll < self.interval:
+                return []
+        self._last_poll = time.monotonic()
+        current = self._collect()
+        previous = self._signatures
+        self._signatures = current
+        changed = [WatchEvent(path, path not in previous)
+                   for path, sig in current.items() if previous.get(path) != sig]
+        changed.extend(WatchEvent(path) for path in previous if path not in current)
+        return changed
+
+    def close(self) -> None:
+        pass
+
+
+def create_watcher(root: Path, poll_interval: float = 30.0):
+    """创建监视器：优先使用 inotify，不可用时退回轮询"""
+    if sys.platform.startswith("linux"):
+        try:
+            return InotifyWatcher(root)
+        except (OSError, AttributeError) as e:
+            print(f"inotify 不可用，改用轮询模式: {e}")
+    return PollingWatcher(root, poll_interval)
+
+
+class CourseWatchService:
+    """监视课程库并增量生成 NFO"""
+
+    def __init__(self, root: Path, debounce: float = 5.0, watcher=None):
+        self.root = Path(root)
+        self.debounce = debounce
+        self.scanner = DirectoryScanner()
+        self.nfo_generator = NFOGenerator()
+        self.watcher = watcher or create_watcher(self.root)
+        # 待处理目录 -> 最后一次事件时间；_pending_trees 中的目录需要按子树扫描
+        self._pending: Dict[Path, float] = {}
+        self._pending_trees: Set[Path] = set()
+        self._full_rescan = False
+        self._stop = threading.Event()
+
+    def stop(self) -> None:
+        """请求停止监视"""
+        self._stop.set()
+
+    def run(self) -> None:
+        """监视循环，直到调用 stop()"""
+        print(f"开始监视: {self.root}")
+        try:
+            while not self._stop.is_set():
+                self._collect_events(self.watcher.poll(min(1.0, self.debounce)))
+                self._process_due(time.monotonic())
+        finally:
+            self.watcher.close()
+
+    def _collect_events(self, events: List[WatchEvent]) -> None:
+        """将变化的路径映射到课程目录并记录最后一次事件时间"""
+        now = time.monotonic()
+        for path, new_dir in set(events):
+            if path is None:
+                self._full_rescan = True
+                self._pending[self.root] = now
+                continue
+            course_dir = self.scanner.find_course_dir(self.root, path)
+            if course_dir is not None:
+                self._pending[course_dir] = now
+            elif new_dir and not self.scanner.is_suppressed(self.root, path):
+                # 新拷入的目录可能包含完整的课程（如 rsync 整个分类），按子树扫描
+                self._pending[path] = now
+                self._pending_trees.add(path)
+
+    def _process_due(self, now: float) -> None:
+        """处理静默时间超过去抖间隔的课程"""
+        due = [path for path, last in self._pending.items() if now - last >= self.debounce]
+        if not due:
+            return
+        if self._full_rescan:
+            # 全量扫描覆盖所有待处理目录
+            self._full_rescan = False
+            self._pending.clear()
+            self._pending_trees.clear()
+            self._regenerate(self.scanner.scan_directory(self.root))
+            return
+        trees = [path for path in due if path in self._pending_trees]
+        courses = []
+        for path in due:
+            del self._pending[path]
+            self._pending_trees.discard(path)
+            if path in trees:
+                if not any(tree in path.parents for tree in trees):
+                    courses.extend(self._scan_tree(path))
+            elif not any(tree in path.parents for tree in trees):
+                # 位于待扫描子树中的课程由子树扫描一并处理
+                courses.extend(self.scanner.scan_course(path))
+        self._regenerate(courses)
+
+    def _scan_tree(self, path: Path) -> List:
+        """扫描新拷入的目录
+
+        逐步拷入课程时（先创建课程目录，再创建 原/ 等子目录）记录的是课程目录本身，
+        scan_directory 只会把它的子目录当作课程，因此处理时先判断它是否已成为课程。
+        """
+        if self.scanner.find_course_dir(self.root, path) == path:
+            return self.scanner.scan_course(path)
+        return self.scanner.scan_directory(path)
+
+    def _regenerate(self, courses) -> None:
+        """为课程重新生成 NFO"""
+        # 每轮生成使用新的解析器，标签文件的修改在下一轮即可生效
+        tag_resolver = TagResolver()
+        writer = self.nfo_generator.writer
+        writer.begin_run("监视")
+        for course in courses:
+            try:
+                tags = tag_resolver.resolve(course.path)
+                writer.reset()
+                self.nfo_generator.generate_course_nfo(course, tags)
+                print(f"已更新课程NFO: {course.name}（{writer.stats}）")
+            except Exception as e:
+                print(f"更新课程NFO时出错 {course.path}: {e}")
+        writer.finish()
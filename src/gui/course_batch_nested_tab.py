@@ -11,14 +11,22 @@
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
 from pathlib import Path
+import os
 import threading
+from functools import partial
 from queue import Queue
-import time
-from typing import List, Dict
+from typing import Iterator, List, Dict, Tuple
 
 from ..core.batch_nfo_generator import BatchNFOGenerator
-from ..core.scanner import DirectoryScanner, Chapter, VideoFile
-from ..core.course_batch_finder import CourseInfo  # 仅复用数据容器
+from ..core.nfo_engine import MANDARIN_DIR_NAMES, ORIGINAL_DIR_NAMES
+from ..core.scanner import DirectoryScanner
+from ..core.library_model import Chapter, CourseInfo, VideoFile, VideoTable
+from ..core.dir_snapshot import DirNode, open_tree
+from ..core.chapter_builder import ChapterBuilder
+from ..core.natural_sort import dotted_dirs_key
+from ..core.course_signature import SignatureTree, generator_settings
+from ..core.scan_pipeline import run_pipeline
+from ..utils.config import config
 
 
 class CourseBatchNestedTab(ttk.Frame):
@@ -31,17 +39,10 @@ class CourseBatchNestedTab(ttk.Frame):
         self.scanner = DirectoryScanner()
 
         # 语言目录名集合（用于忽略语言目录的嵌套出现）
-        self.default_mandarin_dir_names = {
-            "普通话Deepl",
-            "普通话DeepL",
-            "普通话DeepL[男声]",
-            "普通话DeepL[女声]",
-            "普通话OpenAI-4o-mini",
-            "普通话gemini",
-        }
+        self.default_mandarin_dir_names = set(MANDARIN_DIR_NAMES)
         self.mandarin_dir_names = set(self.default_mandarin_dir_names)
         # 原版目录名集合（兼容“原”字样，不强制要求）
-        self.original_dir_names = {"原", "原版"}
+        self.original_dir_names = set(ORIGINAL_DIR_NAMES) | {"原版"}
         self.language_dir_names = self.mandarin_dir_names | self.original_dir_names
 
         # 自定义普通话目录输入
@@ -66,6 +67,7 @@ class CourseBatchNestedTab(ttk.Frame):
         self.path_entry = ttk.Entry(self.path_frame, textvariable=self.path_var, width=60)
         self.browse_btn = ttk.Button(self.path_frame, text="选择目录", command=self._browse_directory)
         self.scan_btn = ttk.Button(self.path_frame, text="开始扫描", command=self._start_scan, state='disabled')
+        self.pipeline_btn = ttk.Button(self.path_frame, text="扫描并生成", command=self._start_pipeline, state='disabled')
 
         # 设置区域
         self.settings_frame = ttk.LabelFrame(self, text="设置", padding=10)
@@ -117,6 +119,7 @@ class CourseBatchNestedTab(ttk.Frame):
         self.path_entry.pack(side='left', expand=True, fill='x')
         self.browse_btn.pack(side='left', padx=(5, 5))
         self.scan_btn.pack(side='left')
+        self.pipeline_btn.pack(side='left', padx=(5, 0))
 
         # 设置区域
         self.settings_frame.pack(fill='x', padx=5, pady=5)
@@ -152,18 +155,14 @@ class CourseBatchNestedTab(ttk.Frame):
         if directory:
             self.path_var.set(directory)
             self.scan_btn.configure(state='normal')
+            self.pipeline_btn.configure(state='normal')
 
     def _start_scan(self):
-        if self.scan_thread and self.scan_thread.is_alive():
+        if self._is_busy():
             return
 
         # 合并自定义普通话目录
-        custom_names = self._parse_custom_mandarin_names()
-        if custom_names:
-            self.mandarin_dir_names = set(self.default_mandarin_dir_names) | custom_names
-            self.language_dir_names = self.mandarin_dir_names | self.original_dir_names
-            if hasattr(self.batch_nfo_generator, 'mandarin_dir_names'):
-                self.batch_nfo_generator.mandarin_dir_names = set(self.mandarin_dir_names)
+        self._apply_custom_mandarin_names()
 
         # 准备状态
         self._reset_state()
@@ -177,6 +176,36 @@ class CourseBatchNestedTab(ttk.Frame):
         # 启动进度更新
         self.after(100, self._update_progress)
 
+    def _start_pipeline(self):
+        # 边扫描边生成：找到一个课程即生成一个，课程不保留在列表中
+        if self._is_busy():
+            return
+        if not messagebox.askyesno("确认生成", "确定要扫描所选目录，并为找到的课程直接生成NFO文件吗？"):
+            return
+
+        self._apply_custom_mandarin_names()
+        self._reset_state()
+        self.scan_btn.configure(state='disabled')
+        self.pipeline_btn.configure(state='disabled')
+        self.status_var.set("正在扫描并生成NFO...")
+
+        self.generate_thread = threading.Thread(target=self._perform_pipeline, args=(Path(self.path_var.get()),))
+        self.generate_thread.daemon = True
+        self.generate_thread.start()
+        self.after(100, self._update_progress)
+
+    def _is_busy(self) -> bool:
+        return bool((self.scan_thread and self.scan_thread.is_alive()) or
+                    (self.generate_thread and self.generate_thread.is_alive()))
+
+    def _apply_custom_mandarin_names(self):
+        custom_names = self._parse_custom_mandarin_names()
+        if custom_names:
+            self.mandarin_dir_names = set(self.default_mandarin_dir_names) | custom_names
+            self.language_dir_names = self.mandarin_dir_names | self.original_dir_names
+            if hasattr(self.batch_nfo_generator, 'mandarin_dir_names'):
+                self.batch_nfo_generator.mandarin_dir_names = set(self.mandarin_dir_names)
+
     def _parse_custom_mandarin_names(self):
         text = (self.custom_mandarin_var.get() or "").strip()
         if not text:
@@ -200,53 +229,62 @@ class CourseBatchNestedTab(ttk.Frame):
         try:
             self.progress_queue.put(("scan_start", ""))
             courses = []
-            self._scan_directory_recursive(directory, courses)
+            with open_tree(directory, config.get('scan_workers')) as root:
+                self._scan_directory_recursive(root, courses)
             self.progress_queue.put(("scan_complete", courses))
         except Exception as e:
             self.progress_queue.put(("error", str(e)))
 
-    def _scan_directory_recursive(self, current_path: Path, courses: List[CourseInfo]):
+    def _iter_courses(self, directory: Path) -> Iterator[CourseInfo]:
+        # 流式扫描：每找到一个课程立即产出，扫描完的子目录快照随即释放
+        with open_tree(directory, config.get('scan_workers')) as root:
+            yield from self._iter_directory(root, release=True)
+
+    def _scan_directory_recursive(self, current_path, courses: List[CourseInfo]):
+        courses.extend(self._iter_directory(current_path))
+
+    def _iter_directory(self, current_path, release: bool = False) -> Iterator[CourseInfo]:
+        node = DirNode.of(current_path)
+        current_path = node.path
         try:
-            if self._is_course_directory_lession2(current_path):
-                course_info = self._create_course_info(current_path)
+            if self._is_course_directory_lession2(node):
+                course_info = self._create_course_info(node)
                 if course_info:
-                    courses.append(course_info)
+                    yield course_info
                 return
 
-            for item in current_path.iterdir():
-                if item.is_dir():
-                    self._scan_directory_recursive(item, courses)
+            for item in node.dirs:
+                yield from self._iter_directory(item, release)
+                if release:
+                    item.release()
         except PermissionError:
             print(f"权限不足，无法访问目录: {current_path}")
         except Exception as e:
             print(f"扫描目录时出错 {current_path}: {e}")
 
-    def _is_course_directory_lession2(self, path: Path) -> bool:
+    def _is_course_directory_lession2(self, path) -> bool:
         try:
-            for item in path.iterdir():
-                if item.is_file() and item.name.lower() == "lession_2":
-                    return True
-            return False
+            return any(name.lower() == "lession_2" for name in DirNode.of(path).files)
         except Exception:
             return False
 
-    def _create_course_info(self, path: Path) -> CourseInfo | None:
+    def _create_course_info(self, path) -> CourseInfo | None:
+        node = DirNode.of(path)
+        path = node.path
         try:
             course_name = path.name
-            lesson_files = [p for p in path.iterdir() if p.is_file() and p.name.lower() == "lession_2"]
+            lesson_files = [path / name for name in node.files if name.lower() == "lession_2"]
 
             if not lesson_files:
                 return None
 
             mandarin_paths = []
             original_path = None
-            for item in path.iterdir():
-                if not item.is_dir():
-                    continue
+            for item in node.dirs:
                 if item.name in self.mandarin_dir_names:
-                    mandarin_paths.append(item)
+                    mandarin_paths.append(item.path)
                 if item.name in self.original_dir_names and original_path is None:
-                    original_path = item
+                    original_path = item.path
             mandarin_paths.sort(key=lambda p: p.name)
 
             return CourseInfo(
@@ -280,31 +318,115 @@ class CourseBatchNestedTab(ttk.Frame):
 
     def _perform_nfo_generation(self, courses_to_process: List[CourseInfo]):
         total = len(courses_to_process)
-        processed = 0
-
+        generator = self.batch_nfo_generator
+        generator.writer.begin_run("课程批量查找(多级)")
+        finished = []
+
+        def on_course_done(course, failed):
+            # 课程的全部NFO写完后回调（可能在写入线程中，list.append 为原子操作）
+            if failed:
+                self._fail_signatures(signatures, course)
+            finished.append(True)
+            processed = len(finished)
+            self.progress_queue.put(("generate", (processed, total, processed / total * 100)))
+
+        # 签名未变化的语言版本整个跳过，不再构建章节（见 course_signature）
+        signatures = SignatureTree(scan_index=self.scanner.scan_index)
         for course in courses_to_process:
-            try:
-                # 为每个语言版本生成NFO
-                if course.has_mandarin and getattr(course, "mandarin_paths", None):
-                    for mandarin_path in course.mandarin_paths:
-                        self._generate_course_nfo_for_language(course, mandarin_path, True)
-
-                if course.has_original and course.original_path:
-                    self._generate_course_nfo_for_language(course, course.original_path, False)
+            self._add_signatures(signatures, course)
+        signatures.compute()
 
-                processed += 1
-                progress = (processed / total) * 100
-                self.progress_queue.put(("generate", (processed, total, progress)))
-                time.sleep(0.01)
-            except Exception as e:
-                print(f"生成课程NFO时出错 {course.name}: {e}")
+        for course in courses_to_process:
+            # 提交完一个课程的写入即可组织下一个课程，写入在写入池中并发完成
+            with generator.pool.course(partial(on_course_done, course), wait=False):
+                try:
+                    # 为每个语言版本生成NFO
+                    self._generate_language_versions(course, signatures)
+
+                except Exception as e:
+                    print(f"生成课程NFO时出错 {course.name}: {e}")
+                    generator.pool.record_failure()
+
+        generator.pool.wait()
+        signatures.commit()
+        generator.writer.finish()
+        self.progress_queue.put(("generate_complete", (len(finished), generator.writer.stats, signatures)))
+
+    def _perform_pipeline(self, directory: Path):
+        # 扫描线程找到的课程经有界队列逐个交给本线程生成（见 scan_pipeline）
+        generator = self.batch_nfo_generator
+        generator.writer.begin_run("课程批量查找(多级)")
+        finished = []
+        # 课程逐个到达，无法先汇总目录，各语言版本单独比较，签名在全部写完后保存
+        signatures = SignatureTree(scan_index=self.scanner.scan_index, rollup=False)
+
+        def on_course_done(course, failed):
+            if failed:
+                self._fail_signatures(signatures, course)
+            finished.append(True)
+
+        def generate(course: CourseInfo):
+            self._add_signatures(signatures, course)
+            signatures.compute()
+            with generator.pool.course(partial(on_course_done, course), wait=False):
+                self._generate_language_versions(course, signatures)
 
-        self.progress_queue.put(("generate_complete", processed))
+        try:
+            try:
+                run_pipeline(self._iter_courses(directory), generate,
+                             progress=lambda stats: self.progress_queue.put(("pipeline", str(stats))))
+            finally:
+                generator.pool.wait()
+                signatures.commit()
+                generator.writer.finish()
+            self.progress_queue.put(("generate_complete", (len(finished), generator.writer.stats, signatures)))
+        except Exception as e:
+            self.progress_queue.put(("error", str(e)))
 
-    def _generate_course_nfo_for_language(self, course: CourseInfo, language_path: Path, is_mandarin: bool):
+    def _language_versions(self, course: CourseInfo) -> List[Tuple[Path, bool]]:
+        """课程需要生成NFO的语言版本：[(语言目录, 是否普通话)]"""
+        versions = []
+        if course.has_mandarin and getattr(course, "mandarin_paths", None):
+            versions.extend((mandarin_path, True) for mandarin_path in course.mandarin_paths)
+        if course.has_original and course.original_path:
+            versions.append((course.original_path, False))
+        return versions
+
+    def _add_signatures(self, signatures: SignatureTree, course: CourseInfo):
+        for language_path, is_mandarin in self._language_versions(course):
+            self._add_signature(signatures, course, language_path, is_mandarin)
+
+    def _fail_signatures(self, signatures: SignatureTree, course: CourseInfo):
+        # 课程有写入失败：各语言版本不保存签名，下次仍会重新生成
+        for language_path, _ in self._language_versions(course):
+            signatures.fail(language_path)
+
+    def _generate_language_versions(self, course: CourseInfo, signatures: SignatureTree):
+        # 签名有变化的语言版本才生成，复用计算签名时列出的目录快照
+        for language_path, is_mandarin in self._language_versions(course):
+            if not signatures.is_unchanged(language_path):
+                self._generate_course_nfo_for_language(course, signatures.node(language_path), is_mandarin)
+
+    def _add_signature(self, signatures: SignatureTree, course: CourseInfo, language_path: Path, is_mandarin: bool):
+        # 视频的收集规则与 _collect_videos_up_to_depth 一致：跳过嵌套的语言目录，只到 depth 层
+        depth = max(2, int(self.depth_var.get() or 2))
+        generator = self.batch_nfo_generator
+        settings = generator_settings(generator) + [
+            course.path.name,
+            "普通话" if is_mandarin else "原版",
+            ",".join(sorted(self.language_dir_names)),
+            ",".join(sorted(generator.original_dir_names)),
+            f"depth={depth}",
+        ]
+        signatures.add(language_path, settings, prune=lambda d: d.name in self.language_dir_names,
+                       max_depth=depth, video_extensions=self._video_extensions())
+
+    def _generate_course_nfo_for_language(self, course: CourseInfo, language_path, is_mandarin: bool):
         try:
             depth = max(2, int(self.depth_var.get() or 2))
-            chapters = self._build_chapters_with_depth(language_path, depth)
+            node = DirNode.of(language_path)
+            language_path = node.path
+            chapters = self._build_chapters_with_depth(node, depth)
             if chapters:
                 self.batch_nfo_generator.generate_course_nfos(course.path, language_path, chapters, is_mandarin)
                 print(f"成功为 {course.name} 的 {language_path.name} 版本生成NFO文件")
@@ -312,13 +434,17 @@ class CourseBatchNestedTab(ttk.Frame):
                 print(f"无法为 {course.name} 的 {language_path.name} 版本构建章节信息")
         except Exception as e:
             print(f"为语言版本生成NFO时出错 {e}")
+            self.batch_nfo_generator.pool.record_failure()
 
     # ---------- 章节构建（可配置层级） ----------
     def _build_chapters_with_depth(self, language_path: Path, depth: int) -> List[Chapter]:
         try:
+            # 语言目录只列出一次，视频收集与章节构建共用同一份快照
+            node = DirNode.of(language_path)
+            language_path = node.path
             # 收集叶子目录的视频
             # 规则调整：在不超过 depth 的任一层级，如果目录内存在视频则纳入（满足“1级目录直接是视频”的场景）
-            all_videos = self._collect_videos_up_to_depth(language_path, depth)
+            all_videos = self._collect_videos_up_to_depth(node, depth)
             if not all_videos:
                 return []
 
@@ -328,15 +454,16 @@ class CourseBatchNestedTab(ttk.Frame):
                 v.global_episode_number = i
 
             # 构建章节树
-            return self._build_chapter_tree(language_path, depth, all_videos)
+            return self._build_chapter_tree(node, depth, all_videos)
         except Exception as e:
             print(f"构建章节信息时出错 {e}")
             return []
 
-    def _collect_videos_up_to_depth(self, root: Path, depth: int) -> List[VideoFile]:
+    def _collect_videos_up_to_depth(self, root, depth: int) -> List[VideoFile]:
+        table = VideoTable()
         videos: List[VideoFile] = []
 
-        def recurse(curr: Path, level: int):
+        def recurse(curr: DirNode, level: int):
             # 跳过语言目录名重复嵌套
             if level > 0 and curr.name in self.language_dir_names:
                 return
@@ -344,9 +471,9 @@ class CourseBatchNestedTab(ttk.Frame):
             # 收集当前目录中的视频（level <= depth）
             if level <= depth:
                 try:
-                    for f in curr.iterdir():
-                        if f.is_file() and self._is_video_file(f):
-                            videos.append(VideoFile(path=f, name=f.stem, episode_number=1))
+                    for name in curr.files:
+                        if self._is_video_name(name):
+                            videos.append(table.add(curr.path, name, episode_number=1))
                 except Exception:
                     pass
 
@@ -356,101 +483,34 @@ class CourseBatchNestedTab(ttk.Frame):
 
             # 继续向下
             try:
-                for item in sorted(curr.iterdir()):
-                    if item.is_dir():
-                        recurse(item, level + 1)
+                for item in curr.sorted_dirs():
+                    recurse(item, level + 1)
             except Exception:
                 pass
 
-        recurse(root, 0)
+        recurse(DirNode.of(root), 0)
         return videos
 
     def _video_sort_key_with_dirs(self, language_root: Path, depth: int):
-        def extract_numeric_tuple(name: str):
-            import re
-            s = name.strip()
-            # 优先匹配点分层号，如 2.1.2、10.03.7
-            m = re.match(r'^(\d+(?:\.\d+)+)', s)
-            if m:
-                try:
-                    return tuple(int(p) for p in m.group(1).split('.'))
-                except Exception:
-                    pass
-            # 退化为单个前导数字
-            m2 = re.match(r'^(\d+)(?:\s*[-_\.]?\s*)?', s)
-            if m2:
-                try:
-                    return (int(m2.group(1)),)
-                except Exception:
-                    pass
-            # 无数字，返回大数以置后
-            return (999999,)
-
-        def key(video: VideoFile):
-            # 组装（每级目录的数字元组..., 文件名数字元组, 名字稳定兜底）
-            parts: List[int] = []
-            rel = video.path.parent
-            names: List[str] = []
-            while rel != language_root and language_root in rel.parents and len(names) < depth:
-                names.append(rel.name)
-                rel = rel.parent
-            names.reverse()
-            if len(names) < depth:
-                names = names + (["0"] * (depth - len(names)))
-            # 目录层排序片段
-            seq: List[int] = []
-            for n in names:
-                seq.extend(extract_numeric_tuple(n))
-            # 文件名排序片段（支持 2.1.1 这种）
-            seq.extend(extract_numeric_tuple(video.name))
-            # 返回（数值序列, 名称小写）保证稳定
-            return (tuple(seq), video.name.lower())
-
-        return key
-
-    def _build_chapter_tree(self, root: Path, depth: int, all_videos: List[VideoFile]) -> List[Chapter]:
-        # 递归构建 Chapter 树：在 <= depth 的任一层，若目录中存在视频则直接挂载到该层对应的章节
-        def build_children(parent: Path, level: int) -> List[Chapter]:
-            result: List[Chapter] = []
-            if level > 0 and parent.name in self.language_dir_names:
-                return result
-
-            # 首先处理每个直接子目录
-            try:
-                for sub in sorted(parent.iterdir()):
-                    if not sub.is_dir() or sub.name in self.language_dir_names:
-                        continue
-
-                    # 收集该目录自身的视频
-                    vids = [v for v in all_videos if v.path.parent == sub]
+        # 排序键：（每级目录的点分层号..., 文件名点分层号, 名称小写），目录不足 depth 级时补 0
+        return dotted_dirs_key(language_root, depth)
 
-                    # 如果还未达到最大层级，继续构建子章节
-                    sub_chapters: List[Chapter] = []
-                    if level + 1 <= depth:
-                        if level + 1 < depth:
-                            sub_chapters = build_children(sub, level + 1)
-
-                    if vids or sub_chapters:
-                        result.append(Chapter(name=sub.name, videos=vids, sub_chapters=sub_chapters))
-            except Exception:
-                pass
-
-            # 在根层，如果根目录自身包含视频（少见），作为一个无名章节放在最前
-            if level == 0:
-                root_videos = [v for v in all_videos if v.path.parent == parent]
-                if root_videos:
-                    result.insert(0, Chapter(name="", videos=root_videos, sub_chapters=[]))
-
-            return result
-
-        return build_children(root, 0)
+    def _build_chapter_tree(self, root, depth: int, all_videos: List[VideoFile]) -> List[Chapter]:
+        # 递归构建 Chapter 树：在 <= depth 的任一层，若目录中存在视频则直接挂载到该层对应的章节
+        return ChapterBuilder(all_videos, self.language_dir_names).build_tree(root, depth)
 
     # ---------- 工具 ----------
-    def _is_video_file(self, path: Path) -> bool:
+    def _video_extensions(self) -> List[str]:
         exts = getattr(self.scanner, 'video_extensions', None)
         if not exts:
             exts = ['.mp4', '.mkv', '.avi']
-        return path.suffix.lower() in exts
+        return exts
+
+    def _is_video_file(self, path: Path) -> bool:
+        return path.suffix.lower() in self._video_extensions()
+
+    def _is_video_name(self, name: str) -> bool:
+        return os.path.splitext(name)[1].lower() in self._video_extensions()
 
     def _clear_results(self):
         self._reset_state()
@@ -484,20 +544,30 @@ class CourseBatchNestedTab(ttk.Frame):
                     processed, total, progress = data
                     self.progress_var.set(progress)
                     self.status_var.set(f"正在生成NFO: {processed}/{total}")
+                elif action == "pipeline":
+                    self.status_var.set(f"正在扫描并生成NFO：{data}")
                 elif action == "generate_complete":
-                    self.status_var.set(f"NFO生成完成，共处理 {data} 个课程")
+                    processed, stats, signatures = data
+                    self.status_var.set(f"NFO生成完成，共处理 {processed} 个课程（{stats}；{signatures}）")
                     self.progress_var.set(100)
-                    self.generate_nfo_btn.configure(state='normal')
+                    self.generate_nfo_btn.configure(state='normal' if self.courses else 'disabled')
+                    self._enable_scan_buttons()
                 elif action == "error":
                     messagebox.showerror("错误", f"操作出错: {data}")
                     self.status_var.set("操作出错")
                     self._reset_state()
+                    self._enable_scan_buttons()
         except Exception as e:
             print(f"更新进度时出错 {e}")
 
         if (self.scan_thread and self.scan_thread.is_alive()) or (self.generate_thread and self.generate_thread.is_alive()):
             self.after(100, self._update_progress)
 
+    def _enable_scan_buttons(self):
+        if self.path_var.get():
+            self.scan_btn.configure(state='normal')
+            self.pipeline_btn.configure(state='normal')
+
     def _display_courses(self):
         self._clear_courses_tree()
         for course in self.courses:
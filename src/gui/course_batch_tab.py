@@ -4,12 +4,22 @@
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
 from pathlib import Path
+import os
 import threading
+from functools import partial
 from queue import Queue
-import time
 from ..core.course_batch_finder import CourseBatchFinder, CourseInfo
 from ..core.batch_nfo_generator import BatchNFOGenerator
+from ..core.nfo_engine import MANDARIN_DIR_NAMES, ORIGINAL_DIR_NAMES
 from ..core.scanner import DirectoryScanner
+from ..core.dir_snapshot import DirNode
+from ..core.chapter_builder import ChapterBuilder
+from ..core.library_model import VideoTable
+from ..core.natural_sort import leading_number, top_dir_key
+from ..core.scan_index import ScanIndex
+from ..core.course_signature import SignatureTree, generator_settings
+from ..core.scan_pipeline import run_pipeline
+from ..core.library_snapshot import load_library, save_library
 from ..utils.config import config
 
 class CourseBatchTab(ttk.Frame):
@@ -18,12 +28,14 @@ class CourseBatchTab(ttk.Frame):
     def __init__(self, parent):
         super().__init__(parent)
         self.finder = CourseBatchFinder()
+        # 增量扫描：未变化的目录复用索引中的列表
+        self.finder.scan_index = ScanIndex.from_config()
         self.batch_nfo_generator = BatchNFOGenerator()
         self.scanner = DirectoryScanner()
         # 语言目录名集合（用于忽略语言目录的嵌套出现）
-        self.default_mandarin_dir_names = {"普通话Deepl", "普通话DeepL", "普通话DeepL[男声]", "普通话DeepL[女声]", "普通话OpenAI-4o-mini", "普通话gemini"}
+        self.default_mandarin_dir_names = set(MANDARIN_DIR_NAMES)
         self.mandarin_dir_names = set(self.default_mandarin_dir_names)
-        self.original_dir_names = {"原"}
+        self.original_dir_names = set(ORIGINAL_DIR_NAMES)
         self.language_dir_names = self.mandarin_dir_names | self.original_dir_names
         if hasattr(self.finder, 'mandarin_dir_names'):
             self.finder.mandarin_dir_names = set(self.mandarin_dir_names)
@@ -35,9 +47,11 @@ class CourseBatchTab(ttk.Frame):
         self.progress_queue = Queue()
         self.scan_thread = None
         self.generate_thread = None
+        self.from_snapshot = False  # 课程列表是否来自快照（可能已过期）
         
         self._create_widgets()
         self._setup_layout()
+        self._load_snapshot()
         
     def _create_widgets(self):
         """创建控件"""
@@ -47,6 +61,8 @@ class CourseBatchTab(ttk.Frame):
         self.path_entry = ttk.Entry(self.path_frame, textvariable=self.path_var, width=60)
         self.browse_btn = ttk.Button(self.path_frame, text="选择目录", command=self._browse_directory)
         self.scan_btn = ttk.Button(self.path_frame, text="开始扫描", command=self._start_scan, state='disabled')
+        # 边扫描边生成：不等扫描结束，找到一个课程即生成一个
+        self.pipeline_btn = ttk.Button(self.path_frame, text="扫描并生成", command=self._start_pipeline, state='disabled')
 
         # 语言目录设置
         self.settings_frame = ttk.LabelFrame(self, text="语言目录设置", padding=10)
@@ -119,6 +135,7 @@ class CourseBatchTab(ttk.Frame):
         self.path_entry.pack(side='left', expand=True, fill='x', padx=(0, 5))
         self.browse_btn.pack(side='left', padx=(0, 5))
         self.scan_btn.pack(side='left')
+        self.pipeline_btn.pack(side='left', padx=(5, 0))
 
         # 语言目录设置
         self.settings_frame.pack(fill='x', padx=5, pady=5)
@@ -151,23 +168,14 @@ class CourseBatchTab(ttk.Frame):
         if directory:
             self.path_var.set(directory)
             self.scan_btn.configure(state='normal')
+            self.pipeline_btn.configure(state='normal')
             
     def _start_scan(self):
         """开始扫描"""
-        if self.scan_thread and self.scan_thread.is_alive():
+        if self._is_busy():
             return
             
-        # 合并自定义普通话目录名
-        custom_names = self._parse_custom_mandarin_names()
-        if custom_names:
-            self.mandarin_dir_names = set(self.default_mandarin_dir_names) | custom_names
-            self.language_dir_names = self.mandarin_dir_names | self.original_dir_names
-            # 同步到查找器，确保只匹配课程根目录的直接子目录
-            if hasattr(self.finder, 'mandarin_dir_names'):
-                self.finder.mandarin_dir_names = set(self.mandarin_dir_names)
-            if hasattr(self.batch_nfo_generator, 'mandarin_dir_names'):
-                self.batch_nfo_generator.mandarin_dir_names = set(self.mandarin_dir_names)
-
+        self._apply_custom_mandarin_names()
         self._reset_state()
         self.status_var.set("正在扫描目录...")
         
@@ -181,6 +189,50 @@ class CourseBatchTab(ttk.Frame):
         # 启动进度更新
         self.after(100, self._update_progress)
 
+    def _start_pipeline(self):
+        """边扫描边生成NFO（找到的课程不保留在列表中，内存占用不随目录规模增长）"""
+        if self._is_busy():
+            return
+
+        if not messagebox.askyesno(
+            "确认生成",
+            "确定要扫描所选目录，并为找到的课程直接生成NFO文件吗？"
+        ):
+            return
+
+        self._apply_custom_mandarin_names()
+        self._reset_state()
+        self.scan_btn.configure(state='disabled')
+        self.pipeline_btn.configure(state='disabled')
+        self.status_var.set("正在扫描并生成NFO...")
+
+        self.generate_thread = threading.Thread(
+            target=self._perform_pipeline,
+            args=(Path(self.path_var.get()),)
+        )
+        self.generate_thread.daemon = True
+        self.generate_thread.start()
+
+        # 启动进度更新
+        self.after(100, self._update_progress)
+
+    def _is_busy(self):
+        """是否有扫描或生成正在进行"""
+        return (self.scan_thread and self.scan_thread.is_alive()) or \
+               (self.generate_thread and self.generate_thread.is_alive())
+
+    def _apply_custom_mandarin_names(self):
+        """合并自定义普通话目录名"""
+        custom_names = self._parse_custom_mandarin_names()
+        if custom_names:
+            self.mandarin_dir_names = set(self.default_mandarin_dir_names) | custom_names
+            self.language_dir_names = self.mandarin_dir_names | self.original_dir_names
+            # 同步到查找器，确保只匹配课程根目录的直接子目录
+            if hasattr(self.finder, 'mandarin_dir_names'):
+                self.finder.mandarin_dir_names = set(self.mandarin_dir_names)
+            if hasattr(self.batch_nfo_generator, 'mandarin_dir_names'):
+                self.batch_nfo_generator.mandarin_dir_names = set(self.mandarin_dir_names)
+
     def _parse_custom_mandarin_names(self):
         """解析自定义普通话目录名，返回集合"""
         text = (self.custom_mandarin_var.get() or "").strip()
@@ -190,9 +242,25 @@ class CourseBatchTab(ttk.Frame):
         names = {part.strip() for part in text.split(',') if part.strip()}
         return names
         
+    def _load_snapshot(self):
+        """显示上次扫描保存的课程列表（见 library_snapshot）"""
+        snapshot = load_library("course_batch")
+        if snapshot is None or not snapshot.courses:
+            return
+        self.courses = snapshot.courses
+        self.from_snapshot = True
+        self.path_var.set(str(snapshot.root))
+        self.scan_btn.configure(state='normal')
+        self.pipeline_btn.configure(state='normal')
+        self._display_courses()
+        self._display_statistics()
+        self.status_var.set(f"已加载 {snapshot.describe()}，共 {len(self.courses)} 个课程（重新扫描可更新）")
+        self.generate_nfo_btn.configure(state='normal')
+        
     def _reset_state(self):
         """重置所有状态"""
         self.courses.clear()
+        self.from_snapshot = False
         self.progress_var.set(0)
         self.generate_nfo_btn.configure(state='disabled')
         self._clear_courses_tree()
@@ -212,6 +280,8 @@ class CourseBatchTab(ttk.Frame):
             
             # 执行扫描
             courses = self.finder.find_courses_with_lession(directory)
+            # 保存快照，下次启动直接加载
+            save_library("course_batch", directory, courses)
             
             # 扫描完成
             self.progress_queue.put(("scan_complete", courses))
@@ -236,7 +306,7 @@ class CourseBatchTab(ttk.Frame):
         
         self.generate_thread = threading.Thread(
             target=self._perform_nfo_generation,
-            args=(self.courses[:],)
+            args=(self.courses[:], self.from_snapshot)
         )
         self.generate_thread.daemon = True
         self.generate_thread.start()
@@ -244,37 +314,125 @@ class CourseBatchTab(ttk.Frame):
         # 启动进度更新
         self.after(100, self._update_progress)
         
-    def _perform_nfo_generation(self, courses_to_process):
-        """执行NFO生成"""
+    def _perform_nfo_generation(self, courses_to_process, from_snapshot=False):
+        """执行NFO生成（from_snapshot 为 True 时先按当前目录重新识别各课程的语言目录）"""
+        if from_snapshot:
+            refreshed = (self.finder.scan_course(course.path) for course in courses_to_process)
+            courses_to_process = [course for course in refreshed if course]
         total = len(courses_to_process)
-        processed = 0
-        
+        generator = self.batch_nfo_generator
+        generator.writer.begin_run("课程批量查找")
+        finished = []
+
+        def on_course_done(course, failed):
+            # 课程的全部NFO写完后回调（可能在写入线程中，list.append 为原子操作）
+            if failed:
+                self._fail_signatures(signatures, course)
+            finished.append(True)
+            processed = len(finished)
+            self.progress_queue.put(("generate", (processed, total, processed / total * 100)))
+        
+        # 签名未变化的语言版本整个跳过，不再构建章节（见 course_signature）
+        signatures = SignatureTree(scan_index=self.finder.scan_index)
         for course in courses_to_process:
-            try:
-                # 为每个语言版本生成NFO
-                if course.has_mandarin and getattr(course, "mandarin_paths", None):
-                    for mandarin_path in course.mandarin_paths:
-                        self._generate_course_nfo_for_language(course, mandarin_path, True)
+            self._add_signatures(signatures, course)
+        signatures.compute()
                 
-                if course.has_original and course.original_path:
-                    self._generate_course_nfo_for_language(course, course.original_path, False)
-                
-                processed += 1
-                progress = (processed / total) * 100
-                self.progress_queue.put(("generate", (processed, total, progress)))
-                time.sleep(0.01)  # 避免界面卡顿
+        for course in courses_to_process:
+            # 提交完一个课程的写入即可组织下一个课程，写入在写入池中并发完成
+            with generator.pool.course(partial(on_course_done, course), wait=False):
+                try:
+                    # 为每个语言版本生成NFO
+                    self._generate_language_versions(course, signatures)
                 
-            except Exception as e:
-                print(f"生成课程NFO时出错 {course.name}: {e}")
+                except Exception as e:
+                    print(f"生成课程NFO时出错 {course.name}: {e}")
+                    generator.pool.record_failure()
                 
+        generator.pool.wait()
+        signatures.commit()
+        generator.writer.finish()
         # 生成完成
-        self.progress_queue.put(("generate_complete", processed))
+        self.progress_queue.put(("generate_complete", (len(finished), generator.writer.stats, signatures)))
+
+    def _perform_pipeline(self, directory: Path):
+        """边扫描边生成：扫描线程找到的课程经有界队列逐个交给本线程生成"""
+        generator = self.batch_nfo_generator
+        generator.writer.begin_run("课程批量查找")
+        finished = []
+        # 课程逐个到达，无法先汇总目录，各语言版本单独比较，签名在全部写完后保存
+        signatures = SignatureTree(scan_index=self.finder.scan_index, rollup=False)
+
+        def on_course_done(course, failed):
+            if failed:
+                self._fail_signatures(signatures, course)
+            finished.append(True)
+
+        def generate(course: CourseInfo):
+            self._add_signatures(signatures, course)
+            signatures.compute()
+            with generator.pool.course(partial(on_course_done, course), wait=False):
+                self._generate_language_versions(course, signatures)
+
+        try:
+            try:
+                run_pipeline(
+                    self.finder.iter_courses_with_lession(directory),
+                    generate,
+                    progress=lambda stats: self.progress_queue.put(("pipeline", str(stats)))
+                )
+            finally:
+                generator.pool.wait()
+                signatures.commit()
+                generator.writer.finish()
+            self.progress_queue.put(("generate_complete", (len(finished), generator.writer.stats, signatures)))
+        except Exception as e:
+            self.progress_queue.put(("error", str(e)))
         
-    def _generate_course_nfo_for_language(self, course: CourseInfo, language_path: Path, is_mandarin: bool):
-        """为特定语言版本生成课程NFO"""
+    def _language_versions(self, course: CourseInfo):
+        """课程需要生成NFO的语言版本：[(语言目录, 是否普通话)]"""
+        versions = []
+        if course.has_mandarin and getattr(course, "mandarin_paths", None):
+            versions.extend((mandarin_path, True) for mandarin_path in course.mandarin_paths)
+        if course.has_original and course.original_path:
+            versions.append((course.original_path, False))
+        return versions
+
+    def _add_signatures(self, signatures: SignatureTree, course: CourseInfo):
+        """登记课程各语言版本的签名"""
+        for language_path, is_mandarin in self._language_versions(course):
+            self._add_signature(signatures, course, language_path, is_mandarin)
+
+    def _fail_signatures(self, signatures: SignatureTree, course: CourseInfo):
+        """课程有写入失败：各语言版本不保存签名，下次仍会重新生成"""
+        for language_path, _ in self._language_versions(course):
+            signatures.fail(language_path)
+
+    def _generate_language_versions(self, course: CourseInfo, signatures: SignatureTree):
+        """为签名有变化的语言版本生成NFO（复用计算签名时列出的目录快照）"""
+        for language_path, is_mandarin in self._language_versions(course):
+            if not signatures.is_unchanged(language_path):
+                self._generate_course_nfo_for_language(course, signatures.node(language_path), is_mandarin)
+
+    def _add_signature(self, signatures: SignatureTree, course: CourseInfo, language_path: Path, is_mandarin: bool):
+        """登记语言版本的签名：视频的收集规则与 _get_video_files_sorted 一致"""
+        generator = self.batch_nfo_generator
+        settings = generator_settings(generator) + [
+            course.path.name,
+            "普通话" if is_mandarin else "原版",
+            ",".join(sorted(self.language_dir_names)),
+            ",".join(sorted(generator.original_dir_names)),
+        ]
+        signatures.add(language_path, settings, prune=lambda d: d.name in self.language_dir_names,
+                       video_extensions=['.mp4', '.mkv', '.avi'])
+
+    def _generate_course_nfo_for_language(self, course: CourseInfo, language_path, is_mandarin: bool):
+        """为特定语言版本生成课程NFO（language_path 可以是已列出的目录快照）"""
         try:
             # 为语言目录构建章节信息
-            chapters = self._build_chapters_for_language_directory(language_path)
+            node = DirNode.of(language_path)
+            language_path = node.path
+            chapters = self._build_chapters_for_language_directory(node)
             
             if chapters:
                 # 使用独立的NFO生成器
@@ -290,51 +448,53 @@ class CourseBatchTab(ttk.Frame):
                 
         except Exception as e:
             print(f"为语言版本生成NFO时出错: {e}")
+            self.batch_nfo_generator.pool.record_failure()
     
     def _build_chapters_for_language_directory(self, language_path: Path):
         """为语言目录构建章节信息"""
         try:
-            from ..core.scanner import Chapter, VideoFile
+            # 整个语言目录只列出一次，后续检测与构建都基于内存快照
+            node = DirNode.of(language_path)
             
             # 检测目录结构类型
-            structure_type = self._detect_structure_type(language_path)
+            structure_type = self._detect_structure_type(node)
             if structure_type == 0:
                 return []
             
             # 获取所有视频文件并排序
-            all_videos = self._get_video_files_sorted(language_path)
+            all_videos = self._get_video_files_sorted(node)
             if not all_videos:
                 return []
             
             # 根据结构类型组织章节
-            chapters = self._scan_chapters(language_path, structure_type, all_videos)
+            chapters = self._scan_chapters(node, structure_type, all_videos)
             return chapters
             
         except Exception as e:
             print(f"构建语言目录章节信息时出错: {e}")
             return []
     
-    def _detect_structure_type(self, path: Path) -> int:
+    def _detect_structure_type(self, path) -> int:
         """检测目录结构类型"""
+        node = DirNode.of(path)
         # 检查是否为一级结构（直接包含视频）
-        has_videos = any(self._is_video_file(f) for f in path.iterdir())
+        has_videos = any(self._is_video_name(f) for f in node.files)
         if has_videos:
             return 1
             
         # 检查二级结构
-        for item in path.iterdir():
-            if item.is_dir():
-                # 跳过再次出现的语言目录
-                if item.name in self.language_dir_names:
-                    continue
-                # 如果章节目录下有子目录（且不是语言目录），则为三级结构
-                has_subdirs = any(f.is_dir() and f.name not in self.language_dir_names for f in item.iterdir())
-                if has_subdirs:
-                    return 3
-                # 如果章节目录下直接有视频（排除语言目录中的），则为二级结构
-                has_videos = any(self._is_video_file(f) for f in item.iterdir())
-                if has_videos:
-                    return 2
+        for item in node.dirs:
+            # 跳过再次出现的语言目录
+            if item.name in self.language_dir_names:
+                continue
+            # 如果章节目录下有子目录（且不是语言目录），则为三级结构
+            has_subdirs = any(d.name not in self.language_dir_names for d in item.dirs)
+            if has_subdirs:
+                return 3
+            # 如果章节目录下直接有视频（排除语言目录中的），则为二级结构
+            has_videos = any(self._is_video_name(f) for f in item.files)
+            if has_videos:
+                return 2
         
         return 0
     
@@ -343,45 +503,24 @@ class CourseBatchTab(ttk.Frame):
         video_extensions = ['.mp4', '.mkv', '.avi']
         return path.suffix.lower() in video_extensions
     
-    def _get_video_files_sorted(self, path: Path):
+    def _is_video_name(self, name: str) -> bool:
+        """根据文件名判断是否为视频文件"""
+        video_extensions = ['.mp4', '.mkv', '.avi']
+        return os.path.splitext(name)[1].lower() in video_extensions
+    
+    def _get_video_files_sorted(self, path):
         """获取目录下所有视频文件并排序"""
-        from ..core.scanner import VideoFile
-        import re
-        
+        node = DirNode.of(path)
+        path = node.path
+        table = VideoTable()
         video_files = []
-        for file in path.rglob("*"):
-            if self._is_video_file(file):
-                # 如果视频位于更深层嵌套的语言目录中，则跳过
-                if self._is_under_nested_language_dir(file.parent, path):
-                    continue
-                video_files.append(VideoFile(
-                    path=file,
-                    name=file.stem,
-                    episode_number=1  # 临时值，稍后更新
-                ))
-        
-        # 按最顶层目录名称中的数字和文件名中的数字排序
-        def sort_key(video: VideoFile) -> tuple:
-            # 获取视频文件的所有父目录路径（从下往上）
-            parents = list(video.path.parents)
-            # 找到最顶层目录（在path目录下的第一级目录）
-            top_level_dir = None
-            for parent in reversed(parents):
-                if parent.parent == path:
-                    top_level_dir = parent
-                    break
-            
-            # 获取最顶层目录的序号（如果存在）
-            top_dir_num = self._extract_number(top_level_dir.name) if top_level_dir else 999999
-            
-            # 获取文件名中的数字
-            file_num = self._extract_number(video.name)
-            
-            # 返回排序元组：(最顶层目录数字, 文件名数字, 完整文件名)
-            return (top_dir_num, file_num, video.name)
+        # 更深层嵌套的语言目录整棵跳过
+        for parent, name in node.iter_files(prune=lambda d: d.name in self.language_dir_names):
+            if self._is_video_name(name):
+                video_files.append(table.add(parent.path, name, episode_number=1))  # 集数为临时值，稍后更新
         
-        # 按复合键排序
-        video_files.sort(key=sort_key)
+        # 按最顶层目录名称中的数字和文件名中的数字排序：(最顶层目录数字, 文件名数字, 完整文件名)
+        video_files.sort(key=top_dir_key(path))
         
         # 更新全局集数
         for i, video in enumerate(video_files, 1):
@@ -391,88 +530,12 @@ class CourseBatchTab(ttk.Frame):
     
     def _extract_number(self, filename: str) -> int:
         """从文件名中提取数字"""
-        import re
-        # 匹配文件名开头的数字部分
-        match = re.match(r'^(\d+)(?:\s*-\s*|\s+|\-)?', filename)
-        if match:
-            return int(match.group(1))
-        return 999999
+        return leading_number(filename)
     
-    def _scan_chapters(self, path: Path, structure_type: int, all_videos):
-        """扫描章节"""
-        from ..core.scanner import Chapter
-        
-        if structure_type == 1:
-            # 一级结构：直接返回视频列表
-            videos = [v for v in all_videos if v.path.parent == path]
-            return [Chapter(name="", videos=videos)]
-            
-        elif structure_type == 2:
-            # 二级结构：每个目录是一个章节
-            chapters = []
-            for chapter_dir in sorted(path.iterdir()):
-                if not chapter_dir.is_dir():
-                    continue
-                # 跳过内部再次出现的语言目录
-                if chapter_dir.name in self.language_dir_names:
-                    continue
-                    
-                # 获取当前章节的视频
-                videos = [v for v in all_videos if v.path.parent == chapter_dir]
-                if videos:
-                    chapters.append(Chapter(
-                        name=chapter_dir.name,
-                        videos=videos
-                    ))
-            return chapters
-            
-        else:  # structure_type == 3
-            # 三级结构：大章节下包含小章节
-            chapters = []
-            for major_chapter in sorted(path.iterdir()):
-                if not major_chapter.is_dir():
-                    continue
-                # 跳过内部再次出现的语言目录
-                if major_chapter.name in self.language_dir_names:
-                    continue
-                    
-                sub_chapters = []
-                for minor_chapter in sorted(major_chapter.iterdir()):
-                    if not minor_chapter.is_dir():
-                        continue
-                    # 跳过内部再次出现的语言目录
-                    if minor_chapter.name in self.language_dir_names:
-                        continue
-                        
-                    # 获取当前小章节的视频
-                    videos = [v for v in all_videos if v.path.parent == minor_chapter]
-                    if videos:
-                        sub_chapters.append(Chapter(
-                            name=minor_chapter.name,
-                            videos=videos
-                        ))
-                        
-                if sub_chapters:
-                    chapters.append(Chapter(
-                        name=major_chapter.name,
-                        videos=[],
-                        sub_chapters=sub_chapters
-                    ))
-            return chapters
+    def _scan_chapters(self, path, structure_type: int, all_videos):
+        """扫描章节（跳过内部再次出现的语言目录）"""
+        return ChapterBuilder(all_videos, self.language_dir_names).build(path, structure_type)
 
-    def _is_under_nested_language_dir(self, current_dir: Path, language_root: Path) -> bool:
-        """判断目录是否位于语言根目录之下的再次出现的语言目录中（应忽略）
-        规则：如果从 current_dir 向上直到 language_root（不含）之间存在名称为语言目录名的任一目录，则认为是嵌套的语言目录。
-        """
-        try:
-            while current_dir != language_root and language_root in current_dir.parents:
-                if current_dir.name in self.language_dir_names:
-                    return True
-                current_dir = current_dir.parent
-        except Exception:
-            return False
-        return False
-        
     def _clear_results(self):
         """清空结果"""
         self._reset_state()
@@ -512,15 +575,21 @@ class CourseBatchTab(ttk.Frame):
                     self.progress_var.set(progress)
                     self.status_var.set(f"正在生成NFO: {processed}/{total}")
                     
+                elif action == "pipeline":
+                    self.status_var.set(f"正在扫描并生成NFO：{data}")
+                    
                 elif action == "generate_complete":
-                    self.status_var.set(f"NFO生成完成，共处理 {data} 个课程")
+                    processed, stats, signatures = data
+                    self.status_var.set(f"NFO生成完成，共处理 {processed} 个课程（{stats}；{signatures}）")
                     self.progress_var.set(100)
-                    self.generate_nfo_btn.configure(state='normal')
+                    self.generate_nfo_btn.configure(state='normal' if self.courses else 'disabled')
+                    self._enable_scan_buttons()
                     
                 elif action == "error":
                     messagebox.showerror("错误", f"操作出错: {data}")
                     self.status_var.set("操作出错")
                     self._reset_state()
+                    self._enable_scan_buttons()
                     
         except Exception as e:
             print(f"更新进度时出错: {e}")
@@ -530,6 +599,12 @@ class CourseBatchTab(ttk.Frame):
            (self.generate_thread and self.generate_thread.is_alive()):
             self.after(100, self._update_progress)
             
+    def _enable_scan_buttons(self):
+        """扫描或生成结束后恢复扫描按钮"""
+        if self.path_var.get():
+            self.scan_btn.configure(state='normal')
+            self.pipeline_btn.configure(state='normal')
+
     def _display_courses(self):
         """显示课程列表"""
         self._clear_courses_tree()
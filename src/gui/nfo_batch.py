@@ -4,9 +4,14 @@ NFO批量管理标签页
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
 from pathlib import Path
+from typing import Dict, List, Optional
 import threading
 from queue import Queue
-import time
+from ..core.nfo_journal import last_undoable_run, undo_run
+from ..core.nfo_cleanup import (
+    ALL, FILTER_LABELS, ORPHAN_LABELS, OrphanNFO, PathSpool, ProgressThrottle, delete_files, find_orphans,
+    iter_nfo_files
+)
 
 class NFOBatchTab(ttk.Frame):
     """NFO批量管理标签页"""
@@ -15,7 +20,13 @@ class NFOBatchTab(ttk.Frame):
         super().__init__(parent)
         self.search_thread = None
         self.delete_thread = None
-        self.nfo_files = []
+        self.undo_thread = None
+        self.orphan_thread = None
+        self.orphans: Dict[str, OrphanNFO] = {}  # 列表项 id -> 孤立NFO
+        self.nfo_count = 0  # 搜索到的NFO数量
+        self.nfo_spool: Optional[PathSpool] = None  # 搜索到的NFO（存放在临时文件中），删除时只删除这些文件
+        self.search_root: Optional[Path] = None
+        self.search_filter = ALL
         self.progress_queue = Queue()
         self._create_widgets()
         self._setup_layout()
@@ -28,6 +39,17 @@ class NFOBatchTab(ttk.Frame):
         self.path_entry = ttk.Entry(self.path_frame, textvariable=self.path_var, width=50)
         self.browse_btn = ttk.Button(self.path_frame, text="选择目录", command=self._browse_directory)
         
+        # 删除条件
+        self.filter_var = tk.StringVar(value=FILTER_LABELS[ALL])
+        self.filter_combo = ttk.Combobox(
+            self.path_frame,
+            textvariable=self.filter_var,
+            values=list(FILTER_LABELS.values()),
+            state='readonly',
+            width=16
+        )
+        self.filter_combo.bind('<<ComboboxSelected>>', lambda e: self._start_search())
+        
         # 进度显示区域
         self.progress_frame = ttk.Frame(self)
         self.status_var = tk.StringVar(value="未开始搜索")
@@ -50,6 +72,39 @@ class NFOBatchTab(ttk.Frame):
             command=self._delete_files,
             state='disabled'
         )
+        self.undo_btn = ttk.Button(
+            self.button_frame,
+            text="撤销上次生成",
+            command=self._undo_last_run
+        )
+        
+        # 孤立NFO（视频已改名或删除后遗留的NFO）
+        self.orphan_frame = ttk.LabelFrame(self, text="孤立NFO", padding=5)
+        self.orphan_button_frame = ttk.Frame(self.orphan_frame)
+        self.find_orphans_btn = ttk.Button(
+            self.orphan_button_frame,
+            text="查找孤立NFO",
+            command=self._find_orphans
+        )
+        self.delete_selected_orphans_btn = ttk.Button(
+            self.orphan_button_frame,
+            text="删除选中",
+            command=lambda: self._delete_orphans(list(self.orphan_tree.selection())),
+            state='disabled'
+        )
+        self.delete_all_orphans_btn = ttk.Button(
+            self.orphan_button_frame,
+            text="全部删除",
+            command=lambda: self._delete_orphans(list(self.orphans)),
+            state='disabled'
+        )
+        self.orphan_tree = ttk.Treeview(self.orphan_frame, columns=('kind', 'path'), show='headings', height=12)
+        self.orphan_tree.heading('kind', text='类型')
+        self.orphan_tree.heading('path', text='路径')
+        self.orphan_tree.column('kind', width=180)
+        self.orphan_tree.column('path', width=500)
+        self.orphan_scroll = ttk.Scrollbar(self.orphan_frame, orient='vertical', command=self.orphan_tree.yview)
+        self.orphan_tree.configure(yscrollcommand=self.orphan_scroll.set)
         
     def _setup_layout(self):
         """设置布局"""
@@ -57,6 +112,7 @@ class NFOBatchTab(ttk.Frame):
         self.path_frame.pack(fill='x', padx=5, pady=5)
         self.path_entry.pack(side='left', expand=True, fill='x', padx=(0, 5))
         self.browse_btn.pack(side='left')
+        self.filter_combo.pack(side='left', padx=(5, 0))
         
         # 进度显示区域
         self.progress_frame.pack(fill='x', padx=5, pady=5)
@@ -66,6 +122,16 @@ class NFOBatchTab(ttk.Frame):
         # 操作按钮
         self.button_frame.pack(fill='x', padx=5, pady=5)
         self.delete_btn.pack(side='left')
+        self.undo_btn.pack(side='left', padx=(5, 0))
+        
+        # 孤立NFO
+        self.orphan_frame.pack(fill='both', expand=True, padx=5, pady=5)
+        self.orphan_button_frame.pack(fill='x', pady=(0, 5))
+        self.find_orphans_btn.pack(side='left')
+        self.delete_selected_orphans_btn.pack(side='left', padx=(5, 0))
+        self.delete_all_orphans_btn.pack(side='left', padx=(5, 0))
+        self.orphan_tree.pack(side='left', fill='both', expand=True)
+        self.orphan_scroll.pack(side='right', fill='y')
         
     def _browse_directory(self):
         """选择目录"""
@@ -76,15 +142,19 @@ class NFOBatchTab(ttk.Frame):
             
     def _start_search(self):
         """开始搜索NFO文件"""
-        if self.search_thread and self.search_thread.is_alive():
+        if self._busy():
+            return
+        if not self.path_var.get():
             return
             
         self._reset_state()
         self.status_var.set("正在搜索...")
+        self.search_root = Path(self.path_var.get())
+        self.search_filter = self._selected_filter()
         
         self.search_thread = threading.Thread(
             target=self._search_nfo_files,
-            args=(Path(self.path_var.get()),)
+            args=(self.search_root, self.search_filter)
         )
         self.search_thread.daemon = True
         self.search_thread.start()
@@ -92,9 +162,20 @@ class NFOBatchTab(ttk.Frame):
         # 启动进度更新
         self.after(100, self._update_progress)
         
+    def _selected_filter(self) -> str:
+        """当前选择的删除条件"""
+        label = self.filter_var.get()
+        for key, value in FILTER_LABELS.items():
+            if value == label:
+                return key
+        return ALL
+        
     def _reset_state(self):
         """重置所有状态"""
-        self.nfo_files.clear()
+        self.nfo_count = 0
+        spool, self.nfo_spool = self.nfo_spool, None
+        if spool is not None:
+            spool.close()
         self.progress_var.set(0)
         self.delete_btn.configure(state='disabled')
         # 清空进度队列
@@ -104,27 +185,31 @@ class NFOBatchTab(ttk.Frame):
             except:
                 pass
         
-    def _search_nfo_files(self, directory: Path):
-        """搜索NFO文件"""
+    def _search_nfo_files(self, directory: Path, nfo_filter: str):
+        """搜索NFO文件（结果写入临时文件，进度合并后更新）"""
+        spool = PathSpool()
         try:
-            for file in directory.rglob("*.nfo"):
-                self.nfo_files.append(file)
-                # 更新状态
-                self.progress_queue.put(("search", len(self.nfo_files)))
+            throttle = ProgressThrottle(lambda n: self.progress_queue.put(("search", n)))
+            for path in iter_nfo_files(directory, nfo_filter):
+                spool.add(path)
+                throttle.update(spool.count)
                 
             # 搜索完成
-            self.progress_queue.put(("search_complete", len(self.nfo_files)))
+            self.nfo_spool = spool
+            self.nfo_count = spool.count
+            self.progress_queue.put(("search_complete", spool.count))
         except Exception as e:
+            spool.close()
             self.progress_queue.put(("error", str(e)))
             
     def _delete_files(self):
         """删除NFO文件"""
-        if not self.nfo_files:
+        if not self.nfo_count or self.nfo_spool is None:
             return
             
         if not messagebox.askyesno(
             "确认删除",
-            f"确定要删除找到的 {len(self.nfo_files)} 个NFO文件吗？"
+            f"确定要删除找到的 {self.nfo_count} 个NFO文件（{FILTER_LABELS[self.search_filter]}）吗？"
         ):
             return
             
@@ -132,12 +217,10 @@ class NFOBatchTab(ttk.Frame):
         self.delete_btn.configure(state='disabled')
         self.status_var.set("正在删除...")
         
-        # 创建文件列表的副本
-        files_to_delete = self.nfo_files[:]
-        
+        spool, self.nfo_spool = self.nfo_spool, None
         self.delete_thread = threading.Thread(
             target=self._perform_delete,
-            args=(files_to_delete,)
+            args=(spool, self.nfo_count)
         )
         self.delete_thread.daemon = True
         self.delete_thread.start()
@@ -145,25 +228,129 @@ class NFOBatchTab(ttk.Frame):
         # 启动进度更新
         self.after(100, self._update_progress)
         
-    def _perform_delete(self, files_to_delete):
-        """执行删除操作"""
-        total = len(files_to_delete)
-        deleted = 0
+    def _perform_delete(self, spool: PathSpool, total: int):
+        """执行删除操作：按批并发删除搜索时找到并经确认的文件"""
+        def on_progress(deleted, failed):
+            progress = min(deleted / total * 100, 100)
+            self.progress_queue.put(("delete", (deleted, total, progress)))
+            
+        try:
+            deleted, failed = delete_files(spool, progress=on_progress)
+            # 删除完成
+            self.progress_queue.put(("delete_complete", deleted))
+        except Exception as e:
+            self.progress_queue.put(("error", str(e)))
+        finally:
+            spool.close()
         
-        for file in files_to_delete:
-            try:
-                file.unlink()
-                deleted += 1
-                # 更新进度
-                progress = (deleted / total) * 100
-                self.progress_queue.put(("delete", (deleted, total, progress)))
-                time.sleep(0.01)  # 避免界面卡顿
-            except Exception as e:
-                print(f"删除文件 {file} 时出错: {e}")
-                
-        # 删除完成
-        self.progress_queue.put(("delete_complete", deleted))
+    def _undo_last_run(self):
+        """按最近一次尚未撤销的生成运行的撤销日志恢复NFO文件"""
+        if self.undo_thread and self.undo_thread.is_alive():
+            return
+        journal = last_undoable_run()
+        if journal is None:
+            messagebox.showinfo("提示", "没有可撤销的生成运行")
+            return
+        if not messagebox.askyesno(
+            "确认撤销",
+            f"将删除最近一次生成运行新建的NFO，并恢复被覆盖NFO的原内容：\n{journal}\n确定要撤销吗？"
+        ):
+            return
+
+        self.undo_btn.configure(state='disabled')
+        self.status_var.set("正在撤销...")
+        self.undo_thread = threading.Thread(target=self._perform_undo, args=(journal,))
+        self.undo_thread.daemon = True
+        self.undo_thread.start()
+        self.after(100, self._update_progress)
+
+    def _perform_undo(self, journal: Path):
+        """执行撤销操作"""
+        try:
+            self.progress_queue.put(("undo_complete", undo_run(journal)))
+        except Exception as e:
+            self.progress_queue.put(("error", str(e)))
+
+    def _busy(self) -> bool:
+        """是否有后台任务在运行"""
+        return any(thread and thread.is_alive() for thread in (
+            self.search_thread, self.delete_thread, self.undo_thread, self.orphan_thread))
+
+    def _find_orphans(self):
+        """查找孤立NFO"""
+        if not self.path_var.get() or self._busy():
+            return
+        self.orphan_tree.delete(*self.orphan_tree.get_children())
+        self.orphans.clear()
+        self.delete_selected_orphans_btn.configure(state='disabled')
+        self.delete_all_orphans_btn.configure(state='disabled')
+        self.status_var.set("正在查找孤立NFO...")
+        self.progress_var.set(0)
+        
+        self.orphan_thread = threading.Thread(
+            target=self._search_orphans,
+            args=(Path(self.path_var.get()),)
+        )
+        self.orphan_thread.daemon = True
+        self.orphan_thread.start()
+        self.after(100, self._update_progress)
+
+    def _search_orphans(self, directory: Path):
+        """在一次遍历中查找孤立NFO"""
+        try:
+            orphans = find_orphans(
+                directory,
+                progress=lambda dirs, found: self.progress_queue.put(("orphan_search", (dirs, found)))
+            )
+            self.progress_queue.put(("orphan_search_complete", orphans))
+        except Exception as e:
+            self.progress_queue.put(("error", str(e)))
+
+    def _show_orphans(self, orphans: List[OrphanNFO]):
+        """在列表中显示孤立NFO供确认"""
+        for orphan in orphans:
+            item = self.orphan_tree.insert('', tk.END, values=(ORPHAN_LABELS[orphan.kind], str(orphan.path)))
+            self.orphans[item] = orphan
+        state = 'normal' if orphans else 'disabled'
+        self.delete_selected_orphans_btn.configure(state=state)
+        self.delete_all_orphans_btn.configure(state=state)
+        self.status_var.set(f"查找完成，共找到 {len(orphans)} 个孤立NFO")
+        self.progress_var.set(100)
+
+    def _delete_orphans(self, items: List[str]):
+        """删除列表中的孤立NFO"""
+        items = [item for item in items if item in self.orphans]
+        if not items or self._busy():
+            return
+        if not messagebox.askyesno("确认删除", f"确定要删除 {len(items)} 个孤立NFO文件吗？"):
+            return
+            
+        self.delete_selected_orphans_btn.configure(state='disabled')
+        self.delete_all_orphans_btn.configure(state='disabled')
+        self.status_var.set("正在删除...")
+        self.progress_var.set(0)
+        paths = [self.orphans[item].path for item in items]
         
+        self.orphan_thread = threading.Thread(target=self._perform_orphan_delete, args=(items, paths))
+        self.orphan_thread.daemon = True
+        self.orphan_thread.start()
+        self.after(100, self._update_progress)
+
+    def _perform_orphan_delete(self, items: List[str], paths: List[Path]):
+        """执行孤立NFO删除"""
+        total = len(paths)
+
+        def on_progress(deleted, failed):
+            self.progress_queue.put(("delete", (deleted, total, (deleted + failed) / total * 100)))
+
+        try:
+            deleted, failed = delete_files(paths, progress=on_progress)
+            # 删除失败的文件保留在列表中
+            removed = [item for item, path in zip(items, paths) if not path.exists()]
+            self.progress_queue.put(("orphan_delete_complete", (deleted, removed)))
+        except Exception as e:
+            self.progress_queue.put(("error", str(e)))
+
     def _update_progress(self):
         """更新进度显示"""
         try:
@@ -183,16 +370,35 @@ class NFOBatchTab(ttk.Frame):
                 elif action == "delete_complete":
                     self.status_var.set(f"删除完成，共删除 {data} 个文件")
                     self.progress_var.set(100)
-                    self.nfo_files.clear()
+                    self.nfo_count = 0
                     self.delete_btn.configure(state='disabled')
+                elif action == "orphan_search":
+                    dirs, found = data
+                    self.status_var.set(f"已检查 {dirs} 个目录，找到 {found} 个孤立NFO")
+                elif action == "orphan_search_complete":
+                    self._show_orphans(data)
+                elif action == "orphan_delete_complete":
+                    deleted, removed = data
+                    for item in removed:
+                        self.orphans.pop(item, None)
+                    self.orphan_tree.delete(*removed)
+                    state = 'normal' if self.orphans else 'disabled'
+                    self.delete_selected_orphans_btn.configure(state=state)
+                    self.delete_all_orphans_btn.configure(state=state)
+                    self.status_var.set(f"删除完成，共删除 {deleted} 个孤立NFO")
+                    self.progress_var.set(100)
+                elif action == "undo_complete":
+                    hint = "，有失败的文件，可再次撤销" if data.failed else ""
+                    self.status_var.set(f"撤销完成：{data}{hint}")
+                    self.undo_btn.configure(state='normal')
                 elif action == "error":
                     messagebox.showerror("错误", f"操作出错: {data}")
                     self.status_var.set("操作出错")
+                    self.undo_btn.configure(state='normal')
                     self._reset_state()
         except Exception as e:
             print(f"更新进度时出错: {e}")
             
         # 如果还有线程在运行，继续更新
-        if (self.search_thread and self.search_thread.is_alive()) or \
-           (self.delete_thread and self.delete_thread.is_alive()):
+        if self._busy() or not self.progress_queue.empty():
             self.after(100, self._update_progress) 
\ No newline at end of file
@@ -4,13 +4,18 @@ NFO编辑标签页模块
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
 from pathlib import Path
-import xml.etree.ElementTree as ET
+import threading
+from queue import Queue
 from PIL import Image, ImageTk
 from typing import Set, Optional, Dict, List
 from ..utils.poster import PosterManager
 from ..core.tags import TagManager
 from ..core.nfo import NFOGenerator
-from ..core.scanner import DirectoryScanner
+from ..core.nfo_reader import nfo_reader
+from ..core.nfo_patch import CourseEdit, save_course_edit, save_course_edits
+from ..core.scanner import Course, DirectoryScanner
+from ..core.scan_index import ScanIndex
+from ..core.library_snapshot import load_library, save_library
 from ..core.course_types import CourseTypeManager
 from .dialogs import TagDialog, CourseTypeDialog
 
@@ -24,14 +29,20 @@ class NFOEditTab(ttk.Frame):
         self.type_manager = CourseTypeManager()
         self.nfo_generator = NFOGenerator()
         self.scanner = DirectoryScanner()
+        # 增量扫描：未变化的目录复用索引中的列表
+        self.scanner.scan_index = ScanIndex.from_config()
         
         self.courses: Dict[str, Path] = {}  # 课程路径字典
+        self.course_items: Dict[str, str] = {}  # 课程名 -> 列表项 id
+        self.save_thread: Optional[threading.Thread] = None
+        self.save_queue = Queue()  # 批量保存进度
         self.current_course: Optional[Path] = None
         self.current_tags = set()
         self.current_types = set()
         self.thumbnail_cache = {}  # 缩略图缓存
         
         self.init_ui()
+        self._load_snapshot()
     
     def init_ui(self):
         """初始化界面"""
@@ -122,7 +133,8 @@ class NFOEditTab(ttk.Frame):
         button_frame.pack(fill='x', pady=5)
         
         ttk.Button(button_frame, text="保存更改", command=self._save_changes).pack(side='right')
-        ttk.Button(button_frame, text="批量保存", command=self._batch_save).pack(side='right', padx=5)
+        self.batch_save_btn = ttk.Button(button_frame, text="批量保存", command=self._batch_save)
+        self.batch_save_btn.pack(side='right', padx=5)
         
         # 初始化状态
         self._set_ui_enabled(False)
@@ -147,26 +159,41 @@ class NFOEditTab(ttk.Frame):
             self._scan_directory(Path(directory))
             self._set_ui_enabled(True)
     
+    def _load_snapshot(self):
+        """显示上次扫描保存的课程列表（见 library_snapshot），重新选择目录即重新扫描"""
+        snapshot = load_library("nfo_edit")
+        if snapshot is None or not snapshot.courses:
+            return
+        self.dir_path.set(f"{snapshot.describe()}（重新选择目录可更新）")
+        self._show_courses(snapshot.courses)
+        self._set_ui_enabled(True)
+    
     def _scan_directory(self, root_path: Path):
         """扫描目录"""
+        courses = self.scanner.scan_directory(root_path)
+        # 保存快照，下次启动直接加载
+        save_library("nfo_edit", root_path, courses)
+        self._show_courses(courses)
+    
+    def _show_courses(self, courses: List[Course]):
+        """显示课程列表"""
         # 清空课程列表和缩略图缓存
         for item in self.course_tree.get_children():
             self.course_tree.delete(item)
         self.courses.clear()
+        self.course_items.clear()
         self.thumbnail_cache.clear()
         
-        # 扫描课程
-        courses = self.scanner.scan_directory(root_path)
+        # 并发读取全部课程的NFO（未变化的文件直接使用缓存）
+        nfo_data_by_path = nfo_reader.read_many(course.path / "tvshow.nfo" for course in courses)
         
         # 添加到列表
         for course in courses:
             # 读取NFO文件
-            nfo_path = course.path / "tvshow.nfo"
+            nfo_data = nfo_data_by_path[course.path / "tvshow.nfo"]
             course_types = set()
-            if nfo_path.exists():
-                nfo_data = self.nfo_generator.read_course_nfo(nfo_path)
-                if nfo_data and nfo_data.course_types:
-                    course_types = nfo_data.course_types
+            if nfo_data and nfo_data.course_types:
+                course_types = nfo_data.course_types
             
             # 获取海报缩略图
             poster_path = self.poster_manager.get_poster_path(course.path)
@@ -180,6 +207,7 @@ class NFOEditTab(ttk.Frame):
             self.course_tree.item(item, image=thumbnail)  # 设置图片
             
             self.courses[course.name] = course.path
+            self.course_items[course.name] = item
     
     def _on_course_select(self, event):
         """课程选择事件处理"""
@@ -322,51 +350,32 @@ class NFOEditTab(ttk.Frame):
             if self.type_listbox.get(i) in types:
                 self.type_listbox.selection_set(i)
     
+    def _current_edit(self) -> CourseEdit:
+        """界面上的描述、类型与标签"""
+        return CourseEdit(
+            plot=self.plot_text.get('1.0', 'end-1c'),
+            course_types=self._get_selected_types(),
+            tags=self.current_tags.copy(),
+        )
+
     def _save_changes(self):
         """保存更改"""
         if not self.current_course:
             return
             
-        # 保存标签
-        self.tag_manager.save_tags(self.current_course, self.current_tags)
-        
-        # 更新NFO文件
-        nfo_path = self.current_course / "tvshow.nfo"
+        edit = self._current_edit()
+        writer = self.nfo_generator.writer
         try:
-            if nfo_path.exists():
-                tree = ET.parse(nfo_path)
-                root = tree.getroot()
-            else:
-                root = ET.Element("tvshow")
-                
-            # 更新描述
-            plot = root.find("plot")
-            if plot is None:
-                plot = ET.SubElement(root, "plot")
-            plot.text = self.plot_text.get('1.0', 'end-1c')
-            
-            # 更新类型
-            for type_elem in root.findall("coursetype"):
-                root.remove(type_elem)
-            for type_name in sorted(self._get_selected_types()):
-                type_elem = ET.SubElement(root, "coursetype")
-                type_elem.text = type_name
-            
-            # 更新标签
-            for genre in root.findall("genre"):
-                root.remove(genre)
-            for tag in sorted(self.current_tags):
-                genre = ET.SubElement(root, "genre")
-                genre.text = tag
-            
-            # 保存文件
-            xml_str = ET.tostring(root, encoding='unicode')
-            with open(nfo_path, 'w', encoding='utf-8') as f:
-                f.write(xml_str)
+            # 保存标签与NFO文件（只修改有变化的元素）
+            writer.begin_run("NFO编辑")
+            try:
+                save_course_edit(self.current_course, edit, writer, self.tag_manager)
+            finally:
+                writer.finish()
                 
             # 更新课程列表显示
             for item in self.course_tree.selection():
-                self.course_tree.set(item, 'types', ', '.join(sorted(self._get_selected_types())))
+                self.course_tree.set(item, 'types', ', '.join(sorted(edit.course_types)))
                 
             messagebox.showinfo("成功", "保存成功！")
                 
@@ -374,67 +383,60 @@ class NFOEditTab(ttk.Frame):
             messagebox.showerror("错误", f"保存NFO文件时出错: {e}")
     
     def _batch_save(self):
-        """批量保存"""
+        """批量保存：在后台线程中将当前设置并发应用到所有课程"""
         if not self.courses:
             messagebox.showwarning("警告", "请先选择目录！")
             return
+        if self.save_thread and self.save_thread.is_alive():
+            return
             
         if not messagebox.askyesno("确认", "确定要将当前设置应用到所有课程吗？"):
             return
             
+        edit = self._current_edit()
+        courses = list(self.courses.items())
+        self.batch_save_btn.configure(state='disabled')
+        self.save_thread = threading.Thread(target=self._perform_batch_save, args=(courses, edit))
+        self.save_thread.daemon = True
+        self.save_thread.start()
+        self.after(100, self._update_save_progress)
+
+    def _perform_batch_save(self, courses, edit: CourseEdit):
+        """执行批量保存（后台线程）"""
+        types_label = ', '.join(sorted(edit.course_types))
+
+        def on_saved(course_name, result):
+            # 出错的课程结果为 None，不更新列表
+            if result is not None:
+                self.save_queue.put(("saved", (course_name, types_label)))
+
         try:
-            current_types = self._get_selected_types()
-            current_tags = self.current_tags.copy()
-            current_plot = self.plot_text.get('1.0', 'end-1c')
-            
-            for course_name, course_path in self.courses.items():
-                nfo_path = course_path / "tvshow.nfo"
-                if nfo_path.exists():
-                    tree = ET.parse(nfo_path)
-                    root = tree.getroot()
-                else:
-                    root = ET.Element("tvshow")
-                    title = ET.SubElement(root, "title")
-                    title.text = course_name
-                
-                # 更新描述
-                plot = root.find("plot")
-                if plot is None:
-                    plot = ET.SubElement(root, "plot")
-                plot.text = current_plot
-                
-                # 更新类型
-                for type_elem in root.findall("coursetype"):
-                    root.remove(type_elem)
-                for type_name in sorted(current_types):
-                    type_elem = ET.SubElement(root, "coursetype")
-                    type_elem.text = type_name
-                
-                # 更新标签
-                for genre in root.findall("genre"):
-                    root.remove(genre)
-                for tag in sorted(current_tags):
-                    genre = ET.SubElement(root, "genre")
-                    genre.text = tag
-                
-                # 保存文件
-                xml_str = ET.tostring(root, encoding='unicode')
-                with open(nfo_path, 'w', encoding='utf-8') as f:
-                    f.write(xml_str)
-                    
-                # 保存标签
-                self.tag_manager.save_tags(course_path, current_tags)
-                
-                # 更新课程列表显示
-                for item in self.course_tree.get_children():
-                    if self.course_tree.item(item)['text'] == course_name:
-                        self.course_tree.set(item, 'types', ', '.join(sorted(current_types)))
-                        break
-            
-            messagebox.showinfo("成功", "批量保存成功！")
-            
+            stats = save_course_edits(courses, edit, self.nfo_generator.writer, self.tag_manager,
+                                      callback=on_saved)
+            self.save_queue.put(("complete", stats))
         except Exception as e:
-            messagebox.showerror("错误", f"批量保存时出错: {e}")
+            self.save_queue.put(("error", str(e)))
+
+    def _update_save_progress(self):
+        """在主线程中更新批量保存进度"""
+        done = False
+        while not self.save_queue.empty():
+            action, data = self.save_queue.get_nowait()
+            if action == "saved":
+                course_name, types_label = data
+                item = self.course_items.get(course_name)
+                if item is not None:
+                    self.course_tree.set(item, 'types', types_label)
+            elif action == "complete":
+                done = True
+                messagebox.showinfo("成功", f"批量保存成功！{data}")
+            elif action == "error":
+                done = True
+                messagebox.showerror("错误", f"批量保存时出错: {data}")
+        if done:
+            self.batch_save_btn.configure(state='normal')
+        else:
+            self.after(100, self._update_save_progress)
 
     def _create_placeholder_image(self):
         """创建占位图标"""
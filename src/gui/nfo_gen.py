@@ -6,7 +6,8 @@ from tkinter import ttk, filedialog, messagebox
 from pathlib import Path
 import threading
 from ..core.scanner import DirectoryScanner
-from ..core.tags import TagManager
+from ..core.tags import TagResolver
+from ..core.scan_pipeline import run_pipeline
 from ..core.nfo import NFOGenerator
 from ..utils.config import config
 
@@ -92,6 +93,17 @@ class NFOGenTab(ttk.Frame):
         )
         overwrite_check.pack(anchor='w', pady=5)
         
+        # 增量更新集数
+        self.incremental_var = tk.BooleanVar(value=config.get('nfo_incremental'))
+        incremental_check = ttk.Checkbutton(
+            config_content,
+            text="增量更新（只重写集数或标题变化的NFO）",
+            variable=self.incremental_var,
+            command=self._on_incremental_changed,
+            style='Switch.TCheckbutton'  # iOS风格开关
+        )
+        incremental_check.pack(anchor='w', pady=5)
+        
         # 是否检测.nomedia文件
         self.check_nomedia_var = tk.BooleanVar(value=config.get('check_nomedia'))
         nomedia_check = ttk.Checkbutton(
@@ -219,6 +231,10 @@ class NFOGenTab(ttk.Frame):
         """覆盖选项改变事件"""
         config.set('overwrite_existing', self.overwrite_var.get())
     
+    def _on_incremental_changed(self):
+        """增量更新选项改变事件"""
+        config.set('nfo_incremental', self.incremental_var.get())
+    
     def _on_check_nomedia_changed(self):
         """检测.nomedia选项改变事件"""
         config.set('check_nomedia', self.check_nomedia_var.get())
@@ -243,38 +259,32 @@ class NFOGenTab(ttk.Frame):
         thread.start()
     
     def _process_directory(self):
-        """处理目录（工作线程）"""
+        """处理目录（工作线程）：边扫描边生成，扫描到一个课程即生成一个"""
         try:
             scanner = DirectoryScanner()
-            tag_manager = TagManager()
+            tag_resolver = TagResolver()
             nfo_generator = NFOGenerator()
             
-            # 扫描课程
             self._append_log("开始扫描目录...")
-            courses = scanner.scan_directory(Path(self.dir_path.get()))
-            
-            if not courses:
-                self._append_log("错误: 未找到符合条件的课程目录")
-                self._on_complete()
-                return
-            
-            total = len(courses)
-            self._append_log(f"找到 {total} 个课程")
             
-            # 处理每个课程
-            for i, course in enumerate(courses, 1):
-                self._append_log(f"正在处理课程 ({i}/{total}): {course.name}")
-                
-                # 收集标签
-                tags = tag_manager.collect_tags(course.path)
-                
+            def generate(course):
+                self._append_log(f"正在处理课程: {course.name}")
+                # 收集标签（上级目录的标签按目录缓存，每个目录只读取一次）
+                tags = tag_resolver.resolve(course.path)
                 # 生成NFO
                 nfo_generator.generate_course_nfo(course, tags)
-                
-                # 更新进度
-                self.progress_var.set(i * 100 / total)
             
-            self._append_log("NFO生成完成！")
+            def progress(stats):
+                # 总数在扫描结束前未知，按已扫描到的课程数估算
+                self.progress_var.set(stats.processed * 100 / max(stats.found, 1))
+            
+            stats = run_pipeline(scanner.iter_courses(Path(self.dir_path.get())), generate, progress=progress)
+            
+            if not stats.found:
+                self._append_log("错误: 未找到符合条件的课程目录")
+                return
+            
+            self._append_log(f"NFO生成完成！{stats}")
             
         except Exception as e:
             self._append_log(f"错误: {str(e)}")
@@ -1,7 +1,6 @@
 """
 2层嵌套子目录标签页模块
 """
-import re
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
 from pathlib import Path
@@ -12,6 +11,8 @@ from xml.dom import minidom
 from ..core.scanner import DirectoryScanner
 from ..core.tags import TagManager
 from ..core.nfo import NFOGenerator
+from ..core.natural_sort import chapter_number
+from ..core.nomedia_index import NoMediaIndex
 from ..utils.config import config
 
 class Type4DirectoryScanner:
@@ -39,6 +40,9 @@ class Type4DirectoryScanner:
             self._log(f"读取章节目录失败：{e}")
             return []
             
+        # 一次遍历建立 .nomedia 索引，之后按视频所在目录直接判断
+        nomedia_index = NoMediaIndex(self.root_path) if config.get("check_nomedia", True) else None
+            
         for chapter_dir in chapter_dirs:
             if not chapter_dir.is_dir():
                 self._log(f"跳过非目录：{chapter_dir}")
@@ -66,15 +70,9 @@ class Type4DirectoryScanner:
                 
             for item in video_files:
                 # 检查是否在.nomedia目录下
-                if config.get("check_nomedia", True):
-                    nomedia_found = False
-                    for parent in item.parents:
-                        if (parent / ".nomedia").exists():
-                            self._log(f"视频在.nomedia目录下，跳过：{item}")
-                            nomedia_found = True
-                            break
-                    if nomedia_found:
-                        continue
+                if nomedia_index is not None and nomedia_index.is_suppressed(item):
+                    self._log(f"视频在.nomedia目录下，跳过：{item}")
+                    continue
                 
                 # 提取视频序号
                 video_num = self._extract_number(item.name)
@@ -107,17 +105,8 @@ class Type4DirectoryScanner:
         2. 带点的序号：2.1、2.1.1（取第一个数字）
         3. 带空格的序号：1 - 、1. 
         """
-        # 尝试匹配开头的数字
-        match = re.search(r"^(\d+)(?:\.|、|\s|$)", name)
-        if match:
-            return int(match.group(1))
-            
-        # 尝试匹配带点的序号
-        match = re.search(r"^(\d+)\..*?(?:\.|、|\s|$)", name)
-        if match:
-            return int(match.group(1))
-            
-        return None
+        # 带点的序号同样以开头的数字为准
+        return chapter_number(name)
         
     def _log(self, message: str) -> None:
         """输出调试信息"""
@@ -224,6 +213,7 @@ class NFOType4Tab(ttk.Frame):
                 
             # 生成NFO文件
             nfo_gen = NFOGenerator()
+            nfo_gen.writer.begin_run("2层嵌套子目录")
             nfo_gen.generate_tvshow_nfo(source_path, course_title)
             
             # 为每个视频生成episode NFO
@@ -234,6 +224,7 @@ class NFOType4Tab(ttk.Frame):
                     episode_num,
                     Path(video_path).stem
                 )
+            nfo_gen.writer.finish()
                 
             messagebox.showinfo("成功", "NFO文件生成完成")
             
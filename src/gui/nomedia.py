@@ -6,6 +6,7 @@ from tkinter import ttk, filedialog, messagebox
 from pathlib import Path
 import threading
 from ..core.tags import TagManager
+from ..core.nomedia_index import NoMediaDiff, NoMediaIndex
 
 class NoMediaTab(ttk.Frame):
     """.nomedia文件管理标签页"""
@@ -27,6 +28,16 @@ class NoMediaTab(ttk.Frame):
         ttk.Label(dir_frame, textvariable=self.dir_path).pack(side='left', fill='x', expand=True)
         ttk.Button(dir_frame, text="选择目录", command=self._select_directory).pack(side='right')
         
+        # 操作选择框架
+        mode_frame = ttk.LabelFrame(self, text="批量操作", padding=5)
+        mode_frame.pack(fill='x', padx=5, pady=5)
+        
+        self.mode_var = tk.StringVar(value="add")
+        ttk.Radiobutton(mode_frame, text=f"为所有\"{self.tag_manager.original_dir_name}\"目录添加 .nomedia",
+                        variable=self.mode_var, value="add").pack(side='left', padx=5)
+        ttk.Radiobutton(mode_frame, text=f"移除所有\"{self.tag_manager.original_dir_name}\"目录的 .nomedia",
+                        variable=self.mode_var, value="remove").pack(side='left', padx=5)
+        
         # 进度条
         self.progress_var = tk.DoubleVar()
         self.progress_bar = ttk.Progressbar(
@@ -90,15 +101,17 @@ class NoMediaTab(ttk.Frame):
         """处理目录（工作线程）"""
         try:
             root_path = Path(self.dir_path.get())
+            add = self.mode_var.get() == "add"
             self._append_log("开始扫描目录...")
             
-            # 创建.nomedia文件
-            created_count = self.tag_manager.create_nomedia_files(root_path)
+            # 一次遍历建立索引（跳过已被上级 .nomedia 屏蔽的目录）
+            index = NoMediaIndex(root_path)
+            self._append_log(f"扫描完成：{len(index.visible)} 个目录，{len(index.marked)} 个目录包含 .nomedia")
+            self.progress_var.set(50)
             
-            if created_count > 0:
-                self._append_log(f"成功创建 {created_count} 个 .nomedia 文件")
-            else:
-                self._append_log("未找到需要创建 .nomedia 文件的目录")
+            # 批量添加或移除.nomedia文件
+            diff = index.apply(self.tag_manager.original_dir_name, add)
+            self._report_diff(root_path, diff, add)
             
             # 设置进度为100%
             self.progress_var.set(100)
@@ -109,6 +122,27 @@ class NoMediaTab(ttk.Frame):
         finally:
             self._on_complete()
     
+    def _report_diff(self, root_path: Path, diff: NoMediaDiff, add: bool):
+        """输出变更报告（逐行列出变更的目录，一次写入日志）"""
+        changed = diff.added if add else diff.removed
+        action = "创建" if add else "删除"
+        sign = "+" if add else "-"
+        lines = [f"{sign} {self._relative(root_path, d)}" for d in changed]
+        lines.extend(f"! {self._relative(root_path, d)}" for d in diff.failed)
+        
+        if changed:
+            lines.append(f"成功{action} {len(changed)} 个 .nomedia 文件")
+        else:
+            lines.append(f"未找到需要{action} .nomedia 文件的目录")
+        lines.append(f"无需修改 {len(diff.unchanged)} 个，失败 {len(diff.failed)} 个")
+        self._append_log("\n".join(lines))
+    
+    def _relative(self, root_path: Path, path: Path) -> str:
+        try:
+            return str(path.relative_to(root_path))
+        except ValueError:
+            return str(path)
+    
     def _set_ui_enabled(self, enabled: bool):
         """设置界面启用状态"""
         state = 'normal' if enabled else 'disabled'
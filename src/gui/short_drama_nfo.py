@@ -184,6 +184,7 @@ class ShortDramaNfoTab(ttk.Frame):
                 self.processing = False
                 return
             found_any = False
+            self.nfo_generator.writer.begin_run("短剧NFO")
             for subdir in subdirs:
                 name = subdir.name
                 short_drama_name = self._extract_short_drama_name(name)
@@ -224,6 +225,7 @@ class ShortDramaNfoTab(ttk.Frame):
                                 self._append_log(f"    第{idx}集：{video.name} -> {video.with_suffix('.nfo').name}")
                             except Exception as ve:
                                 self._append_log(f"    生成第{idx}集NFO失败: {ve}")
+                        self.nfo_generator.writer.flush()
                         self._append_log(f"  短剧NFO生成完成: {short_drama_name}")
                     except Exception as sub_e:
                         self._append_log(f"  处理短剧目录时出错: {sub_e}")
@@ -234,6 +236,7 @@ class ShortDramaNfoTab(ttk.Frame):
         except Exception as e:
             self._append_log(f"错误: {e}")
         finally:
+            self.nfo_generator.writer.finish()
             self.processing = False
 
     def _append_log(self, message):
@@ -5,10 +5,14 @@ import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
 from pathlib import Path
 import threading
+from functools import partial
 from queue import Queue
-import time
 from ..core.single_course_finder import SingleCourseFinder, SingleCourseInfo
 from ..core.single_nfo_generator import SingleNFOGenerator
+from ..core.scan_index import ScanIndex
+from ..core.course_signature import SignatureTree, generator_settings
+from ..core.scan_pipeline import run_pipeline
+from ..core.library_snapshot import load_library, save_library
 
 class SingleCourseTab(ttk.Frame):
     """Single文件课程标签页"""
@@ -16,14 +20,18 @@ class SingleCourseTab(ttk.Frame):
     def __init__(self, parent):
         super().__init__(parent)
         self.finder = SingleCourseFinder()
+        # 增量扫描：未变化的目录复用索引中的列表
+        self.finder.scan_index = ScanIndex.from_config()
         self.single_nfo_generator = SingleNFOGenerator()
         self.courses = []
         self.progress_queue = Queue()
         self.scan_thread = None
         self.generate_thread = None
+        self.from_snapshot = False  # 课程列表是否来自快照（可能已过期）
         
         self._create_widgets()
         self._setup_layout()
+        self._load_snapshot()
         
     def _create_widgets(self):
         """创建控件"""
@@ -37,6 +45,8 @@ class SingleCourseTab(ttk.Frame):
         self.genre_label = ttk.Label(self.path_frame, text="类型/Genre")
         self.genre_entry = ttk.Entry(self.path_frame, textvariable=self.genre_var, width=12)
         self.scan_btn = ttk.Button(self.path_frame, text="开始扫描", command=self._start_scan, state='disabled')
+        # 边扫描边生成：不等扫描结束，找到一个课程即生成一个
+        self.pipeline_btn = ttk.Button(self.path_frame, text="扫描并生成", command=self._start_pipeline, state='disabled')
 
         # 进度显示区域
         self.progress_frame = ttk.LabelFrame(self, text="扫描进度", padding=10)
@@ -102,6 +112,7 @@ class SingleCourseTab(ttk.Frame):
         self.path_entry.pack(side='left', expand=True, fill='x', padx=(0, 5))
         self.browse_btn.pack(side='left', padx=(0, 5))
         self.scan_btn.pack(side='left')
+        self.pipeline_btn.pack(side='left', padx=(5, 0))
         self.genre_label.pack(side='left', padx=(10, 5))
         self.genre_entry.pack(side='left')
 
@@ -131,10 +142,11 @@ class SingleCourseTab(ttk.Frame):
         if directory:
             self.path_var.set(directory)
             self.scan_btn.configure(state='normal')
+            self.pipeline_btn.configure(state='normal')
             
     def _start_scan(self):
         """开始扫描"""
-        if self.scan_thread and self.scan_thread.is_alive():
+        if self._is_busy():
             return
             
         self._reset_state()
@@ -150,9 +162,57 @@ class SingleCourseTab(ttk.Frame):
         # 启动进度更新
         self.after(100, self._update_progress)
         
+    def _start_pipeline(self):
+        """边扫描边生成NFO（找到的课程不保留在列表中，内存占用不随目录规模增长）"""
+        if self._is_busy():
+            return
+
+        if not messagebox.askyesno(
+            "确认生成",
+            "确定要扫描所选目录，并为找到的Single文件课程直接生成NFO文件吗？"
+        ):
+            return
+
+        self._apply_genre()
+        self._reset_state()
+        self.scan_btn.configure(state='disabled')
+        self.pipeline_btn.configure(state='disabled')
+        self.status_var.set("正在扫描并生成NFO...")
+
+        self.generate_thread = threading.Thread(
+            target=self._perform_pipeline,
+            args=(Path(self.path_var.get()),)
+        )
+        self.generate_thread.daemon = True
+        self.generate_thread.start()
+
+        # 启动进度更新
+        self.after(100, self._update_progress)
+
+    def _is_busy(self):
+        """是否有扫描或生成正在进行"""
+        return (self.scan_thread and self.scan_thread.is_alive()) or \
+               (self.generate_thread and self.generate_thread.is_alive())
+
+    def _load_snapshot(self):
+        """显示上次扫描保存的课程列表（见 library_snapshot）"""
+        snapshot = load_library("single_course")
+        if snapshot is None or not snapshot.courses:
+            return
+        self.courses = snapshot.courses
+        self.from_snapshot = True
+        self.path_var.set(str(snapshot.root))
+        self.scan_btn.configure(state='normal')
+        self.pipeline_btn.configure(state='normal')
+        self._display_courses()
+        self._display_statistics()
+        self.status_var.set(f"已加载 {snapshot.describe()}，共 {len(self.courses)} 个Single文件课程（重新扫描可更新）")
+        self.generate_nfo_btn.configure(state='normal')
+        
     def _reset_state(self):
         """重置所有状态"""
         self.courses.clear()
+        self.from_snapshot = False
         self.progress_var.set(0)
         self.generate_nfo_btn.configure(state='disabled')
         self._clear_courses_tree()
@@ -172,6 +232,8 @@ class SingleCourseTab(ttk.Frame):
             
             # 执行扫描
             courses = self.finder.find_single_courses(directory)
+            # 保存快照，下次启动直接加载
+            save_library("single_course", directory, courses)
             
             # 扫描完成
             self.progress_queue.put(("scan_complete", courses))
@@ -190,12 +252,7 @@ class SingleCourseTab(ttk.Frame):
         ):
             return
             
-        # 应用自定义类型（genre），默认为“课程”
-        try:
-            genre_value = (self.genre_var.get() or "").strip() or "课程"
-            self.single_nfo_generator.default_genre = genre_value
-        except Exception:
-            self.single_nfo_generator.default_genre = "课程"
+        self._apply_genre()
         
         self.progress_var.set(0)
         self.generate_nfo_btn.configure(state='disabled')
@@ -203,7 +260,7 @@ class SingleCourseTab(ttk.Frame):
         
         self.generate_thread = threading.Thread(
             target=self._perform_nfo_generation,
-            args=(self.courses[:],)
+            args=(self.courses[:], self.from_snapshot)
         )
         self.generate_thread.daemon = True
         self.generate_thread.start()
@@ -211,26 +268,95 @@ class SingleCourseTab(ttk.Frame):
         # 启动进度更新
         self.after(100, self._update_progress)
         
-    def _perform_nfo_generation(self, courses_to_process):
-        """执行NFO生成"""
+    def _apply_genre(self):
+        """应用自定义类型（genre），默认为“课程”"""
+        try:
+            genre_value = (self.genre_var.get() or "").strip() or "课程"
+            self.single_nfo_generator.default_genre = genre_value
+        except Exception:
+            self.single_nfo_generator.default_genre = "课程"
+        
+    def _perform_nfo_generation(self, courses_to_process, from_snapshot=False):
+        """执行NFO生成（from_snapshot 为 True 时有变化的课程先重新扫描）"""
         total = len(courses_to_process)
-        processed = 0
+        generator = self.single_nfo_generator
+        generator.writer.begin_run("Single文件课程")
+        finished = []
+
+        def on_course_done(course, failed):
+            # 课程的全部NFO写完后回调（可能在写入线程中，list.append 为原子操作）
+            if failed:
+                # 有写入失败的课程不保存签名，下次仍会重新生成
+                signatures.fail(course.path)
+            finished.append(True)
+            processed = len(finished)
+            self.progress_queue.put(("generate", (processed, total, processed / total * 100)))
+        
+        # 签名未变化的课程整个跳过（见 course_signature）
+        signatures = SignatureTree(scan_index=self.finder.scan_index)
+        settings = generator_settings(generator)
+        for course in courses_to_process:
+            signatures.add(course.path, settings + [course.name], video_extensions=self.finder.video_extensions)
+        signatures.compute()
         
         for course in courses_to_process:
-            try:
-                # 为Single文件课程生成NFO（单一版本）
-                self._generate_single_course_nfo(course)
-                
-                processed += 1
-                progress = (processed / total) * 100
-                self.progress_queue.put(("generate", (processed, total, progress)))
-                time.sleep(0.01)  # 避免界面卡顿
+            # 提交完一个课程的写入即可组织下一个课程，写入在写入池中并发完成
+            with generator.pool.course(partial(on_course_done, course), wait=False):
+                try:
+                    # 为Single文件课程生成NFO（单一版本）
+                    if not signatures.is_unchanged(course.path):
+                        if from_snapshot:
+                            # 快照中的章节可能已过期
+                            course = self.finder.scan_course(course.path)
+                        if course:
+                            self._generate_single_course_nfo(course)
                 
-            except Exception as e:
-                print(f"生成Single文件课程NFO时出错 {course.name}: {e}")
+                except Exception as e:
+                    print(f"生成Single文件课程NFO时出错 {course.name}: {e}")
+                    generator.pool.record_failure()
                 
+        generator.pool.wait()
+        signatures.commit()
+        generator.writer.finish()
         # 生成完成
-        self.progress_queue.put(("generate_complete", processed))
+        self.progress_queue.put(("generate_complete", (len(finished), generator.writer.stats, signatures)))
+
+    def _perform_pipeline(self, directory: Path):
+        """边扫描边生成：扫描线程找到的课程经有界队列逐个交给本线程生成"""
+        generator = self.single_nfo_generator
+        generator.writer.begin_run("Single文件课程")
+        settings = generator_settings(generator)
+        finished = []
+        # 课程逐个到达，无法先汇总目录，各课程单独比较，签名在全部写完后保存
+        signatures = SignatureTree(scan_index=self.finder.scan_index, rollup=False)
+
+        def on_course_done(course, failed):
+            if failed:
+                signatures.fail(course.path)
+            finished.append(True)
+
+        def generate(course: SingleCourseInfo):
+            signatures.add(course.path, settings + [course.name], video_extensions=self.finder.video_extensions)
+            signatures.compute()
+            if signatures.is_unchanged(course.path):
+                return
+            with generator.pool.course(partial(on_course_done, course), wait=False):
+                self._generate_single_course_nfo(course)
+
+        try:
+            try:
+                run_pipeline(
+                    self.finder.iter_single_courses(directory),
+                    generate,
+                    progress=lambda stats: self.progress_queue.put(("pipeline", str(stats)))
+                )
+            finally:
+                generator.pool.wait()
+                signatures.commit()
+                generator.writer.finish()
+            self.progress_queue.put(("generate_complete", (len(finished), generator.writer.stats, signatures)))
+        except Exception as e:
+            self.progress_queue.put(("error", str(e)))
         
     def _generate_single_course_nfo(self, course: SingleCourseInfo):
         """为Single文件课程生成NFO"""
@@ -244,6 +370,7 @@ class SingleCourseTab(ttk.Frame):
                 
         except Exception as e:
             print(f"为Single文件课程生成NFO时出错: {e}")
+            self.single_nfo_generator.pool.record_failure()
         
     def _clear_results(self):
         """清空结果"""
@@ -284,15 +411,21 @@ class SingleCourseTab(ttk.Frame):
                     self.progress_var.set(progress)
                     self.status_var.set(f"正在生成NFO: {processed}/{total}")
                     
+                elif action == "pipeline":
+                    self.status_var.set(f"正在扫描并生成NFO：{data}")
+                    
                 elif action == "generate_complete":
-                    self.status_var.set(f"NFO生成完成，共处理 {data} 个Single文件课程")
+                    processed, stats, signatures = data
+                    self.status_var.set(f"NFO生成完成，共处理 {processed} 个Single文件课程（{stats}；{signatures}）")
                     self.progress_var.set(100)
-                    self.generate_nfo_btn.configure(state='normal')
+                    self.generate_nfo_btn.configure(state='normal' if self.courses else 'disabled')
+                    self._enable_scan_buttons()
                     
                 elif action == "error":
                     messagebox.showerror("错误", f"操作出错: {data}")
                     self.status_var.set("操作出错")
                     self._reset_state()
+                    self._enable_scan_buttons()
                     
         except Exception as e:
             print(f"更新进度时出错: {e}")
@@ -302,6 +435,12 @@ class SingleCourseTab(ttk.Frame):
            (self.generate_thread and self.generate_thread.is_alive()):
             self.after(100, self._update_progress)
             
+    def _enable_scan_buttons(self):
+        """扫描或生成结束后恢复扫描按钮"""
+        if self.path_var.get():
+            self.scan_btn.configure(state='normal')
+            self.pipeline_btn.configure(state='normal')
+
     def _display_courses(self):
         """显示课程列表"""
         self._clear_courses_tree()
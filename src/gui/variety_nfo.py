@@ -95,6 +95,7 @@ class VarietyNfoTab(ttk.Frame):
                 return
             self._append_log(f"共找到{len(video_files)}个视频文件，开始生成NFO...")
             # 生成tvshow.nfo
+            self.nfo_generator.writer.begin_run("综艺NFO")
             self.nfo_generator.generate_tvshow_nfo(str(dir_path), variety_name, season_num)
             self._append_log(f"已生成tvshow.nfo（季数: {season_num}）")
             # 生成每集nfo
@@ -106,6 +107,7 @@ class VarietyNfoTab(ttk.Frame):
         except Exception as e:
             self._append_log(f"错误: {e}")
         finally:
+            self.nfo_generator.writer.finish()
             self.processing = False
 
     def _append_log(self, message):
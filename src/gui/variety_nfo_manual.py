@@ -161,6 +161,7 @@ class VarietyNfoManualTab(ttk.Frame):
                 self._append_log("季数输入无效，已自动设为1")
                 season_num = 1
             self._append_log(f"生成tvshow.nfo（季数: {season_num}）")
+            self.nfo_generator.writer.begin_run("综艺NFO")
             self.nfo_generator.generate_tvshow_nfo(str(dir_path), variety_name, season_num)
             for idx, video in enumerate(self.video_files, 1):
                 title = video.stem
@@ -170,6 +171,7 @@ class VarietyNfoManualTab(ttk.Frame):
         except Exception as e:
             self._append_log(f"错误: {e}")
         finally:
+            self.nfo_generator.writer.finish()
             self.processing = False
 
     def _append_log(self, message):
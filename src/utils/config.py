@@ -3,7 +3,24 @@
 """
 from pathlib import Path
 import json
-from typing import Dict, Any
+import os
+import sys
+from typing import Dict, Any, Optional
+
+APP_NAME = 'course-nfo-manager'
+
+
+def app_data_dir() -> Path:
+    """当前用户的程序数据目录（扫描索引、撤销日志、快照等），不随工作目录变化"""
+    if sys.platform.startswith('win'):
+        base = os.environ.get('LOCALAPPDATA') or os.environ.get('APPDATA')
+        base = Path(base) if base else Path.home() / 'AppData' / 'Local'
+    elif sys.platform == 'darwin':
+        base = Path.home() / 'Library' / 'Application Support'
+    else:
+        base = Path(os.environ.get('XDG_DATA_HOME') or Path.home() / '.local' / 'share')
+    return base / APP_NAME
+
 
 class Config:
     """配置管理类"""
@@ -18,6 +35,18 @@ class Config:
             'video_extensions': ['.mp4', '.mkv', '.avi'],  # 支持的视频格式
             'course_types': [],  # 课程类型列表
             'check_nomedia': True,  # 是否检查 .nomedia 文件（开启后会忽略包含 .nomedia 的目录）
+            'scan_workers': 1,  # 并发列出目录的线程数（网络共享可调大，1 为串行扫描）
+            'scan_index_file': 'scan_index.db',  # 扫描索引文件（相对路径位于程序数据目录下），留空则每次完整扫描
+            'nfo_compact': False,  # NFO 使用紧凑格式（不缩进不换行），默认与原有格式一致
+            'nfo_fsync': False,  # 每个 NFO 重命名前先刷盘（更安全但在 NAS 上较慢），目录始终按课程批量刷盘
+            'nfo_write_workers': 4,  # 并发写入 NFO 的线程数（1 为逐个写入）
+            'nfo_journal_dir': 'nfo_journal',  # 撤销日志目录（每次生成运行一个文件，相对路径位于程序数据目录下），留空则不记录
+            'nfo_journal_keep': 100,  # 保留最近多少次运行的撤销日志，0 为全部保留
+            'nfo_read_workers': 8,  # 批量读取 NFO 的线程数（编辑界面加载课程信息）
+            'nfo_incremental': False,  # 增量更新：已有 NFO 只在集数或标题变化时重写，tvshow.nfo 只修改总集数
+            'course_signature_file': '.nfo_signature',  # 课程签名文件（签名未变化的课程批量生成时跳过），留空则不使用
+            'pipeline_queue_size': 16,  # 边扫描边生成时最多排队等待生成的课程数（队列满时扫描暂停）
+            'library_snapshot_dir': 'library_snapshots',  # 扫描结果快照目录（启动时直接加载上次的课程列表，相对路径位于程序数据目录下），留空则不保存
         }
         self.current_config = self.load_config()
     
@@ -43,6 +72,14 @@ class Config:
             return self.current_config.get(key, default)
         return self.current_config.get(key, self.default_config.get(key))
     
+    def data_path(self, key: str) -> Optional[Path]:
+        """获取数据文件/目录配置项：相对路径解析到程序数据目录下，留空时返回 None"""
+        value = self.get(key)
+        if not value:
+            return None
+        path = Path(value).expanduser()
+        return path if path.is_absolute() else app_data_dir() / path
+
     def set(self, key: str, value: Any) -> None:
         """设置配置项"""
         self.current_config[key] = value